@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark dos motores de palíndromos (trabalho 1) e de grampos (trabalho 2)
+sobre genomas sintéticos.
+
+Para cada combinação de motor, tipo de genoma e tamanho, o caso roda num
+processo Python novo, para que o pico de memória (RSS) de um caso não
+contamine o seguinte. Cada caso mede:
+    - tempo: melhor e mediana de --repeats execuções (time.perf_counter);
+    - RSS: pico do processo (ru_maxrss) antes e depois do motor;
+    - alocações: pico de memória rastreada pelo tracemalloc (inclui os
+      vetores do NumPy) e blocos Python que continuam vivos no resultado.
+
+Os genomas são gerados com semente fixa, então duas execuções com os mesmos
+parâmetros medem exatamente a mesma entrada. O resultado vai para um JSON
+que pode ser comparado com o de outra execução (--compare).
+
+Uso:
+    python scripts/benchmark.py --quick
+    python scripts/benchmark.py --engines palindromes hairpins --sizes 1000 1000000
+    python scripts/benchmark.py --compare results/benchmarks/antes.json
+"""
+
+from typing import Callable, Dict, List, Optional
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src", "trabalho1"))
+sys.path.insert(0, os.path.join(ROOT, "src", "trabalho2"))
+
+GENOME_LENGTH = 3_868_304  # Maribacter sp. HTCC2170 (CP002157.1)
+SIZES = [1_000, 10_000, 100_000, 1_000_000, GENOME_LENGTH]
+QUICK_SIZES = [1_000, 10_000, 100_000]
+OUT_DIR = os.path.join(ROOT, "results", "benchmarks")
+
+_BASES = np.frombuffer(b"ACGT", dtype=np.uint8)
+_COMP = bytes.maketrans(b"ACGT", b"TGCA")
+
+
+# ---------------------------------------------------------------------------
+# Genomas sintéticos
+# ---------------------------------------------------------------------------
+
+def _random_codes(rng: np.random.Generator, n: int, gc: float = 0.5) -> np.ndarray:
+    p = [(1 - gc) / 2, gc / 2, gc / 2, (1 - gc) / 2]
+    return rng.choice(_BASES, size=n, p=p)
+
+
+def _insert_blocks(rng: np.random.Generator, genome: np.ndarray, make_block: Callable[[int], bytes],
+                   block: int, fraction: float) -> None:
+    """
+    Sobrescreve trechos aleatórios do genoma com blocos gerados por make_block,
+    até cobrir aproximadamente fraction do total.
+    """
+    n = len(genome)
+    block = min(block, n)
+    count = max(1, int(n * fraction / block))
+    for start in rng.integers(0, n - block + 1, size=count).tolist():
+        genome[start:start + block] = np.frombuffer(make_block(block), dtype=np.uint8)
+
+
+def _tandem_palindromes(rng: np.random.Generator, length: int) -> bytes:
+    """Cópias seguidas de um palíndromo reverso-complementar curto (ex.: GAATTCGAATTC...)."""
+    half = _random_codes(rng, int(rng.integers(2, 7))).tobytes()
+    unit = half + half.translate(_COMP)[::-1]
+    return (unit * (length // len(unit) + 1))[:length]
+
+
+# Tipo de genoma -> função (rng, tamanho) -> sequência
+GENOME_KINDS: Dict[str, Callable[[np.random.Generator, int], np.ndarray]] = {}
+
+
+def _genome_kind(name: str):
+    def register(func):
+        GENOME_KINDS[name] = func
+        return func
+    return register
+
+
+@_genome_kind("random")
+def _random_genome(rng, n):
+    return _random_codes(rng, n)
+
+
+@_genome_kind("gc-rich")
+def _gc_rich_genome(rng, n):
+    return _random_codes(rng, n, gc=0.7)
+
+
+@_genome_kind("at-repeats")
+def _at_repeats_genome(rng, n):
+    # Repetições ATATAT... são palíndromos em todas as posições pares
+    genome = _random_codes(rng, n)
+    _insert_blocks(rng, genome, lambda m: (b"AT" * m)[:m], 500, 0.1)
+    return genome
+
+
+@_genome_kind("gc-repeats")
+def _gc_repeats_genome(rng, n):
+    genome = _random_codes(rng, n)
+    _insert_blocks(rng, genome, lambda m: (b"GC" * m)[:m], 500, 0.1)
+    return genome
+
+
+@_genome_kind("n-runs")
+def _n_runs_genome(rng, n):
+    genome = _random_codes(rng, n)
+    _insert_blocks(rng, genome, lambda m: b"N" * m, 100, 0.05)
+    return genome
+
+
+@_genome_kind("tandem-palindromes")
+def _tandem_genome(rng, n):
+    genome = _random_codes(rng, n)
+    _insert_blocks(rng, genome, lambda m: _tandem_palindromes(rng, m), 200, 0.1)
+    return genome
+
+
+def synthetic_genome(kind: str, size: int, seed: int = 0) -> str:
+    """
+    Gera um genoma sintético reprodutível.
+
+    Args:
+        kind: Um dos tipos de GENOME_KINDS
+        size: Número de bases
+        seed: Semente do gerador (mesma semente, mesmo genoma)
+    """
+    rng = np.random.default_rng([seed, size, sorted(GENOME_KINDS).index(kind)])
+    return GENOME_KINDS[kind](rng, size).tobytes().decode("ascii")
+
+
+# ---------------------------------------------------------------------------
+# Motores
+# ---------------------------------------------------------------------------
+
+def _synthetic_annotations(size: int, seed: int) -> SimpleNamespace:
+    """Registro com uma CDS a cada ~1 kb, no formato lido por build_cds_index."""
+    rng = np.random.default_rng([seed, size])
+    features = []
+    for i, start in enumerate(range(0, size - 300, 1_000)):
+        end = min(size, start + int(rng.integers(300, 1_500)))
+        features.append(SimpleNamespace(
+            type="CDS", location=SimpleNamespace(start=start, end=end),
+            qualifiers={"locus_tag": [f"SYN_{i:05d}"], "product": ["hypothetical protein"]}))
+    return SimpleNamespace(features=features)
+
+
+def _setup_engine(engine: str, sequence: str, seed: int) -> Callable[[], object]:
+    """
+    Prepara (fora da medição) e devolve a chamada a ser medida.
+    """
+    if engine == "palindromes":
+        import bacter_final
+        return lambda: bacter_final.find_all_maximal_palindromes(sequence)
+    if engine == "palindromes-k":
+        import bacter_final
+        return lambda: bacter_final.find_maximal_palindromes_of_length_k(sequence, 6)
+    if engine == "palindromes-approx":
+        import aproximados
+        return lambda: aproximados.find_approximate_palindromes(sequence, mismatches=1, max_gap=3)
+    if engine == "census":
+        import censo
+        import sequencias
+        codes = sequencias.encode(sequence)
+        return lambda: censo.palindromic_census(codes, range(2, 17, 2))
+    if engine == "hairpins":
+        import grampos
+        return lambda: grampos.find_hairpins(sequence, 6)
+    if engine == "hairpins-approx":
+        import grampos
+        return lambda: grampos.find_hairpins(sequence, 6, mismatches=1, wobble=True)
+    if engine == "hairpins-sweep":
+        import grampos
+        return lambda: grampos.find_hairpins_sweep(sequence, range(5, 11), max_total=40)
+    if engine == "hairpins-energy":
+        import grampos
+        return lambda: grampos.find_hairpins(sequence, 6, mismatches=1, wobble=True, selection="energy")
+    if engine == "report":
+        import bacter_final
+        gb_record = _synthetic_annotations(len(sequence), seed)
+        cds_index = bacter_final.build_cds_index(gb_record)
+        scanner = bacter_final.default_site_scanner()
+        half = len(sequence) // 2
+        regions = [(1, half), (half + 1, len(sequence))]
+        return lambda: bacter_final.generate_report(sequence, gb_record, regions, cds_index, scanner)
+    raise ValueError(f"Motor desconhecido: {engine}")
+
+
+ENGINES = ["palindromes", "palindromes-k", "palindromes-approx", "census", "hairpins", "hairpins-approx", "hairpins-sweep", "hairpins-energy", "report"]
+
+
+def _max_rss_kb() -> int:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss  # macOS informa em bytes
+
+
+def run_case(case: Dict) -> Dict:
+    """
+    Mede um caso (motor, tipo, tamanho) no processo atual.
+    """
+    sequence = synthetic_genome(case["kind"], case["size"], case["seed"])
+    call = _setup_engine(case["engine"], sequence, case["seed"])
+    rss_before = _max_rss_kb()
+
+    times = []
+    for _ in range(case["repeats"]):
+        t0 = time.perf_counter()
+        result = call()
+        times.append(time.perf_counter() - t0)
+        if len(times) < case["repeats"]:
+            del result
+    rss_peak = _max_rss_kb()
+
+    measured = dict(case, time_best_s=min(times), time_median_s=statistics.median(times),
+                    times_s=times, rss_before_kb=rss_before, rss_peak_kb=rss_peak,
+                    result_size=len(result) if hasattr(result, "__len__") else None)
+    del result
+
+    if case["alloc"]:
+        blocks_before = sys.getallocatedblocks()
+        tracemalloc.start()
+        result = call()
+        measured["alloc_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        measured["alloc_live_blocks"] = sys.getallocatedblocks() - blocks_before
+        del result
+    return measured
+
+
+def run_case_subprocess(case: Dict, timeout: Optional[float]) -> Dict:
+    """
+    Roda um caso num processo novo e devolve as medidas (ou o erro).
+    """
+    try:
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--case", json.dumps(case)],
+                              capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return dict(case, error=f"tempo limite de {timeout} s excedido")
+    if proc.returncode != 0:
+        detail = proc.stderr.strip().splitlines()[-1:] or [f"código de saída {proc.returncode}"]
+        return dict(case, error=detail[0])
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+# ---------------------------------------------------------------------------
+# Saída e comparação
+# ---------------------------------------------------------------------------
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "-C", ROOT, "rev-parse", "--short", "HEAD"],
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment_info() -> Dict:
+    return {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def _case_key(result: Dict) -> tuple:
+    return (result["engine"], result["kind"], result["size"])
+
+
+def format_row(result: Dict, baseline: Optional[Dict] = None) -> str:
+    head = f"{result['engine']:<14} {result['kind']:<19} {result['size']:>10,}"
+    if "error" in result:
+        return f"{head}  ERRO: {result['error']}"
+    row = (f"{head} {result['time_best_s']:>10.4f} s {result['rss_peak_kb'] / 1024:>9.1f} MB"
+           f" {result.get('alloc_peak_bytes', 0) / 2**20:>9.1f} MB")
+    if baseline and "time_best_s" in baseline and result["time_best_s"] > 0:
+        row += f"  {baseline['time_best_s'] / result['time_best_s']:>6.2f}x"
+    return row
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark dos motores de palíndromos e grampos em genomas sintéticos")
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=ENGINES,
+                        help="Motores a medir (padrão: todos)")
+    parser.add_argument("--kinds", nargs="+", choices=sorted(GENOME_KINDS), default=list(GENOME_KINDS),
+                        help="Tipos de genoma sintético (padrão: todos)")
+    parser.add_argument("--sizes", nargs="+", type=int, default=SIZES,
+                        help="Tamanhos em bases (padrão: 1 kb até o genoma inteiro, 3,87 Mb)")
+    parser.add_argument("--quick", action="store_true",
+                        help=f"Só os tamanhos {', '.join(f'{s:,}' for s in QUICK_SIZES)}")
+    parser.add_argument("--repeats", type=int, default=3, help="Execuções cronometradas por caso")
+    parser.add_argument("--seed", type=int, default=0, help="Semente dos genomas sintéticos")
+    parser.add_argument("--no-alloc", action="store_true",
+                        help="Não medir alocações com tracemalloc (mais rápido)")
+    parser.add_argument("--timeout", type=float, help="Tempo limite por caso, em segundos")
+    parser.add_argument("--out", help="Arquivo JSON de saída (padrão: results/benchmarks/<data>.json)")
+    parser.add_argument("--compare", help="JSON de uma execução anterior, para mostrar a aceleração")
+    parser.add_argument("--case", help=argparse.SUPPRESS)  # Uso interno: mede um caso e imprime o JSON
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(json.loads(args.case))))
+        return 0
+
+    if args.repeats < 1:
+        print("Erro: --repeats deve ser pelo menos 1")
+        return 1
+
+    sizes = QUICK_SIZES if args.quick else args.sizes
+    baseline = {}
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = {_case_key(r): r for r in json.load(f)["results"]}
+
+    print(f"{'motor':<14} {'genoma':<19} {'bases':>10} {'tempo':>12} {'pico RSS':>12} {'pico alloc':>12}"
+          + ("  acelerac." if baseline else ""))
+    results: List[Dict] = []
+    for engine in args.engines:
+        for kind in args.kinds:
+            for size in sizes:
+                case = {"engine": engine, "kind": kind, "size": size, "seed": args.seed,
+                        "repeats": args.repeats, "alloc": not args.no_alloc}
+                result = run_case_subprocess(case, args.timeout)
+                results.append(result)
+                print(format_row(result, baseline.get(_case_key(result))), flush=True)
+
+    out = args.out or os.path.join(OUT_DIR, datetime.datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump({"environment": environment_info(), "results": results}, f, indent=2)
+    print(f"\nResultados salvos em: {os.path.abspath(out)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
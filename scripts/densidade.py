@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Trilhas de densidade do genoma inteiro: palíndromos maximais por kb,
+grampos por kb e conteúdo GC, em bedGraph e/ou wig, em várias resoluções.
+
+O genoma é varrido uma vez por motor, em blocos lidos do .2bit (os
+palíndromos em fluxo, como em bacter_final.py --whole-genome, e os grampos
+com grampos.iter_hairpins), sem montar a sequência inteira de um registro;
+as posições viram somas de prefixo (src/comum/trilhas.py) e cada resolução
+sai delas sem nova varredura.
+
+Uso:
+    python scripts/densidade.py
+    python scripts/densidade.py --windows 1000 10000 100000 --step-fraction 0.5 --formats bedgraph
+    python scripts/densidade.py --min-length 12 --K 5 --out-dir results/trilhas
+"""
+
+from typing import Iterable, List
+import argparse
+import itertools
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src", "trabalho1"))
+sys.path.insert(0, os.path.join(ROOT, "src", "trabalho2"))
+
+import bacter_final
+import grampos
+import genoma2bit
+import perfil
+import trilhas
+
+FASTA_PATH = os.path.join(ROOT, "data", "maribacter_HTCC2170.fasta")
+OUT_DIR = os.path.join(ROOT, "results", "trilhas")
+BLOCK = 1 << 20
+
+
+def _add_in_blocks(tracks: trilhas.DensityTracks, name: str, starts: Iterable[int],
+                   block: int = BLOCK) -> None:
+    """Soma as posições à trilha name, um bloco de até block posições por vez."""
+    starts = iter(starts)
+    tracks.add_starts(name, [])
+    while True:
+        chunk = list(itertools.islice(starts, block))
+        if not chunk:
+            return
+        tracks.add_starts(name, chunk)
+
+
+def build_tracks(fasta_path: str, min_length: int = 10, K: int = 6,
+                 selection: str = "longest", max_length: int = 1000,
+                 block: int = BLOCK) -> List[trilhas.DensityTracks]:
+    """
+    Uma DensityTracks por registro do FASTA, com as trilhas "palindromes"
+    (maximais com tamanho >= min_length), "hairpins" (K) e "gc", lendo
+    block bases por vez. Como em --whole-genome, palíndromos maiores que
+    max_length contam truncados em max_length, em torno do centro.
+    """
+    result = []
+    for record_id, record in genoma2bit.open_genome(fasta_path).records.items():
+        n = len(record)
+        tracks = trilhas.DensityTracks(record_id, n)
+        with perfil.span("densidade.palindromes", record=record_id):
+            chunks = ((record_id, record[a:a + block], a + block >= n) for a in range(0, n, block))
+            _add_in_blocks(tracks, "palindromes",
+                           (start for _, start, end, _ in
+                            bacter_final.stream_maximal_palindromes(chunks, max_length)
+                            if end - start >= min_length), block)
+        with perfil.span("densidade.hairpins", record=record_id):
+            _add_in_blocks(tracks, "hairpins",
+                           (hit["start"] - 1 for hit in
+                            grampos.iter_hairpins(record, K, selection=selection, chunk_size=block)),
+                           block)
+        for a in range(0, n, block):
+            tracks.add_gc(record.codes(a, a + block), a)
+        if not n:
+            tracks.add_gc([])
+        result.append(tracks)
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Trilhas de densidade (bedGraph/wig) de palíndromos, "
+                                                 "grampos e GC")
+    parser.add_argument("--fasta", default=FASTA_PATH, help="Genoma (FASTA; aceita vários registros)")
+    parser.add_argument("--windows", type=int, nargs="+", default=[1_000, 10_000, 100_000],
+                        help="Tamanhos de janela (uma resolução por tamanho)")
+    parser.add_argument("--step-fraction", type=float, default=1.0,
+                        help="Passo entre janelas, como fração da janela (1 = sem sobreposição)")
+    parser.add_argument("--formats", nargs="+", choices=trilhas.FORMATS, default=list(trilhas.FORMATS),
+                        help="Formatos de saída")
+    parser.add_argument("--min-length", type=int, default=10,
+                        help="Tamanho mínimo dos palíndromos maximais contados")
+    parser.add_argument("--K", type=int, default=6, help="K dos grampos")
+    parser.add_argument("--selection", choices=sorted(grampos.SELECTIONS), default="longest",
+                        help="Remoção de sobreposições entre grampos")
+    parser.add_argument("--per", type=int, default=1000, help="Densidades por este número de bases")
+    parser.add_argument("--out-dir", default=OUT_DIR, help="Diretório das trilhas")
+    args = parser.parse_args()
+
+    if min(args.windows) < 1 or not 0 < args.step_fraction <= 1:
+        print("Erro: janelas devem ser 1 ou maiores e --step-fraction deve estar em (0, 1]")
+        return 1
+    if not os.path.exists(args.fasta):
+        print(f"Erro: Arquivo {os.path.abspath(args.fasta)} não encontrado!")
+        return 1
+
+    t0 = time.perf_counter()
+    tracks = build_tracks(args.fasta, args.min_length, args.K, args.selection)
+    t1 = time.perf_counter()
+    for track in tracks:
+        gc = track.gc(0, len(track))  # None num registro só de N
+        print(f"{track.chrom}: {len(track):,} bp, {track.count('palindromes', 0, len(track)):,} palíndromos "
+              f"(>= {args.min_length} bp), {track.count('hairpins', 0, len(track)):,} grampos (K={args.K}), "
+              f"GC {'n/d' if gc is None else f'{gc:.3f}'}")
+    written = trilhas.export(tracks, args.out_dir, args.windows, args.formats, args.step_fraction, args.per)
+    t2 = time.perf_counter()
+    print(f"Varredura: {t1 - t0:.2f} s; {len(written)} arquivos em {t2 - t1:.2f} s")
+    for path in written:
+        print(f"  {os.path.relpath(path)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Servidor local de consultas por região.
+
+Carrega uma vez o genoma (.2bit, com mmap), as anotações (.anot) e o índice
+de CDS, e responde consultas pequenas sem pagar a cada vez a partida do
+interpretador, a leitura dos arquivos ou a ida ao NCBI. Atende vários
+clientes ao mesmo tempo (uma thread por conexão, com keep-alive) em HTTP no
+localhost ou num socket Unix. As respostas, e os índices de palíndromos de
+cada região, ficam num cache LRU limitado em entradas (--cache-size) e em
+tamanho (--cache-mb, somando os bytes das respostas e uma estimativa do
+tamanho dos índices).
+
+Rotas (GET, respostas JSON, coordenadas 1-based inclusivas do genoma):
+    /palindromes?start=&end=&k=          palíndromos maximais de tamanho k
+    /palindromes?start=&end=&min_length= todos os palíndromos maximais da região
+    /hairpins?start=&end=&K=&selection=&mismatches=&wobble=&max_total=&max_energy=&energy=
+    /cds?start=&end=                     CDS que se sobrepõem à região
+    /status                              registros carregados e uso do cache
+Todas aceitam accession= (padrão: o único registro, ou o primeiro do FASTA).
+Palíndromos e grampos são os da região, como em bacter_final.py --intervals
+e em grampos.py. Regiões maiores que MAX_PALINDROME_REGION (palíndromos) ou
+MAX_HAIRPIN_REGION (grampos), K acima de MAX_K e max_total acima de
+MAX_TOTAL são recusados com 400: uma consulta sozinha não ocupa o servidor
+nem o cache por minutos.
+
+Uso:
+    python scripts/servidor.py --port 8765
+    python scripts/servidor.py --socket /tmp/biologia.sock
+    curl 'http://127.0.0.1:8765/palindromes?start=82583&end=83599&k=6'
+    curl --unix-socket /tmp/biologia.sock 'http://localhost/hairpins?start=88450&end=98458&K=6'
+"""
+
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src", "trabalho1"))
+sys.path.insert(0, os.path.join(ROOT, "src", "trabalho2"))
+
+import bacter_final
+import grampos
+import anotacoes
+import genoma2bit
+
+FASTA_PATH = os.path.join(ROOT, "data", "maribacter_HTCC2170.fasta")
+GB_PATH = os.path.join(ROOT, "data", "maribacter_HTCC2170.gb")
+CACHE_MB = 256
+# Limites das consultas. O custo de /hairpins cresce com o tamanho da região
+# vezes o número de tamanhos de loop (até max_total), o de /palindromes com a
+# região (e o índice dela fica no cache)
+MAX_PALINDROME_REGION = 1_000_000
+MAX_HAIRPIN_REGION = 200_000
+MAX_K = 32
+MAX_TOTAL = 200
+# Cada início num índice de palíndromos: ponteiro na lista + objeto int
+_INDEX_BYTES_PER_START = 36
+
+
+class QueryError(ValueError):
+    """Consulta inválida (vira uma resposta 400)."""
+
+
+class LRUCache:
+    """
+    Cache LRU limitado e seguro entre threads, em número de entradas e na
+    soma dos tamanhos (bytes) dos valores. O valor é calculado fora da
+    trava: duas consultas iguais simultâneas podem calcular duas vezes, mas
+    nenhuma espera pela outra. Um valor maior que o limite inteiro é
+    devolvido sem entrar no cache.
+    """
+
+    def __init__(self, maxsize: int = 1024, maxbytes: int = CACHE_MB << 20):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Tuple[object, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, compute: Callable[[], object],
+            size: Callable[[object], int] = len) -> object:
+        """
+        Valor de key, calculado com compute() na primeira vez; size(valor)
+        dá o tamanho em bytes contado no limite (padrão: len, para bytes).
+        """
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key][0]
+            self.misses += 1
+        value = compute()
+        nbytes = size(value)
+        if nbytes > self.maxbytes:
+            return value
+        with self._lock:
+            if key in self._data:  # Calculado também por outra thread
+                self.nbytes -= self._data[key][1]
+            self._data[key] = (value, nbytes)
+            self._data.move_to_end(key)
+            self.nbytes += nbytes
+            while len(self._data) > self.maxsize or self.nbytes > self.maxbytes:
+                self.nbytes -= self._data.popitem(last=False)[1][1]
+        return value
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class GenomeService:
+    """
+    Genoma, anotações e índices carregados uma vez; cada método responde
+    uma rota com um dicionário pronto para virar JSON.
+    """
+
+    def __init__(self, fasta_path: str = FASTA_PATH, gb_path: Optional[str] = GB_PATH,
+                 cache_size: int = 1024, cache_bytes: int = CACHE_MB << 20):
+        self.records = genoma2bit.open_genome(fasta_path).records
+        self.default = next(iter(self.records))
+        self.annotations = None
+        self.cds_index = None
+        if gb_path and os.path.exists(gb_path):
+            self.annotations = anotacoes.load_annotations(gb_path)
+            self.cds_index = bacter_final.build_cds_index(self.annotations)
+        self.cache = LRUCache(cache_size, cache_bytes)
+        self.started = time.time()
+
+    # -- parâmetros -------------------------------------------------------
+
+    def _region(self, params: Dict[str, str],
+                max_length: Optional[int] = None) -> Tuple[str, int, int]:
+        accession = params.get("accession", self.default)
+        if accession not in self.records:
+            raise QueryError(f"Registro desconhecido: {accession}")
+        length = len(self.records[accession])
+        start = _int(params, "start", 1)
+        end = _int(params, "end", length)
+        if not 1 <= start <= end <= length:
+            raise QueryError(f"Região inválida: {start}-{end} (registro com {length} bp)")
+        if max_length is not None and end - start + 1 > max_length:
+            raise QueryError(f"Região grande demais: {end - start + 1} bp (máximo {max_length})")
+        return accession, start, end
+
+    def _palindrome_index(self, accession: str, start: int, end: int) -> Tuple[str, Dict]:
+        def build():
+            subseq = self.records[accession][start - 1:end]
+            return subseq, bacter_final.build_palindrome_index(subseq)
+        return self.cache.get(("index", accession, start, end), build, _index_size)
+
+    # -- rotas ------------------------------------------------------------
+
+    def palindromes(self, params: Dict[str, str]) -> Dict:
+        accession, start, end = self._region(params, MAX_PALINDROME_REGION)
+        k = _int(params, "k", None)
+        min_length = _int(params, "min_length", 2)
+        subseq, index = self._palindrome_index(accession, start, end)
+        found = []
+        if k is not None:
+            for i in index.get(k, []):
+                found.append({"start": start + i, "end": start + i + k - 1,
+                              "sequence": subseq[i:i + k].upper()})
+        else:
+            hits = bacter_final.find_all_maximal_palindromes(subseq, index)
+            hits = hits.filter(hits.sizes >= min_length).sorted("start", "end")
+            for s, e, pal in hits:
+                found.append({"start": start + s, "end": start + e - 1, "sequence": pal.upper()})
+        return {"accession": accession, "start": start, "end": end, "k": k,
+                "count": len(found), "palindromes": found}
+
+    def hairpins(self, params: Dict[str, str]) -> Dict:
+        accession, start, end = self._region(params, MAX_HAIRPIN_REGION)
+        K = _int(params, "K", 6)
+        selection = params.get("selection", "longest")
+        if selection not in grampos.SELECTIONS:
+            raise QueryError(f"Seleção desconhecida: {selection}")
+        mismatches = _int(params, "mismatches", 0)
+        if not 1 <= K <= MAX_K or mismatches < 0:
+            raise QueryError(f"K deve estar entre 1 e {MAX_K} e mismatches, 0 ou maior")
+        wobble = params.get("wobble", "0").lower() in ("1", "true", "sim")
+        max_total = _int(params, "max_total", 20)
+        if not 1 <= max_total <= MAX_TOTAL:
+            raise QueryError(f"max_total deve estar entre 1 e {MAX_TOTAL}")
+        max_energy = _float(params, "max_energy", None)
+        score = params.get("energy", "0").lower() in ("1", "true", "sim")
+        hits = grampos.find_hairpins(self.records[accession][start - 1:end], K,
+                                     max_total=max_total, selection=selection,
+                                     mismatches=mismatches, wobble=wobble,
+                                     score=score, max_energy=max_energy)
+        found = []
+        for h in hits:
+            h["start"] += start - 1
+            h["end"] += start - 1
+            found.append(h)
+        return {"accession": accession, "start": start, "end": end, "K": K,
+                "count": len(found), "hairpins": found}
+
+    def cds(self, params: Dict[str, str]) -> Dict:
+        accession, start, end = self._region(params)
+        found: List[Dict] = []
+        if self.cds_index is not None and (accession == self.annotations.id or len(self.records) == 1):
+            found = bacter_final.query_cds_index(self.cds_index, start, end)
+        return {"accession": accession, "start": start, "end": end,
+                "count": len(found), "cds": found}
+
+    def status(self, params: Dict[str, str]) -> Dict:
+        return {"records": {name: len(rec) for name, rec in self.records.items()},
+                "annotations": self.annotations.id if self.annotations is not None else None,
+                "cache": {"entries": len(self.cache), "maxsize": self.cache.maxsize,
+                          "bytes": self.cache.nbytes, "maxbytes": self.cache.maxbytes,
+                          "hits": self.cache.hits, "misses": self.cache.misses},
+                "uptime": round(time.time() - self.started, 1)}
+
+    ROUTES = {"/palindromes": palindromes, "/hairpins": hairpins, "/cds": cds}
+
+    def answer(self, path: str, params: Dict[str, str]) -> bytes:
+        """
+        Resposta JSON (em bytes) de uma rota; as das rotas de consulta vêm do
+        cache quando a mesma consulta já foi feita.
+        """
+        if path == "/status":
+            return json.dumps(self.status(params)).encode("utf-8")
+        if path not in self.ROUTES:
+            raise KeyError(path)
+        route = self.ROUTES[path]
+        key = (path,) + tuple(sorted(params.items()))
+        return self.cache.get(key, lambda: json.dumps(route(self, params)).encode("utf-8"))
+
+
+def _index_size(value: Tuple[str, Dict]) -> int:
+    """Tamanho estimado (bytes) de uma entrada (subsequência, índice de palíndromos)."""
+    subseq, index = value
+    return len(subseq) + _INDEX_BYTES_PER_START * sum(len(starts) for starts in index.values())
+
+
+def _int(params: Dict[str, str], name: str, default: Optional[int]) -> Optional[int]:
+    if name not in params:
+        return default
+    try:
+        return int(params[name])
+    except ValueError:
+        raise QueryError(f"{name} deve ser um número inteiro: {params[name]}") from None
+
+
+def _float(params: Dict[str, str], name: str, default: Optional[float]) -> Optional[float]:
+    if name not in params:
+        return default
+    try:
+        return float(params[name])
+    except ValueError:
+        raise QueryError(f"{name} deve ser um número: {params[name]}") from None
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """Atende GET com as rotas de GenomeService; conexões persistentes (HTTP/1.1)."""
+
+    protocol_version = "HTTP/1.1"
+    service: GenomeService = None
+    quiet = False
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            self._send(200, self.service.answer(url.path, params))
+        except KeyError:
+            self._send(404, _error(f"Rota desconhecida: {url.path}"))
+        except ValueError as e:  # QueryError e parâmetros recusados pelos motores
+            self._send(400, _error(str(e)))
+        except Exception as e:  # Não derruba a thread nem a conexão dos outros clientes
+            self._send(500, _error(f"{type(e).__name__}: {e}"))
+
+    def _send(self, status: int, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self) -> str:
+        # No socket Unix o endereço do cliente é uma string vazia
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format: str, *args) -> None:
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+def _error(message: str) -> bytes:
+    return json.dumps({"error": message}).encode("utf-8")
+
+
+class UnixHTTPServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer num socket Unix (sem nome de host nem porta)."""
+
+    address_family = socket.AF_UNIX
+
+    def server_bind(self) -> None:
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)  # Socket deixado por uma execução anterior
+        socketserver.TCPServer.server_bind(self)
+        self.server_name, self.server_port = "localhost", 0
+
+
+def make_server(service: GenomeService, host: str = "127.0.0.1", port: int = 8765,
+                socket_path: Optional[str] = None, quiet: bool = False) -> ThreadingHTTPServer:
+    """
+    Servidor HTTP (em host:port ou no socket Unix socket_path) que responde
+    com o serviço dado.
+    """
+    # Sem o algoritmo de Nagle, cabeçalho e corpo (duas escritas) não esperam
+    # o ACK atrasado do cliente: ~40 ms a menos por consulta em TCP
+    handler = type("Handler", (QueryHandler,), {"service": service, "quiet": quiet,
+                                                "disable_nagle_algorithm": not socket_path})
+    if socket_path:
+        server = UnixHTTPServer(socket_path, handler)
+    else:
+        server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Servidor local de consultas por região "
+                                                 "(palíndromos, grampos, CDS)")
+    parser.add_argument("--fasta", default=FASTA_PATH, help="Genoma (FASTA; o .2bit é gerado ao lado)")
+    parser.add_argument("--gb", default=GB_PATH, help="Anotações (GenBank; o .anot é gerado ao lado)")
+    parser.add_argument("--host", default="127.0.0.1", help="Endereço HTTP (padrão: só localhost)")
+    parser.add_argument("--port", type=int, default=8765, help="Porta HTTP")
+    parser.add_argument("--socket", help="Atende num socket Unix neste caminho, em vez de TCP")
+    parser.add_argument("--cache-size", type=int, default=1024,
+                        help="Máximo de respostas e índices de região guardados (LRU)")
+    parser.add_argument("--cache-mb", type=float, default=CACHE_MB,
+                        help="Máximo de memória do cache, em MB (respostas e índices)")
+    parser.add_argument("--quiet", action="store_true", help="Não registra cada consulta")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    service = GenomeService(args.fasta, args.gb, args.cache_size, int(args.cache_mb * (1 << 20)))
+    server = make_server(service, args.host, args.port, args.socket, args.quiet)
+    where = args.socket or f"http://{args.host}:{server.server_port}"
+    print(f"Genoma e anotações carregados em {time.perf_counter() - t0:.2f} s; "
+          f"atendendo em {where}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""
+Cópia compacta das anotações de um GenBank, lida com mmap.
+
+Ler um GenBank bacteriano inteiro com o Biopython leva segundos, e só
+usamos coordenadas, fita, tipo, locus_tag e product de cada feature. Na
+primeira carga essas informações são gravadas num arquivo binário colunar
+(.anot, ao lado do .gb); nas seguintes o arquivo é só mapeado na memória.
+O .anot é refeito sempre que o tamanho ou a data de modificação do .gb mudam.
+
+Formato (inteiros little-endian, seções alinhadas em 8 bytes):
+    "BCAN" | versão (u32) | tamanho do .gb (u64) | mtime_ns do .gb (u64)
+    | n_features (u64) | n_textos (u64) | id do registro (u64) | comprimento (u64)
+    start   i64[n]   início 0-based
+    end     i64[n]   fim exclusivo
+    strand  i8[n]    +1, -1 ou 0
+    type    u32[n]   índice na tabela de textos
+    locus   u32[n]   índice na tabela de textos ("" = ausente)
+    product u32[n]   índice na tabela de textos ("" = ausente)
+    textos: deslocamentos u64[n_textos + 1] e os bytes UTF-8 concatenados
+"""
+
+from typing import Dict, List, Tuple
+import mmap
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b"BCAN"
+VERSION = 1
+_HEADER = struct.Struct("<4sIQQQQQQ")
+
+# Colunas na ordem em que aparecem no arquivo
+_COLUMNS = [("start", "<i8"), ("end", "<i8"), ("strand", "i1"),
+            ("type", "<u4"), ("locus", "<u4"), ("product", "<u4")]
+
+
+def _pad(f) -> None:
+    f.write(b"\0" * (-f.tell() % 8))
+
+
+def build(gb_path: str, out_path: str) -> None:
+    """
+    Lê o GenBank com o Biopython (lento, só na primeira vez) e grava o .anot.
+    """
+    from Bio import SeqIO
+
+    with open(gb_path, "r", encoding="utf-8") as f:
+        record = next(SeqIO.parse(f, "genbank"))
+
+    texts: List[str] = [""]
+    text_ids: Dict[str, int] = {"": 0}
+
+    def text_id(value: str) -> int:
+        if value not in text_ids:
+            text_ids[value] = len(texts)
+            texts.append(value)
+        return text_ids[value]
+
+    rows = []
+    for feature in record.features:
+        q = feature.qualifiers
+        rows.append((int(feature.location.start), int(feature.location.end),
+                     feature.location.strand or 0, text_id(feature.type),
+                     text_id(q.get("locus_tag", [""])[0]), text_id(q.get("product", [""])[0])))
+    record_id = text_id(record.id)
+
+    stat = os.stat(gb_path)
+    tmp = f"{out_path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as out:
+        out.write(_HEADER.pack(MAGIC, VERSION, stat.st_size, stat.st_mtime_ns,
+                               len(rows), len(texts), record_id, len(record.seq)))
+        for col, (_, dtype) in enumerate(_COLUMNS):
+            _pad(out)
+            out.write(np.array([row[col] for row in rows], dtype=dtype).tobytes())
+        encoded = [t.encode("utf-8") for t in texts]
+        _pad(out)
+        out.write(np.cumsum([0] + [len(e) for e in encoded], dtype="<u8").tobytes())
+        out.write(b"".join(encoded))
+    os.replace(tmp, out_path)
+
+
+class Annotations:
+    """
+    Anotações de um GenBank abertas do .anot. As colunas (start, end,
+    strand, type, locus, product) são vetores NumPy sobre o mapa de memória.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.source_size, self.source_mtime_ns, n, n_texts,
+         record_id, self.length) = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} não é um arquivo .anot compatível")
+
+        pos = _HEADER.size
+        for name, dtype in _COLUMNS:
+            pos += -pos % 8
+            column = np.frombuffer(self._mm, dtype=dtype, count=n, offset=pos)
+            setattr(self, name, column)
+            pos += column.nbytes
+        pos += -pos % 8
+        self._text_offsets = np.frombuffer(self._mm, dtype="<u8", count=n_texts + 1, offset=pos)
+        self._text_base = pos + self._text_offsets.nbytes
+        self._text_ids = None
+        self.id = self.text(record_id)
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def text(self, i: int) -> str:
+        """
+        Texto de índice i da tabela de textos.
+        """
+        a, b = int(self._text_offsets[i]), int(self._text_offsets[i + 1])
+        return self._mm[self._text_base + a:self._text_base + b].decode("utf-8")
+
+    def text_id(self, value: str) -> int:
+        """
+        Índice de um texto na tabela (-1 se não existir).
+        """
+        if self._text_ids is None:
+            self._text_ids = {self.text(i): i for i in range(len(self._text_offsets) - 1)}
+        return self._text_ids.get(value, -1)
+
+    def features_of_type(self, feature_type: str) -> np.ndarray:
+        """
+        Índices das features de um tipo (ex.: "CDS").
+        """
+        return np.flatnonzero(self.type == self.text_id(feature_type))
+
+
+def snapshot_path(gb_path: str) -> str:
+    """
+    Caminho do .anot correspondente a um GenBank.
+    """
+    return os.path.splitext(gb_path)[0] + ".anot"
+
+
+def _is_fresh(path: str, gb_path: str) -> bool:
+    if not os.path.exists(path):
+        return False
+    stat = os.stat(gb_path)
+    with open(path, "rb") as f:
+        header = f.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        return False
+    magic, version, size, mtime_ns = _HEADER.unpack(header)[:4]
+    return (magic, version, size, mtime_ns) == (MAGIC, VERSION, stat.st_size, stat.st_mtime_ns)
+
+
+def load_annotations(gb_path: str) -> Annotations:
+    """
+    Abre as anotações de um GenBank, construindo o .anot antes se ele ainda
+    não existir ou estiver desatualizado.
+    """
+    path = snapshot_path(gb_path)
+    if not _is_fresh(path, gb_path):
+        build(gb_path, path)
+    return Annotations(path)
@@ -0,0 +1,307 @@
+"""
+Banco local (SQLite) com os resultados das análises.
+
+Cada execução grava um "conjunto" (dataset): o tipo de ocorrência
+(palindrome, hairpin, site), a accession, a região analisada e os
+parâmetros. Gravar de novo o mesmo conjunto substitui o anterior, então
+repetir uma análise não duplica linhas.
+
+As ocorrências ficam numa única tabela, com coordenadas 1-based inclusivas
+e índices por (accession, tipo, início) e por (tipo, k). k é o tamanho do
+palíndromo, o K (braço) do grampo ou o tamanho do sítio de restrição.
+Consultas por sobreposição usam o maior comprimento já gravado de cada
+tipo (tabela spans) para limitar a busca no índice a
+início ∈ [consulta_início - maior + 1, consulta_fim].
+
+Uso pela linha de comando:
+    python banco.py resultados.sqlite --type palindrome --range 1-500000 --min-k 10
+    python banco.py resultados.sqlite --type hairpin --overlapping-cds FB2170_16476
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+import argparse
+import datetime
+import json
+import os
+import sqlite3
+import sys
+
+TYPES = ("palindrome", "hairpin", "site")
+# Linhas por executemany na gravação incremental (DatasetWriter)
+BATCH = 10_000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS datasets (
+    id INTEGER PRIMARY KEY,
+    tool TEXT NOT NULL,
+    accession TEXT NOT NULL,
+    type TEXT NOT NULL,
+    region_start INTEGER NOT NULL,
+    region_end INTEGER NOT NULL,
+    params TEXT NOT NULL,
+    created TEXT NOT NULL,
+    UNIQUE (tool, accession, type, region_start, region_end, params)
+);
+CREATE TABLE IF NOT EXISTS hits (
+    dataset_id INTEGER NOT NULL,
+    accession TEXT NOT NULL,
+    type TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    k INTEGER NOT NULL,
+    strand INTEGER NOT NULL DEFAULT 0,
+    name TEXT
+);
+CREATE INDEX IF NOT EXISTS hits_range ON hits (accession, type, start);
+CREATE INDEX IF NOT EXISTS hits_k ON hits (type, k);
+CREATE INDEX IF NOT EXISTS hits_dataset ON hits (dataset_id);
+CREATE TABLE IF NOT EXISTS spans (
+    accession TEXT NOT NULL,
+    type TEXT NOT NULL,
+    max_length INTEGER NOT NULL,
+    PRIMARY KEY (accession, type)
+);
+CREATE TABLE IF NOT EXISTS cds (
+    accession TEXT NOT NULL,
+    locus_tag TEXT NOT NULL,
+    product TEXT,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cds_locus ON cds (locus_tag);
+CREATE INDEX IF NOT EXISTS cds_range ON cds (accession, start);
+"""
+
+
+class DatasetWriter:
+    """
+    Gravação incremental de um conjunto (ver ResultsDB.writer): remove o
+    conjunto anterior com a mesma chave, cria o novo e insere as
+    ocorrências em lotes, tudo numa transação aberta até close().
+    """
+
+    def __init__(self, conn: sqlite3.Connection, key: tuple, batch: int = BATCH):
+        self.conn = conn
+        self.accession, self.hit_type = key[1], key[2]
+        self.batch = batch
+        self.count = 0
+        self.longest = 0
+        self._rows: List[tuple] = []
+        old = conn.execute(
+            "SELECT id FROM datasets WHERE tool=? AND accession=? AND type=? "
+            "AND region_start=? AND region_end=? AND params=?", key).fetchone()
+        if old:
+            conn.execute("DELETE FROM hits WHERE dataset_id=?", old)
+            conn.execute("DELETE FROM datasets WHERE id=?", old)
+        self.dataset_id = conn.execute(
+            "INSERT INTO datasets (tool, accession, type, region_start, region_end, params, created) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            key + (datetime.datetime.now().isoformat(timespec="seconds"),)).lastrowid
+
+    def add(self, start: int, end: int, k: int, strand: int = 0, name: Optional[str] = None) -> None:
+        """Uma ocorrência, 1-based inclusiva."""
+        self._rows.append((self.dataset_id, self.accession, self.hit_type, start, end, k, strand, name))
+        self.longest = max(self.longest, end - start + 1)
+        if len(self._rows) >= self.batch:
+            self.flush()
+
+    def extend(self, hits: Iterable[Tuple[int, int, int, int, Optional[str]]]) -> None:
+        """Várias ocorrências (tuplas início, fim, k, fita, nome)."""
+        for hit in hits:
+            self.add(*hit)
+
+    def flush(self) -> None:
+        """Insere o lote pendente."""
+        if self._rows:
+            self.conn.executemany(
+                "INSERT INTO hits (dataset_id, accession, type, start, end, k, strand, name) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", self._rows)
+            self.count += len(self._rows)
+            self._rows = []
+
+    def close(self) -> None:
+        """Insere o que falta, atualiza o maior comprimento do tipo e confirma a transação."""
+        self.flush()
+        self.conn.execute(
+            "INSERT INTO spans (accession, type, max_length) VALUES (?, ?, ?) "
+            "ON CONFLICT (accession, type) DO UPDATE SET max_length=MAX(max_length, excluded.max_length)",
+            (self.accession, self.hit_type, self.longest))
+        self.conn.commit()
+
+    def __enter__(self) -> "DatasetWriter":
+        return self
+
+    def __exit__(self, exc_type, *exc) -> bool:
+        if exc_type is None:
+            self.close()
+        else:
+            self._rows = []
+            self.conn.rollback()
+        return False
+
+
+class ResultsDB:
+    """
+    Conexão com o banco de resultados (criado na primeira abertura).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "ResultsDB":
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        self.close()
+        return False
+
+    # -- gravação ---------------------------------------------------------
+
+    def store(self, tool: str, accession: str, hit_type: str, region: Tuple[int, int],
+              params: Dict, hits: Iterable[Tuple[int, int, int, int, Optional[str]]]) -> int:
+        """
+        Grava um conjunto de ocorrências numa transação só, substituindo o
+        conjunto anterior com a mesma ferramenta, accession, tipo, região e
+        parâmetros.
+
+        Args:
+            tool: Programa que gerou os dados (ex.: "bacter_final")
+            accession: Registro (ex.: "CP002157.1")
+            hit_type: "palindrome", "hairpin" ou "site"
+            region: (início, fim) 1-based da região analisada
+            params: Parâmetros da análise (gravados como JSON)
+            hits: Tuplas (início, fim, k, fita, nome), 1-based inclusivas
+
+        Returns:
+            int: Número de ocorrências gravadas
+        """
+        with self.writer(tool, accession, hit_type, region, params) as out:
+            out.extend(hits)
+        return out.count
+
+    def writer(self, tool: str, accession: str, hit_type: str, region: Tuple[int, int],
+               params: Dict, batch: int = BATCH) -> "DatasetWriter":
+        """
+        Como store, mas as ocorrências chegam aos poucos (out.add(...)) e são
+        inseridas em lotes de `batch` linhas: a memória não cresce com o
+        número de ocorrências. Use com with; a transação só é confirmada ao
+        sair sem erro (com erro, o conjunto anterior continua lá).
+        """
+        if hit_type not in TYPES:
+            raise ValueError(f"Tipo desconhecido: {hit_type} (use {', '.join(TYPES)})")
+        key = (tool, accession, hit_type, region[0], region[1], json.dumps(params, sort_keys=True))
+        return DatasetWriter(self.conn, key, batch)
+
+    def store_cds(self, accession: str, cds_list: Iterable[Dict]) -> None:
+        """
+        Substitui as CDS de uma accession (dicionários de build_cds_index:
+        locus_tag, product, start, end, 1-based).
+        """
+        with self.conn:
+            self.conn.execute("DELETE FROM cds WHERE accession=?", (accession,))
+            self.conn.executemany(
+                "INSERT INTO cds (accession, locus_tag, product, start, end) VALUES (?, ?, ?, ?, ?)",
+                ((accession, c["locus_tag"], c["product"], c["start"], c["end"]) for c in cds_list))
+
+    # -- consultas --------------------------------------------------------
+
+    def _max_length(self, accession: str, hit_type: str) -> int:
+        row = self.conn.execute("SELECT max_length FROM spans WHERE accession=? AND type=?",
+                                (accession, hit_type)).fetchone()
+        return row[0] if row else 0
+
+    def query(self, accession: str, hit_type: str, start: int = 1, end: Optional[int] = None,
+              min_k: Optional[int] = None, k: Optional[int] = None) -> List[Tuple]:
+        """
+        Ocorrências de um tipo que se sobrepõem a [start, end] (1-based),
+        sem repetições, em ordem de início.
+
+        Returns:
+            list: Tuplas (início, fim, k, fita, nome)
+        """
+        if end is None:
+            end = sys.maxsize
+        longest = self._max_length(accession, hit_type)
+        sql = ("SELECT DISTINCT start, end, k, strand, name FROM hits "
+               "WHERE accession=? AND type=? AND start BETWEEN ? AND ? AND end >= ?")
+        args: List = [accession, hit_type, start - longest + 1, end, start]
+        if min_k is not None:
+            sql += " AND k >= ?"
+            args.append(min_k)
+        if k is not None:
+            sql += " AND k = ?"
+            args.append(k)
+        return self.conn.execute(sql + " ORDER BY start, end", args).fetchall()
+
+    def find_cds(self, locus_tag: str) -> Optional[Tuple[str, int, int, str]]:
+        """
+        (accession, início, fim, produto) de uma CDS pelo locus_tag.
+        """
+        return self.conn.execute("SELECT accession, start, end, product FROM cds WHERE locus_tag=?",
+                                 (locus_tag,)).fetchone()
+
+    def query_cds(self, locus_tag: str, hit_type: str, **filters) -> List[Tuple]:
+        """
+        Ocorrências de um tipo que se sobrepõem à CDS locus_tag.
+        """
+        cds = self.find_cds(locus_tag)
+        if cds is None:
+            raise KeyError(f"CDS {locus_tag} não está no banco")
+        accession, start, end, _ = cds
+        return self.query(accession, hit_type, start, end, **filters)
+
+    def accessions(self) -> List[str]:
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT accession FROM datasets ORDER BY 1")]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Consulta ao banco de resultados (SQLite)")
+    parser.add_argument("db", help="Arquivo do banco")
+    parser.add_argument("--type", choices=TYPES, required=True, help="Tipo de ocorrência")
+    parser.add_argument("--accession", help="Registro (padrão: o único do banco)")
+    parser.add_argument("--range", help="Região início-fim (1-based, inclusiva)")
+    parser.add_argument("--overlapping-cds", metavar="LOCUS_TAG",
+                        help="Ocorrências que se sobrepõem a esta CDS")
+    parser.add_argument("--min-k", type=int, help="k mínimo (tamanho do palíndromo, K do grampo...)")
+    parser.add_argument("--k", type=int, help="k exato")
+    args = parser.parse_args()
+
+    with ResultsDB(args.db) as db:
+        filters = {"min_k": args.min_k, "k": args.k}
+        if args.overlapping_cds:
+            try:
+                rows = db.query_cds(args.overlapping_cds, args.type, **filters)
+            except KeyError as e:
+                print(f"Erro: {e.args[0]}")
+                return 1
+        else:
+            accession = args.accession
+            if accession is None:
+                found = db.accessions()
+                if len(found) != 1:
+                    print(f"Erro: informe --accession ({', '.join(found) or 'banco vazio'})")
+                    return 1
+                accession = found[0]
+            start, end = 1, None
+            if args.range:
+                start, end = map(int, args.range.split("-"))
+            rows = db.query(accession, args.type, start, end, **filters)
+
+    print("start\tend\tk\tstrand\tname")
+    for start, end, k, strand, name in rows:
+        print(f"{start}\t{end}\t{k}\t{strand}\t{name or ''}")
+    print(f"# {len(rows)} ocorrências", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
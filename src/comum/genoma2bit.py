@@ -0,0 +1,269 @@
+"""
+Armazenamento do genoma em 2 bits por base, lido com mmap.
+
+O arquivo .2bit é construído uma vez a partir do FASTA (e refeito sempre
+que o tamanho ou a data de modificação do FASTA mudam). Cada base ocupa 2 bits (A=0, C=1, G=2, T=3, quatro por byte,
+a primeira nos bits mais altos); trechos de N (e de qualquer símbolo fora de
+ACGT) ficam numa tabela à parte de (início, tamanho).
+
+Formato:
+    "BC2B" | versão (u32) | deslocamento do diretório (u64)
+    | tamanho do FASTA (u64) | mtime_ns do FASTA (u64) | dados... | diretório
+    diretório: n_registros (u32) e, para cada registro:
+        tamanho_do_nome (u16) | nome | comprimento (u64)
+        | deslocamento das bases (u64) | deslocamento dos N (u64) | n_trechos_N (u64)
+    trechos de N: pares (início 0-based, tamanho) em u64
+
+Abrir o arquivo não lê as bases: fatiar um registro decodifica só o
+trecho pedido, direto do mapa de memória.
+"""
+
+from typing import Dict, Iterator, List, Optional, Tuple
+import bisect
+import mmap
+import os
+import struct
+
+import numpy as np
+
+import sequencias
+
+MAGIC = b"BC2B"
+VERSION = 2
+_HEADER = struct.Struct("<4sIQQQ")
+
+_DECODE = np.frombuffer(b"ACGTN", dtype=np.uint8)
+_SHIFTS = np.array([6, 4, 2, 0], dtype=np.uint8)
+
+
+def _iter_fasta(path: str, chunk_size: int = 1 << 20) -> Iterator[Tuple[str, Optional[bytes]]]:
+    """
+    Percorre um FASTA devolvendo (nome, pedaço) por registro; um pedaço None
+    marca o fim do registro. Nunca guarda mais que chunk_size bases.
+    """
+    name = None
+    parts: List[bytes] = []
+    size = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if line.startswith(b">"):
+                if name is not None:
+                    yield name, b"".join(parts)
+                    yield name, None
+                header = line[1:].split()
+                name = header[0].decode() if header else ""
+                parts, size = [], 0
+                continue
+            line = line.strip()
+            if name is None or not line:
+                continue
+            parts.append(line)
+            size += len(line)
+            if size >= chunk_size:
+                yield name, b"".join(parts)
+                parts, size = [], 0
+    if name is not None:
+        yield name, b"".join(parts)
+        yield name, None
+
+
+def build(fasta_path: str, out_path: str) -> None:
+    """
+    Converte um FASTA (um ou vários registros) para o formato .2bit.
+    """
+    directory = []
+    stat = os.stat(fasta_path)
+    tmp = f"{out_path}.{os.getpid()}.tmp"
+
+    with open(tmp, "wb") as out:
+        out.write(_HEADER.pack(MAGIC, VERSION, 0, stat.st_size, stat.st_mtime_ns))
+        name = None
+        for name_, chunk in _iter_fasta(fasta_path):
+            if name is None:
+                # Começo de um registro
+                name, length, seq_offset = name_, 0, out.tell()
+                carry = np.empty(0, dtype=np.uint8)
+                n_runs: List[Tuple[int, int]] = []
+            if chunk is not None:
+                codes = np.frombuffer(chunk.translate(sequencias.CODES), dtype=np.uint8)
+                # Trechos de N neste pedaço (juntando com o do pedaço anterior)
+                is_n = np.concatenate(([False], codes == 4, [False]))
+                edges = np.flatnonzero(is_n[1:] != is_n[:-1])
+                for s, e in zip(edges[::2].tolist(), edges[1::2].tolist()):
+                    if n_runs and n_runs[-1][0] + n_runs[-1][1] == length + s:
+                        n_runs[-1] = (n_runs[-1][0], n_runs[-1][1] + e - s)
+                    else:
+                        n_runs.append((length + s, e - s))
+                length += len(codes)
+                # Empacota de 4 em 4, guardando o resto para o próximo pedaço
+                codes = np.concatenate((carry, codes & 3))
+                full = len(codes) - len(codes) % 4
+                out.write(np.bitwise_or.reduce(codes[:full].reshape(-1, 4) << _SHIFTS,
+                                               axis=1).astype(np.uint8).tobytes())
+                carry = codes[full:]
+            else:
+                # Fim do registro: último byte incompleto e tabela de N
+                if len(carry):
+                    last = np.zeros(4, dtype=np.uint8)
+                    last[:len(carry)] = carry
+                    out.write(bytes([int(np.bitwise_or.reduce(last << _SHIFTS))]))
+                n_offset = out.tell()
+                out.write(np.array(n_runs, dtype="<u8").reshape(-1).tobytes())
+                directory.append((name, length, seq_offset, n_offset, len(n_runs)))
+                name = None
+
+        dir_offset = out.tell()
+        out.write(struct.pack("<I", len(directory)))
+        for name, length, seq_offset, n_offset, n_count in directory:
+            raw = name.encode()
+            out.write(struct.pack("<H", len(raw)) + raw)
+            out.write(struct.pack("<QQQQ", length, seq_offset, n_offset, n_count))
+        out.seek(0)
+        out.write(_HEADER.pack(MAGIC, VERSION, dir_offset, stat.st_size, stat.st_mtime_ns))
+
+    os.replace(tmp, out_path)
+
+
+class PackedSequence:
+    """
+    Um registro do .2bit. len() dá o comprimento; seq[a:b] decodifica só
+    aquele trecho e devolve uma str em maiúsculas (ACGTN).
+    """
+
+    def __init__(self, mm: mmap.mmap, name: str, length: int, seq_offset: int,
+                 n_starts: List[int], n_ends: List[int]):
+        self._mm = mm
+        self.id = name
+        self._length = length
+        self._offset = seq_offset
+        self._n_starts = n_starts
+        self._n_ends = n_ends
+
+    def __len__(self) -> int:
+        return self._length
+
+    def codes(self, start: int, stop: int) -> np.ndarray:
+        """
+        Códigos 0..4 das bases [start, stop) (0-based), decodificados sob demanda.
+        """
+        start, stop = max(0, start), min(self._length, stop)
+        if start >= stop:
+            return np.empty(0, dtype=np.uint8)
+        first, last = start // 4, (stop - 1) // 4
+        packed = np.frombuffer(self._mm, dtype=np.uint8, count=last - first + 1,
+                               offset=self._offset + first)
+        codes = ((packed[:, None] >> _SHIFTS) & 3).reshape(-1)
+        codes = codes[start - 4 * first:stop - 4 * first]
+        # Reaplica os trechos de N que cruzam a região
+        i = bisect.bisect_right(self._n_ends, start)
+        while i < len(self._n_starts) and self._n_starts[i] < stop:
+            codes[max(self._n_starts[i], start) - start:min(self._n_ends[i], stop) - start] = 4
+            i += 1
+        return codes
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._length)
+            if step != 1:
+                positions = range(start, stop, step)
+                if not positions:
+                    return ""
+                lo = min(positions[0], positions[-1])
+                window = self[lo:max(positions[0], positions[-1]) + 1]
+                return "".join(window[i - lo] for i in positions)
+            return _DECODE[self.codes(start, stop)].tobytes().decode("ascii")
+        if key < 0:
+            key += self._length
+        if not 0 <= key < self._length:
+            raise IndexError("posição fora da sequência")
+        return self[key:key + 1]
+
+    def __str__(self) -> str:
+        return self[:]
+
+
+class GenomeStore:
+    """
+    Arquivo .2bit aberto com mmap: registros acessíveis por nome.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:4] != MAGIC:
+            raise ValueError(f"{path} não é um arquivo .2bit deste projeto")
+        (_, version, dir_offset, self.source_size,
+         self.source_mtime_ns) = _HEADER.unpack_from(self._mm, 0)
+        if version != VERSION:
+            raise ValueError(f"Versão {version} do .2bit não suportada")
+
+        self.records: Dict[str, PackedSequence] = {}
+        (count,) = struct.unpack_from("<I", self._mm, dir_offset)
+        pos = dir_offset + 4
+        for _ in range(count):
+            (name_len,) = struct.unpack_from("<H", self._mm, pos)
+            name = self._mm[pos + 2:pos + 2 + name_len].decode()
+            pos += 2 + name_len
+            length, seq_offset, n_offset, n_count = struct.unpack_from("<QQQQ", self._mm, pos)
+            pos += 32
+            runs = np.frombuffer(self._mm, dtype="<u8", count=2 * n_count,
+                                 offset=n_offset).reshape(-1, 2)
+            n_starts = runs[:, 0].tolist()
+            n_ends = (runs[:, 0] + runs[:, 1]).tolist()
+            self.records[name] = PackedSequence(self._mm, name, length, seq_offset,
+                                                n_starts, n_ends)
+
+    def __getitem__(self, name: str) -> PackedSequence:
+        return self.records[name]
+
+    def find(self, accession: str) -> Optional[PackedSequence]:
+        """
+        Procura um registro pela accession (aceita ids no formato gi|...|gb|CP002157.1|).
+        """
+        for name, rec in self.records.items():
+            if name == accession or accession in name.split("|"):
+                return rec
+        return None
+
+    def first(self) -> PackedSequence:
+        """
+        Primeiro registro do arquivo (o genoma, quando o FASTA só tem um).
+        """
+        return next(iter(self.records.values()))
+
+
+def store_path(fasta_path: str) -> str:
+    """
+    Caminho do .2bit correspondente a um FASTA (mesmo nome, extensão .2bit).
+    """
+    return os.path.splitext(fasta_path)[0] + ".2bit"
+
+
+def _is_fresh(path: str, fasta_path: str) -> bool:
+    if not os.path.exists(path):
+        return False
+    stat = os.stat(fasta_path)
+    with open(path, "rb") as f:
+        header = f.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        return False
+    magic, version, _, size, mtime_ns = _HEADER.unpack(header)
+    return (magic, version, size, mtime_ns) == (MAGIC, VERSION, stat.st_size, stat.st_mtime_ns)
+
+
+_open_stores: Dict[Tuple[str, int], GenomeStore] = {}
+
+
+def open_genome(fasta_path: str) -> GenomeStore:
+    """
+    Abre o .2bit de um FASTA, construindo-o antes se ainda não existir ou
+    estiver desatualizado. Aberturas repetidas reaproveitam o mesmo mmap.
+    """
+    path = store_path(fasta_path)
+    if not _is_fresh(path, fasta_path):
+        build(fasta_path, path)
+    key = (os.path.abspath(path), os.stat(path).st_mtime_ns)
+    if key not in _open_stores:
+        _open_stores[key] = GenomeStore(path)
+    return _open_stores[key]
@@ -0,0 +1,232 @@
+"""
+Tabelas colunares de ocorrências (palíndromos e grampos, exatos e aproximados).
+
+Em vez de uma tupla ou um dicionário por ocorrência, cada tabela guarda só
+as coordenadas em vetores NumPy paralelos e uma referência à sequência de
+onde elas vieram (str, genoma2bit.PackedSequence...). O trecho de cada
+ocorrência só é lido da sequência quando alguém pede por ele.
+
+Indexar com um inteiro devolve uma ocorrência no formato antigo (tupla ou
+dicionário), então quem só itera não percebe a diferença. Indexar com uma
+fatia, um vetor de índices ou uma máscara booleana devolve outra tabela sobre
+a mesma sequência (fatias são vistas dos vetores, sem cópia).
+"""
+
+from typing import Dict, Iterator, List, Optional
+import csv
+
+import numpy as np
+
+
+class HitTable:
+    """
+    Base das tabelas: colunas inteiras de mesmo tamanho e a sequência de origem.
+    Subclasses definem COLUMNS, _record(i) e o formato do CSV. As colunas de
+    OPTIONAL_COLUMNS só existem quando passadas (None na classe) e, quando
+    existem, entram no fim de cada linha do CSV.
+    """
+
+    COLUMNS: tuple = ()
+    OPTIONAL_COLUMNS: tuple = ()
+    CSV_HEADER: List[str] = []
+
+    def __init__(self, sequence, **columns):
+        self.sequence = sequence
+        for name in self.COLUMNS:
+            setattr(self, name, np.asarray(columns[name], dtype=np.int64))
+        for name in self.OPTIONAL_COLUMNS:
+            if columns.get(name) is not None:
+                setattr(self, name, np.asarray(columns[name], dtype=np.int64))
+
+    def _optional(self) -> List[str]:
+        return [name for name in self.OPTIONAL_COLUMNS if getattr(self, name) is not None]
+
+    def _columns(self) -> Dict[str, np.ndarray]:
+        return {name: getattr(self, name) for name in self.COLUMNS + tuple(self._optional())}
+
+    def _derive(self, **columns) -> "HitTable":
+        """Nova tabela do mesmo tipo e sobre a mesma sequência."""
+        new = object.__new__(type(self))
+        new.__dict__.update(self.__dict__)
+        for name, values in columns.items():
+            setattr(new, name, values)
+        return new
+
+    def __len__(self) -> int:
+        return len(getattr(self, self.COLUMNS[0]))
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            n = len(self)
+            if key < 0:
+                key += n
+            if not 0 <= key < n:
+                raise IndexError("índice fora da tabela")
+            return self._record(int(key))
+        return self._derive(**{name: values[key] for name, values in self._columns().items()})
+
+    def __iter__(self) -> Iterator:
+        for i in range(len(self)):
+            yield self._record(i)
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} com {len(self)} ocorrências>"
+
+    def filter(self, mask: np.ndarray) -> "HitTable":
+        """
+        Ocorrências onde mask é verdadeira (ex.: hits.filter(hits.sizes >= 10)).
+        """
+        return self[np.asarray(mask, dtype=bool)]
+
+    def sorted(self, *keys: str) -> "HitTable":
+        """
+        Tabela ordenada pelas colunas keys (a primeira é a principal), com
+        ordenação estável. Para ordem decrescente, ordene por -coluna e use
+        os índices: hits[np.lexsort((-hits.sizes,))].
+        """
+        return self[np.lexsort([getattr(self, k) for k in reversed(keys)])]
+
+    def to_csv(self, out, batch: int = 10_000) -> None:
+        """
+        Grava a tabela em CSV (caminho ou arquivo aberto), em lotes, sem
+        materializar todas as sequências de uma vez.
+        """
+        if isinstance(out, str):
+            with open(out, "w", newline="") as f:
+                self.to_csv(f, batch)
+            return
+        w = csv.writer(out)
+        w.writerow(self.csv_header)
+        optional = self._optional()
+        for lo in range(0, len(self), batch):
+            part = self[lo:lo + batch]
+            if not optional:
+                w.writerows(part._csv_rows())
+                continue
+            extra = zip(*(part._optional_values(name) for name in optional))
+            w.writerows(row + values for row, values in zip(part._csv_rows(), extra))
+
+    @property
+    def csv_header(self) -> List[str]:
+        """CSV_HEADER mais as colunas opcionais presentes."""
+        return self.CSV_HEADER + self._optional()
+
+    def _optional_values(self, name: str) -> list:
+        """Valores de uma coluna opcional como aparecem no CSV e nos registros."""
+        return getattr(self, name).tolist()
+
+
+class PalindromeHits(HitTable):
+    """
+    Palíndromos maximais: início e fim (0-based, fim exclusivo) sobre a sequência.
+    Cada ocorrência é a tupla (início, fim, sequência), como antes.
+    """
+
+    COLUMNS = ("start", "end")
+    CSV_HEADER = ["start", "end", "length", "sequence"]
+
+    @property
+    def sizes(self) -> np.ndarray:
+        return self.end - self.start
+
+    def _record(self, i: int) -> tuple:
+        s, e = int(self.start[i]), int(self.end[i])
+        return s, e, self.sequence[s:e]
+
+    def longest(self) -> Optional[tuple]:
+        """
+        Primeira ocorrência de maior tamanho (None se a tabela estiver vazia).
+        """
+        if not len(self):
+            return None
+        return self[int(np.argmax(self.sizes))]
+
+    def _csv_rows(self):
+        for s, e in zip(self.start.tolist(), self.end.tolist()):
+            yield s + 1, e, e - s, self.sequence[s:e]
+
+
+class ApproxPalindromeHits(PalindromeHits):
+    """
+    Palíndromos aproximados: início e fim (0-based, fim exclusivo), tamanho do
+    espaçador central e número de pares que não pareiam. Cada ocorrência é a
+    tupla (início, fim, sequência, espaçador, mismatches).
+    """
+
+    COLUMNS = ("start", "end", "gap", "mismatches")
+    CSV_HEADER = ["start", "end", "length", "gap", "mismatches", "sequence"]
+
+    def _record(self, i: int) -> tuple:
+        return super()._record(i) + (int(self.gap[i]), int(self.mismatches[i]))
+
+    def _csv_rows(self):
+        for s, e, gap, mm in zip(self.start.tolist(), self.end.tolist(),
+                                 self.gap.tolist(), self.mismatches.tolist()):
+            yield s + 1, e, e - s, gap, mm, self.sequence[s:e]
+
+
+class HairpinHits(HitTable):
+    """
+    Grampos: início e fim 1-based (inclusivos) e tamanho do loop, com o
+    tamanho K do braço. Cada ocorrência é o dicionário de antes
+    (start, end, loop, length, substring, prefix, suffix).
+    """
+
+    COLUMNS = ("start", "end", "loop")
+    CSV_HEADER = ["start", "end", "length", "loop", "prefix", "suffix", "substring"]
+    # ΔG37 da haste e do loop (energia.py), em centésimos de kcal/mol;
+    # nos registros e no CSV aparece em kcal/mol
+    OPTIONAL_COLUMNS = ("energy",)
+    energy: Optional[np.ndarray] = None
+
+    def __init__(self, sequence, K: int, **columns):
+        super().__init__(sequence, **columns)
+        self.K = K
+
+    @property
+    def length(self) -> np.ndarray:
+        return self.end - self.start + 1
+
+    def _parts(self, s: int, e: int, loop: int) -> tuple:
+        K = self.K
+        return (self.sequence[s - 1:e], self.sequence[s - 1:s - 1 + K],
+                self.sequence[s - 1 + K + loop:e])
+
+    def _record(self, i: int) -> Dict:
+        s, e, loop = int(self.start[i]), int(self.end[i]), int(self.loop[i])
+        substring, prefix, suffix = self._parts(s, e, loop)
+        record = {"start": s, "end": e, "loop": loop, "length": e - s + 1,
+                  "substring": substring, "prefix": prefix, "suffix": suffix}
+        if self.energy is not None:
+            record["energy"] = round(int(self.energy[i]) / 100, 2)
+        return record
+
+    def _optional_values(self, name: str) -> list:
+        if name == "energy":
+            return [round(v / 100, 2) for v in self.energy.tolist()]
+        return super()._optional_values(name)
+
+    def _csv_rows(self):
+        for s, e, loop in zip(self.start.tolist(), self.end.tolist(), self.loop.tolist()):
+            substring, prefix, suffix = self._parts(s, e, loop)
+            yield s, e, e - s + 1, loop, prefix, suffix, substring
+
+
+class ApproxHairpinHits(HairpinHits):
+    """
+    Grampos com haste aproximada: as colunas de HairpinHits e o número de
+    pares da haste que não pareiam (mismatches). Pares G·T (wobble), quando
+    aceitos, não contam como mismatch.
+    """
+
+    COLUMNS = ("start", "end", "loop", "mismatches")
+    CSV_HEADER = HairpinHits.CSV_HEADER + ["mismatches"]
+
+    def _record(self, i: int) -> Dict:
+        record = super()._record(i)
+        record["mismatches"] = int(self.mismatches[i])
+        return record
+
+    def _csv_rows(self):
+        for row, mm in zip(super()._csv_rows(), self.mismatches.tolist()):
+            yield row + (mm,)
@@ -0,0 +1,181 @@
+"""
+Instrumentação leve: trechos cronometrados (spans) e contadores.
+
+Uso:
+    with perfil.span("report.k_sweep"):
+        ...
+    perfil.count("bases_scanned", len(seq))
+
+    @perfil.timed("generate_report")
+    def generate_report(...): ...
+
+Enquanto a instrumentação está desligada (padrão), span() devolve sempre o
+mesmo gerenciador de contexto vazio e count() só testa uma variável, então o
+custo fica em uma chamada de função por trecho. Para não pesar nos laços
+internos, os contadores são somados por chamada, não por base.
+
+Com enable(), cada span guarda início e duração (time.perf_counter_ns) e,
+ao final, dump() grava:
+    - "json": resumo por span (chamadas, total, mínimo, máximo) e contadores;
+    - "chrome": eventos no formato Trace Event (chrome://tracing, Perfetto).
+Os processos de paralelo.py medem do mesmo jeito quando o processo principal
+está medindo: cada tarefa devolve, junto do resultado, o que registrou
+(collect()), e o processo principal soma isso ao seu perfil (merge()). No
+trace do Chrome cada processo aparece com o seu pid.
+"""
+
+from typing import Dict, List, Optional, Tuple
+import atexit
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+
+FORMATS = ("json", "chrome")
+
+_enabled = False
+_origin_ns = 0
+_pid = os.getpid()
+_events: List[tuple] = []          # (nome, início_ns, duração_ns, pid, thread, args)
+_counters: Dict[str, int] = {}
+_NULL = contextlib.nullcontext()
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name: str, args: Dict):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        _events.append((self.name, self.start, end - self.start, _pid, threading.get_ident(),
+                        self.args))
+        return False
+
+
+def enabled() -> bool:
+    """
+    Indica se a instrumentação está ligada.
+    """
+    return _enabled
+
+
+def enable(out_path: Optional[str] = None, fmt: str = "json") -> None:
+    """
+    Liga a instrumentação. Com out_path, o resultado é gravado ao fim do
+    programa (inclusive quando ele termina com sys.exit).
+    """
+    global _enabled, _origin_ns, _pid
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato de perfil desconhecido: {fmt}")
+    _enabled = True
+    _origin_ns = time.perf_counter_ns()
+    _pid = os.getpid()
+    if out_path:
+        atexit.register(dump, out_path, fmt)
+
+
+def reset() -> None:
+    """
+    Descarta os spans e contadores já registrados.
+    """
+    _events.clear()
+    _counters.clear()
+
+
+def span(name: str, **args):
+    """
+    Gerenciador de contexto que cronometra um trecho. Os argumentos
+    nomeados aparecem no trace do Chrome (ex.: span("region", start=1)).
+    """
+    if not _enabled:
+        return _NULL
+    return _Span(name, args)
+
+
+def timed(name: str):
+    """
+    Decorador: cada chamada da função vira um span com o nome dado.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name: str, n: int = 1) -> None:
+    """
+    Soma n ao contador name.
+    """
+    if _enabled:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def collect() -> Tuple[List[tuple], Dict[str, int]]:
+    """
+    Devolve os spans e contadores registrados até aqui e os descarta (usado
+    nos processos do pool, para mandar o perfil de cada tarefa ao principal).
+    """
+    collected = (list(_events), dict(_counters))
+    reset()
+    return collected
+
+
+def merge(events: List[tuple], counters: Dict[str, int]) -> None:
+    """
+    Soma ao perfil deste processo o que outro processo devolveu por collect().
+    """
+    _events.extend(events)
+    for name, n in counters.items():
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def summary() -> Dict:
+    """
+    Resumo dos spans (por nome, na ordem da primeira ocorrência) e contadores.
+    """
+    spans: Dict[str, Dict] = {}
+    for name, _, duration, _, _, _ in _events:
+        s = spans.setdefault(name, {"calls": 0, "total_s": 0.0, "min_s": None, "max_s": 0.0})
+        seconds = duration / 1e9
+        s["calls"] += 1
+        s["total_s"] += seconds
+        s["min_s"] = seconds if s["min_s"] is None else min(s["min_s"], seconds)
+        s["max_s"] = max(s["max_s"], seconds)
+    return {"spans": spans, "counters": dict(_counters)}
+
+
+def chrome_trace() -> Dict:
+    """
+    Spans como eventos completos ("ph": "X") e contadores como um evento "C"
+    no fim, em microssegundos a partir de enable().
+    """
+    events = [{"name": name, "ph": "X", "pid": pid, "tid": tid,
+               "ts": (start - _origin_ns) / 1000, "dur": duration / 1000, "args": args}
+              for name, start, duration, pid, tid, args in _events]
+    if _counters:
+        events.append({"name": "counters", "ph": "C", "pid": _pid, "tid": threading.get_ident(),
+                       "ts": (time.perf_counter_ns() - _origin_ns) / 1000, "args": dict(_counters)})
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def dump(path: str, fmt: str = "json") -> None:
+    """
+    Grava o perfil em path, no formato "json" (resumo) ou "chrome" (trace).
+    """
+    data = chrome_trace() if fmt == "chrome" else summary()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, default=str)
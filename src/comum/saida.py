@@ -0,0 +1,90 @@
+"""
+Escrita incremental de resultados em CSV, TSV ou tabela Markdown.
+
+Cada linha é gravada assim que chega, e o arquivo é descarregado (flush) na
+primeira linha e depois a cada flush_interval segundos: os primeiros
+resultados aparecem logo, e a memória não cresce com o número de linhas.
+
+Uso:
+    with open_hit_writer("grampos.md", ["start", "end", "substring"]) as out:
+        for h in iter_hairpins(...):
+            out.write([h["start"], h["end"], h["substring"]])
+"""
+
+from typing import List, Optional, Sequence, TextIO
+import csv
+import os
+import sys
+import time
+
+FORMATS = ("csv", "tsv", "md")
+
+
+def format_from_path(path: str, default: str = "csv") -> str:
+    """
+    Formato pela extensão do arquivo (.csv, .tsv/.txt, .md); default se não reconhecer.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    return {".csv": "csv", ".tsv": "tsv", ".txt": "tsv", ".md": "md"}.get(ext, default)
+
+
+class HitWriter:
+    """
+    Grava linhas (listas de valores) num arquivo texto já aberto.
+    """
+
+    def __init__(self, out: TextIO, columns: Sequence[str], fmt: str = "csv",
+                 flush_interval: float = 0.5, close_out: bool = False):
+        if fmt not in FORMATS:
+            raise ValueError(f"Formato desconhecido: {fmt} (use {', '.join(FORMATS)})")
+        self.out = out
+        self.fmt = fmt
+        self.rows = 0
+        self.flush_interval = flush_interval
+        self._close_out = close_out
+        self._last_flush = time.monotonic()
+        if fmt == "md":
+            self._csv = None
+            self.out.write("| " + " | ".join(columns) + " |\n")
+            self.out.write("|" + "|".join("---" for _ in columns) + "|\n")
+        else:
+            # CSV no dialeto padrão do módulo csv (igual a save_hits_csv); TSV com \n
+            self._csv = (csv.writer(out) if fmt == "csv"
+                         else csv.writer(out, delimiter="\t", lineterminator="\n"))
+            self._csv.writerow(columns)
+
+    def write(self, row: Sequence) -> None:
+        if self._csv is not None:
+            self._csv.writerow(row)
+        else:
+            cells = (str(v).replace("|", "\\|") for v in row)
+            self.out.write("| " + " | ".join(cells) + " |\n")
+        self.rows += 1
+        now = time.monotonic()
+        if self.rows == 1 or now - self._last_flush >= self.flush_interval:
+            self.out.flush()
+            self._last_flush = now
+
+    def close(self) -> None:
+        self.out.flush()
+        if self._close_out:
+            self.out.close()
+
+    def __enter__(self) -> "HitWriter":
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        self.close()
+        return False
+
+
+def open_hit_writer(path: str, columns: List[str], fmt: Optional[str] = None,
+                    flush_interval: float = 0.5) -> HitWriter:
+    """
+    Abre um HitWriter para um caminho ("-" é a saída padrão). Sem fmt, o
+    formato vem da extensão do arquivo.
+    """
+    if path == "-":
+        return HitWriter(sys.stdout, columns, fmt or "tsv", flush_interval)
+    out = open(path, "w", newline="", encoding="utf-8")
+    return HitWriter(out, columns, fmt or format_from_path(path), flush_interval, close_out=True)
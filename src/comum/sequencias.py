@@ -0,0 +1,88 @@
+"""
+Normalização de sequências de DNA, compartilhada pelos dois trabalhos.
+
+Toda conversão é uma única chamada a bytes.translate (em C, sem objetos
+por base), feita uma vez na entrada:
+    - normalize/clean: maiúsculas e só ACGTN, apagando o resto (tabela de
+      deleção), como o antigo re.sub + upper() de grampos.clean;
+    - encode_bytes/encode: um código por base, A=0, C=1, G=2, T=3 e 4 para
+      qualquer outro caractere (N, IUPAC, lixo), mantendo as posições;
+    - revcomp: complemento reverso do buffer inteiro, numa tradução e uma
+      inversão.
+Os motores trabalham sobre esses buffers: comparar bases vira comparar
+códigos (pareiam quando a soma é 3), sem upper() nem complemento por base.
+"""
+
+from typing import Union
+import numpy as np
+
+Sequence = Union[str, bytes, bytearray, memoryview]
+
+# Códigos das bases; qualquer outro byte vira 4 (nunca pareia)
+CODES = bytearray([4]) * 256
+for _i, _b in enumerate(b"ACGT"):
+    CODES[_b] = _i
+    CODES[_b + 32] = _i  # minúsculas
+CODES = bytes(CODES)
+
+# Maiúsculas, apagando tudo que não é ACGTN
+UPPER = bytes.maketrans(b"acgtn", b"ACGTN")
+NON_DNA = bytes(b for b in range(256) if b not in b"ACGTNacgtn")
+
+COMPLEMENT = bytes.maketrans(b"ACGTNacgtn", b"TGCANtgcan")
+COMPLEMENT_STR = str.maketrans("ACGTNacgtn", "TGCANtgcan")
+
+
+def as_bytes(seq: Sequence) -> bytes:
+    """
+    A sequência como bytes (str vira ASCII; outros caracteres viram "?").
+    """
+    if isinstance(seq, str):
+        return seq.encode("ascii", "replace")
+    return bytes(seq)
+
+
+def normalize(seq: Sequence) -> bytes:
+    """
+    Bytes maiúsculos só com ACGTN. Exemplo: normalize("atcg123XYZ") = b"ATCG"
+    """
+    return as_bytes(seq).translate(UPPER, NON_DNA)
+
+
+def clean(seq: Sequence) -> str:
+    """
+    Como normalize, mas devolve str. Exemplo: clean("atcg123XYZ") = "ATCG"
+    """
+    return normalize(seq).decode("ascii")
+
+
+def encode_bytes(seq: Sequence) -> bytes:
+    """
+    Um código por base (0..3 para ACGT, 4 para o resto), na mesma ordem.
+    """
+    return as_bytes(seq).translate(CODES)
+
+
+def encode(seq: Sequence) -> np.ndarray:
+    """
+    Como encode_bytes, mas como vetor uint8 (sem cópia).
+    """
+    return np.frombuffer(encode_bytes(seq), dtype=np.uint8)
+
+
+def revcomp(seq: Sequence) -> Sequence:
+    """
+    Complemento reverso (str para str, bytes para bytes); caracteres fora de
+    ACGTN ficam como estão. Exemplo: revcomp("TGGTAA") = "TTACCA"
+    """
+    if isinstance(seq, str):
+        return seq.translate(COMPLEMENT_STR)[::-1]
+    return as_bytes(seq).translate(COMPLEMENT)[::-1]
+
+
+def revcomp_codes(codes: np.ndarray) -> np.ndarray:
+    """
+    Complemento reverso de um vetor de códigos (4 continua 4).
+    """
+    codes = np.asarray(codes, dtype=np.uint8)
+    return np.where(codes < 4, 3 - codes, codes).astype(np.uint8)[::-1]
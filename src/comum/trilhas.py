@@ -0,0 +1,191 @@
+"""
+Trilhas de densidade por janelas (palíndromos, grampos e GC) para
+navegadores de genoma.
+
+Cada trilha é uma soma de prefixo sobre o registro inteiro, montada uma vez:
+    - ocorrências: prefixo[i] = número de inícios em [0, i);
+    - GC: prefixos de bases G/C e de bases ACGT (N não conta).
+As ocorrências e as bases podem chegar em blocos (add_starts e add_gc
+acumulam contagens por base); a soma de prefixo é montada na primeira consulta.
+Qualquer janela [a, b) sai então em O(1) (prefixo[b] - prefixo[a]), e todas
+as janelas de uma resolução saem de uma vez, com indexação vetorial. Várias
+resoluções (1 kb, 10 kb, 100 kb...) não varrem o genoma de novo.
+
+Exporta bedGraph (chrom, início 0-based, fim, valor) e wig (fixedStep,
+início 1-based), com um registro por cromossomo no mesmo arquivo. Com passo
+menor que a janela, cada valor (da janela inteira) é mostrado só nas `step`
+primeiras bases dela, para que os intervalos dos arquivos não se sobreponham.
+"""
+
+from typing import Dict, Iterable, Optional, Tuple
+import os
+
+import numpy as np
+
+FORMATS = ("bedgraph", "wig")
+EXTENSIONS = {"bedgraph": ".bedGraph", "wig": ".wig"}
+
+
+class DensityTracks:
+    """
+    Somas de prefixo das trilhas de um registro (cromossomo).
+    """
+
+    def __init__(self, chrom: str, length: int):
+        self.chrom = chrom
+        self.length = length
+        self._counts: Dict[str, np.ndarray] = {}   # Contagem por base de cada trilha
+        self._prefix: Dict[str, np.ndarray] = {}   # Somas de prefixo já montadas
+
+    def __len__(self) -> int:
+        return self.length
+
+    @staticmethod
+    def _cumulative(values: np.ndarray) -> np.ndarray:
+        prefix = np.zeros(len(values) + 1, dtype=np.int32)
+        np.cumsum(values, out=prefix[1:])
+        return prefix
+
+    def _add(self, name: str, offset: int, values: np.ndarray) -> None:
+        counts = self._counts.get(name)
+        if counts is None:
+            counts = self._counts[name] = np.zeros(self.length, dtype=np.int32)
+        counts[offset:offset + len(values)] += values
+        self._prefix.pop(name, None)
+
+    def _prefix_of(self, name: str) -> np.ndarray:
+        if name not in self._prefix:
+            self._prefix[name] = self._cumulative(self._counts[name])
+        return self._prefix[name]
+
+    def add_starts(self, name: str, starts: Iterable[int]) -> None:
+        """
+        Soma à trilha de ocorrências as posições de início (0-based) dadas;
+        pode ser chamada várias vezes, um bloco de posições por vez.
+        """
+        starts = np.asarray(starts, dtype=np.int64)
+        if not len(starts):
+            self._add(name, 0, np.zeros(0, dtype=np.int32))
+            return
+        lo = int(starts.min())
+        self._add(name, lo, np.bincount(starts - lo))
+
+    def add_gc(self, codes: np.ndarray, offset: int = 0) -> None:
+        """
+        Soma à trilha de conteúdo GC os códigos das bases (A=0, C=1, G=2, T=3,
+        outros=4) de um trecho que começa em offset (0-based).
+        """
+        codes = np.asarray(codes, dtype=np.uint8)
+        self._add("gc", offset, (codes == 1) | (codes == 2))
+        self._add("acgt", offset, codes < 4)
+
+    @property
+    def names(self) -> Tuple[str, ...]:
+        return tuple(name for name in self._counts if name != "acgt")
+
+    def count(self, name: str, start: int, end: int) -> int:
+        """
+        Ocorrências que começam em [start, end) (0-based); para "gc", bases G/C.
+        """
+        prefix = self._prefix_of(name)
+        start, end = max(0, start), min(self.length, end)
+        return int(prefix[end] - prefix[start]) if end > start else 0
+
+    def gc(self, start: int, end: int) -> Optional[float]:
+        """
+        Fração GC das bases ACGT de [start, end); None se não houver nenhuma.
+        """
+        acgt = self.count("acgt", start, end)
+        return self.count("gc", start, end) / acgt if acgt else None
+
+    def windows(self, name: str, window: int, step: Optional[int] = None,
+                per: int = 1000) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Valores de todas as janelas [início, início + window) a cada step bases
+        (a última é cortada no fim do registro).
+
+        Returns:
+            tuple: (inícios, fins, valores); ocorrências por `per` bases, ou a
+                fração GC (NaN em janelas só com N)
+        """
+        if window < 1 or (step is not None and step < 1):
+            raise ValueError("window e step devem ser 1 ou maiores")
+        step = step or window
+        starts = np.arange(0, self.length, step, dtype=np.int64)
+        ends = np.minimum(starts + window, self.length)
+        prefix = self._prefix_of(name)
+        counts = (prefix[ends] - prefix[starts]).astype(np.float64)
+        if name == "gc":
+            acgt = self._prefix_of("acgt")
+            bases = (acgt[ends] - acgt[starts]).astype(np.float64)
+            values = np.divide(counts, bases, out=np.full(len(counts), np.nan), where=bases > 0)
+        else:
+            values = counts * per / (ends - starts)
+        return starts, ends, values
+
+
+def _format(values: np.ndarray) -> np.ndarray:
+    return np.char.mod("%.6g", values)
+
+
+def write_bedgraph(tracks: Iterable[DensityTracks], name: str, path: str, window: int,
+                   step: Optional[int] = None, per: int = 1000, description: str = "") -> None:
+    """
+    Grava a trilha `name` de cada registro em bedGraph (janelas sem valor,
+    como GC só de N, ficam de fora).
+    """
+    with open(path, "w", encoding="utf-8") as out:
+        out.write(f'track type=bedGraph name="{name}_{window}" description="{description or name}"\n')
+        for track in tracks:
+            starts, _, values = track.windows(name, window, step, per)
+            ends = np.minimum(starts + min(window, step or window), track.length)
+            keep = ~np.isnan(values)
+            lines = np.char.add(np.char.add(np.char.add(f"{track.chrom}\t", starts[keep].astype(str)),
+                                            np.char.add("\t", ends[keep].astype(str))),
+                                np.char.add("\t", _format(values[keep])))
+            if len(lines):
+                out.write("\n".join(lines.tolist()))
+                out.write("\n")
+
+
+def write_wig(tracks: Iterable[DensityTracks], name: str, path: str, window: int,
+              step: Optional[int] = None, per: int = 1000, description: str = "") -> None:
+    """
+    Grava a trilha `name` de cada registro em wig fixedStep (span = o menor
+    entre janela e passo; janelas sem valor ficam com 0).
+    """
+    step = step or window
+    with open(path, "w", encoding="utf-8") as out:
+        out.write(f'track type=wiggle_0 name="{name}_{window}" description="{description or name}"\n')
+        for track in tracks:
+            _, _, values = track.windows(name, window, step, per)
+            out.write(f"fixedStep chrom={track.chrom} start=1 step={step} span={min(window, step)}\n")
+            if len(values):
+                out.write("\n".join(_format(np.nan_to_num(values)).tolist()))
+                out.write("\n")
+
+
+def export(tracks: Iterable[DensityTracks], out_dir: str, windows: Iterable[int],
+           formats: Iterable[str] = FORMATS, step_fraction: float = 1.0,
+           per: int = 1000, prefix: str = "") -> list:
+    """
+    Grava todas as trilhas em todas as resoluções e formatos pedidos, como
+    {out_dir}/{prefix}{trilha}_{janela}.{bedGraph|wig}.
+
+    Returns:
+        list: Caminhos gravados
+    """
+    tracks = list(tracks)
+    os.makedirs(out_dir, exist_ok=True)
+    names = dict.fromkeys(name for track in tracks for name in track.names)
+    written = []
+    for window in windows:
+        step = max(1, int(window * step_fraction))
+        for name in names:
+            description = "fração GC" if name == "gc" else f"{name} por {per} bp"
+            for fmt in formats:
+                path = os.path.join(out_dir, f"{prefix}{name}_{window}{EXTENSIONS[fmt]}")
+                writer = write_bedgraph if fmt == "bedgraph" else write_wig
+                writer(tracks, name, path, window, step, per, description)
+                written.append(path)
+    return written
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+aproximados.py
+
+Palíndromos maximais aproximados: com até k pares que não pareiam
+(mismatches) e/ou com um espaçador central de até g bases.
+
+A base é uma consulta de extensão comum (LCE): quantas bases a partir de
+T[i] coincidem com as bases a partir de T[j]. Sobre T = S + $ + rc(S) + #
+(a sequência, um separador, o complemento reverso e um terminador), o braço
+direito de um palíndromo em S a partir de i e o braço esquerdo lido para
+trás a partir de i-1 viram uma LCE entre S[i] e rc(S)[n-i]. A LCE sai em
+O(1) de um vetor de sufixos (SA), do vetor LCP e de uma tabela esparsa de
+mínimos (RMQ) sobre o LCP.
+
+Com a LCE em O(1), cada centro é estendido "aos saltos": uma LCE, pula o
+par que não pareia, outra LCE... no máximo k+1 consultas por centro e por
+tamanho de espaçador, O(n·(k+1)·(g+1)) no total. As consultas de todos os
+centros são feitas de uma vez em vetores NumPy.
+
+O SA é construído por duplicação de prefixos (ranks de T[i:i+2^l] para
+l = 0, 1, 2...), com np.unique em cada rodada; os próprios ranks de cada
+nível dão o LCP entre sufixos vizinhos por descida binária, também vetorizada.
+As extensões são limitadas a max_length/2 bases por braço, como na
+varredura do genoma inteiro, e sequências longas são processadas em blocos
+com contexto suficiente para que o resultado não dependa dos blocos.
+"""
+
+import numpy as np
+
+import bacter_final
+import perfil
+import sequencias
+from ocorrencias import ApproxPalindromeHits
+
+
+class LCEIndex:
+    """
+    Consultas de extensão comum (LCE) em O(1) sobre um vetor de símbolos.
+
+    Símbolos negativos nunca coincidem com nada (cada um vira um símbolo
+    único), o que serve para N e para os separadores.
+    """
+
+    def __init__(self, symbols, cap=None):
+        """
+        Args:
+            symbols (np.ndarray): Vetor de inteiros (o texto T)
+            cap (int, optional): Maior LCE que interessa; as respostas
+                saem limitadas a cap (constrói menos níveis)
+        """
+        text = np.asarray(symbols, dtype=np.int64).copy()
+        n = len(text)
+        self.n = n
+        self.cap = n if cap is None else min(cap, n)
+        # Cada símbolo negativo vira um símbolo único, maior que os demais
+        unique = text < 0
+        text[unique] = text.max(initial=0) + 1 + np.arange(int(unique.sum()))
+
+        with perfil.span("lce.suffix_array", n=n):
+            self.levels = self._rank_levels(text)
+            self.sa = np.argsort(self.levels[-1], kind="stable").astype(np.int64)
+            self.rank = np.empty(n, dtype=np.int64)
+            self.rank[self.sa] = np.arange(n)
+        with perfil.span("lce.lcp"):
+            lcp = np.zeros(n, dtype=np.int32)
+            if n > 1:
+                lcp[1:] = self._descend(self.sa[:-1], self.sa[1:])
+            self.lcp = lcp
+        with perfil.span("lce.rmq"):
+            self.table = self._sparse_table(lcp)
+
+    def _rank_levels(self, text):
+        """
+        Ranks densos de T[i:i+2^l] para cada nível l, até os ranks ficarem
+        todos distintos ou o tamanho 2^l passar de cap.
+        """
+        n = self.n
+        rank = np.unique(text, return_inverse=True)[1].astype(np.int32).reshape(-1)
+        levels = [rank]
+        h = 1
+        while h < self.cap and int(rank.max(initial=0)) < n - 1:
+            second = np.full(n, -1, dtype=np.int64)
+            second[:n - h] = rank[h:]
+            key = rank.astype(np.int64) * (n + 1) + (second + 1)
+            rank = np.unique(key, return_inverse=True)[1].astype(np.int32).reshape(-1)
+            levels.append(rank)
+            h *= 2
+        return levels
+
+    def _descend(self, i, j):
+        """
+        LCE(i, j) (limitada a cap) pelos ranks de cada nível: do maior
+        bloco para o menor, avança 2^l sempre que os blocos coincidem.
+        """
+        n = self.n
+        length = np.zeros(len(i), dtype=np.int64)
+        for level in range(len(self.levels) - 1, -1, -1):
+            rank = self.levels[level]
+            a, b = i + length, j + length
+            inside = (a < n) & (b < n)
+            a, b = np.minimum(a, n - 1), np.minimum(b, n - 1)
+            length += np.where(inside & (rank[a] == rank[b]), 1 << level, 0)
+        return np.minimum(length, self.cap)
+
+    @staticmethod
+    def _sparse_table(lcp):
+        """table[l][p] = min(lcp[p:p+2^l])."""
+        table = [lcp]
+        width = 1
+        while 2 * width <= len(lcp):
+            prev = table[-1]
+            table.append(np.minimum(prev[:len(prev) - width], prev[width:]))
+            width *= 2
+        return table
+
+    def lce(self, i, j):
+        """
+        Extensões comuns de T[i:] e T[j:] (vetores de posições), limitadas a cap.
+        """
+        i = np.asarray(i, dtype=np.int64)
+        j = np.asarray(j, dtype=np.int64)
+        ri, rj = self.rank[i], self.rank[j]
+        lo = np.minimum(ri, rj) + 1
+        hi = np.maximum(ri, rj)
+        same = ri == rj
+        lo = np.where(same, hi, lo)  # evita intervalo vazio; resposta trocada abaixo
+        span = hi - lo + 1
+        level = np.zeros(len(span), dtype=np.int64)
+        if len(span):
+            level = np.floor(np.log2(span)).astype(np.int64)
+        out = np.empty(len(span), dtype=np.int64)
+        for lv in np.unique(level).tolist():
+            sel = level == lv
+            row = self.table[lv]
+            out[sel] = np.minimum(row[lo[sel]], row[hi[sel] - (1 << lv) + 1])
+        out = np.where(same, np.minimum(self.n - i, self.cap), out)
+        return np.minimum(out, self.cap)
+
+
+def _palindrome_text(codes):
+    """
+    T = S + $ + rc(S) + # como vetor de símbolos; N (código 4) e os
+    separadores são negativos, para nunca coincidirem.
+    """
+    s = np.frombuffer(codes, dtype=np.uint8)
+    rc = sequencias.revcomp_codes(s)
+    text = np.concatenate([s, [4], rc, [4]]).astype(np.int64)
+    text[text > 3] = -1
+    return text
+
+
+def _extend(index, n, centers, gap, mismatches, cap):
+    """
+    Estende aos saltos os palíndromos com braço esquerdo terminando em
+    centers-1 e braço direito começando em centers+gap.
+
+    Returns:
+        tuple: (braço, mismatches) para cada centro; braço 0 quando nem o
+            primeiro par pareia
+    """
+    rc0 = n + 1  # T[rc0 + p] = complemento de S[n-1-p]
+    arm = np.zeros(len(centers), dtype=np.int64)
+    used = np.zeros(len(centers), dtype=np.int64)
+    best = np.zeros(len(centers), dtype=np.int64)
+    best_used = np.zeros(len(centers), dtype=np.int64)
+    active = np.ones(len(centers), dtype=bool)
+
+    for step in range(mismatches + 1):
+        right = centers + gap + arm
+        left = centers - 1 - arm  # próxima base do braço esquerdo, em S
+        ok = active & (right < n) & (left >= 0)
+        lengths = np.zeros(len(centers), dtype=np.int64)
+        if ok.any():
+            lengths[ok] = index.lce(right[ok], rc0 + (n - 1 - left[ok]))
+        arm += lengths
+        # O palíndromo termina sempre num par que pareia
+        grew = lengths > 0
+        best = np.where(grew, arm, best)
+        best_used = np.where(grew, used, best_used)
+        active &= arm < cap
+        if step == mismatches:
+            break
+        # Pula o par que não pareia, se ainda houver bases dos dois lados
+        skip = active & (centers + gap + arm < n) & (centers - 1 - arm >= 0)
+        arm += skip
+        used += skip
+        active = skip & (arm < cap)
+
+    return np.minimum(best, cap), best_used
+
+
+def find_approximate_palindromes(seq, mismatches=0, max_gap=0, min_length=10,
+                                 max_length=1000, tile_size=1 << 20):
+    """
+    Encontra os palíndromos maximais com até `mismatches` pares que não
+    pareiam e espaçador central de 0 a max_gap bases.
+
+    Para cada centro e cada espaçador, o palíndromo vai até onde dá com
+    no máximo `mismatches` mismatches, terminando num par que pareia. Com
+    espaçador g >= 2, só entra se as bases das pontas do espaçador não
+    pareiam (senão é o mesmo palíndromo com espaçador g-2 e braço maior).
+
+    Args:
+        seq (str): Sequência de DNA (ou qualquer objeto fatiável em str)
+        mismatches (int): Máximo de pares que não pareiam
+        max_gap (int): Maior espaçador central
+        min_length (int): Tamanho mínimo (2·braço + espaçador) para entrar
+        max_length (int): Maior tamanho garantido; cada braço para em max_length/2
+        tile_size (int): Centros por bloco (cada bloco tem seu índice LCE)
+
+    Returns:
+        ApproxPalindromeHits: Tabela ordenada por início e fim (0-based, fim exclusivo)
+    """
+    if mismatches < 0 or max_gap < 0:
+        raise ValueError("mismatches e max_gap devem ser 0 ou maiores")
+    if max_length < 2 or max_length % 2:
+        raise ValueError("max_length deve ser par e maior ou igual a 2")
+    half = max_length // 2
+    context = half + max_gap
+    total = len(seq)
+    columns = {"start": [], "end": [], "gap": [], "mismatches": []}
+
+    for a in range(0, max(total, 1), tile_size):
+        b = min(total, a + tile_size)
+        lo, hi = max(0, a - context), min(total, b + context)
+        codes = bacter_final.encode_sequence(seq[lo:hi])
+        n = len(codes)
+        if n < 2:
+            continue
+        codes_arr = np.frombuffer(codes, dtype=np.uint8)
+        index = LCEIndex(_palindrome_text(codes), cap=half)
+        perfil.count("bases_scanned", b - a)
+
+        for gap in range(max_gap + 1):
+            # Centro = primeira base do espaçador (ou a fronteira, sem espaçador)
+            centers = np.arange(max(a, 1), b, dtype=np.int64) - lo
+            centers = centers[centers + gap < n]
+            if gap >= 2:
+                inner_l, inner_r = codes_arr[centers], codes_arr[centers + gap - 1]
+                pairs = (inner_l < 4) & (inner_l.astype(np.int64) + inner_r == 3)
+                centers = centers[~pairs]
+            perfil.count("centers_tested", len(centers))
+            arm, used = _extend(index, n, centers, gap, mismatches, half)
+            keep = (arm > 0) & (2 * arm + gap >= min_length)
+            starts = centers[keep] - arm[keep] + lo
+            columns["start"].append(starts)
+            columns["end"].append(starts + 2 * arm[keep] + gap)
+            columns["gap"].append(np.full(int(keep.sum()), gap, dtype=np.int64))
+            columns["mismatches"].append(used[keep])
+
+    if columns["start"]:
+        columns = {name: np.concatenate(parts) for name, parts in columns.items()}
+    else:
+        columns = {name: np.empty(0, dtype=np.int64) for name in columns}
+    hits = ApproxPalindromeHits(seq, **columns)
+    perfil.count("palindromes_found", len(hits))
+    return hits.sorted("start", "end")
@@ -21,32 +21,58 @@ Uso:
 
 import sys
 import argparse
+import contextlib
+import hashlib
 import os
+import pickle
 from collections import defaultdict
-from Bio import SeqIO
-from io import StringIO
+
+import numpy as np
+
+# Módulos compartilhados entre os trabalhos (src/comum)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "comum"))
+import genoma2bit
+import anotacoes
+import banco
+import enzimas
+import perfil
+import saida
+import sequencias
+from ocorrencias import PalindromeHits
 
 # URLs removidas - programa agora usa arquivos locais
 
-# Mapa de complemento para DNA
-COMP = str.maketrans("ACGTacgt", "TGCAtgca")
+# Arquivos de dados (relativos a src/trabalho1)
+FASTA_PATH = os.path.join("..", "..", "data", "maribacter_HTCC2170.fasta")
+GB_PATH = os.path.join("..", "..", "data", "maribacter_HTCC2170.gb")
+REPORT_CACHE_DIR = os.path.join("..", "..", "data", "cache", "relatorio")
+DB_PATH = os.path.join("..", "..", "results", "resultados.sqlite")
 
 def rev_comp(s: str) -> str:
     """Retorna o complemento reverso de uma sequência de DNA."""
-    return s.translate(COMP)[::-1]
+    return sequencias.revcomp(s)
 
 def is_palindrome(s: str) -> bool:
     """Verifica se uma sequência é um palíndromo (igual ao seu complemento reverso)."""
-    return s.upper() == rev_comp(s).upper()
+    s = s.upper()
+    return s == sequencias.revcomp(s)
 
+@perfil.timed("load_genome_data")
 def load_genome_data():
-    """Carrega os dados do genoma dos arquivos locais."""
+    """
+    Carrega os dados do genoma dos arquivos locais.
+    
+    A sequência vem do arquivo .2bit (construído do FASTA na primeira vez),
+    aberto com mmap: fatiar sequence[a:b] decodifica só aquele trecho.
+    As anotações vêm do .anot (cópia compacta do GenBank, refeita quando o
+    .gb muda), também mapeado na memória, em vez de reler o GenBank inteiro.
+    """
     print("Carregando dados do genoma Maribacter sp. HTCC2170 dos arquivos locais...")
     
     try:
         # Caminhos para os arquivos de dados na nova estrutura
-        fasta_path = os.path.join("..", "..", "data", "maribacter_HTCC2170.fasta")
-        gb_path = os.path.join("..", "..", "data", "maribacter_HTCC2170.gb")
+        fasta_path = FASTA_PATH
+        gb_path = GB_PATH
         
         # Carregar arquivo FASTA
         if not os.path.exists(fasta_path):
@@ -55,8 +81,8 @@ def load_genome_data():
             print("Certifique-se de que o arquivo está no diretório data/")
             sys.exit(1)
         
-        with open(fasta_path, "r", encoding="utf-8") as f:
-            fasta_record = next(SeqIO.parse(f, "fasta"))
+        with perfil.span("load_genome_data.sequence"):
+            sequence = genoma2bit.open_genome(fasta_path).first()
         
         # Carregar arquivo GenBank
         if not os.path.exists(gb_path):
@@ -65,11 +91,10 @@ def load_genome_data():
             print("Certifique-se de que o arquivo está no diretório data/")
             sys.exit(1)
         
-        with open(gb_path, "r", encoding="utf-8") as f:
-            gb_record = next(SeqIO.parse(f, "genbank"))
+        with perfil.span("load_genome_data.annotations"):
+            gb_record = anotacoes.load_annotations(gb_path)
         
-        sequence = str(fasta_record.seq)
-        print(f"Genoma carregado: {fasta_record.id}, comprimento {len(sequence):,} bp")
+        print(f"Genoma carregado: {sequence.id}, comprimento {len(sequence):,} bp")
         return sequence, gb_record
         
     except Exception as e:
@@ -77,72 +102,630 @@ def load_genome_data():
         print("Certifique-se de que os arquivos maribacter_HTCC2170.fasta e maribacter_HTCC2170.gb estão presentes.")
         sys.exit(1)
 
-def find_maximal_palindromes_of_length_k(seq, k):
+def encode_sequence(seq):
+    """
+    Codifica uma sequência de DNA em bytes com códigos 0..3 (ACGT) e 4 (outros:
+    N, IUPAC, lixo, que nunca formam par), com a tabela de sequencias.py.
+    
+    Args:
+        seq (str | bytes): Sequência de DNA
+        
+    Returns:
+        bytes: Um código por base, na mesma ordem da sequência
+    """
+    return sequencias.encode_bytes(seq)
+
+def rc_palindrome_radii(codes):
+    """
+    Calcula, em tempo linear (Manacher), o raio do palíndromo maximal
+    (complemento reverso) centrado em cada fronteira entre duas bases.
+    
+    Só existem palíndromos de tamanho par sobre ACGT (nenhuma base é o
+    próprio complemento), então os centros são as posições c = 1..n-1,
+    entre codes[c-1] e codes[c]. O palíndromo em c ocupa [c-r, c+r).
+    
+    Args:
+        codes (bytes): Sequência codificada por encode_sequence
+        
+    Returns:
+        list: radii[c] = metade do tamanho do palíndromo maximal no centro c
+    """
+    n = len(codes)
+    radii = [0] * (n + 1)
+    center, right = 0, 0  # palíndromo que chega mais à direita: [.., right)
+    
+    for c in range(1, n):
+        r = 0
+        if c < right:
+            # Reaproveita o raio do centro espelhado dentro do palíndromo atual
+            r = min(radii[2 * center - c], right - c)
+        
+        while c - 1 - r >= 0 and c + r < n:
+            a = codes[c - 1 - r]
+            if a > 3 or a + codes[c + r] != 3:
+                break
+            r += 1
+        
+        radii[c] = r
+        if c + r > right:
+            center, right = c, c + r
+    
+    return radii
+
+def build_palindrome_index(seq):
+    """
+    Constrói, numa única varredura, o índice de palíndromos maximais de uma região.
+    
+    O índice responde "todos os maximais de tamanho k" e o histograma de
+    tamanhos sem varrer a sequência de novo, para qualquer número de k.
+    
+    Args:
+        seq (str): Sequência de DNA
+        
+    Returns:
+        dict: {tamanho: [inícios_0based em ordem crescente]}
+    """
+    with perfil.span("build_palindrome_index", bases=len(seq)):
+        radii = rc_palindrome_radii(encode_sequence(seq))
+        index = defaultdict(list)
+        
+        for c, r in enumerate(radii):
+            if r:  # Pelo menos 2 bases
+                index[2 * r].append(c - r)
+    
+    perfil.count("bases_scanned", len(seq))
+    perfil.count("centers_tested", len(seq))
+    perfil.count("palindromes_found", sum(len(starts) for starts in index.values()))
+    return dict(index)
+
+def palindromes_from_index(seq, index):
+    """
+    Monta a tabela de palíndromos de um índice, ordenada por início e fim.
+    
+    Só as coordenadas são guardadas; a sequência de cada palíndromo é lida
+    de seq quando pedida (hits[i] devolve a tupla (início, fim, sequência)).
+    
+    Args:
+        seq (str): Sequência de DNA usada para construir o índice
+        index (dict): Índice de build_palindrome_index
+        
+    Returns:
+        PalindromeHits: Tabela colunar em coordenadas 0-based
+    """
+    if not index:
+        return PalindromeHits(seq, start=[], end=[])
+    starts = np.concatenate([np.asarray(s, dtype=np.int64) for s in index.values()])
+    ends = starts + np.repeat(np.fromiter(index.keys(), dtype=np.int64, count=len(index)),
+                              [len(s) for s in index.values()])
+    
+    # Cada centro gera um intervalo distinto; basta ordenar por início e fim
+    order = np.lexsort((ends, starts))
+    return PalindromeHits(seq, start=starts[order], end=ends[order])
+
+def palindrome_size_histogram(index):
+    """
+    Retorna a distribuição dos palíndromos maximais por tamanho.
+    
+    Args:
+        index (dict): Índice de build_palindrome_index
+        
+    Returns:
+        dict: {tamanho: quantidade}
+    """
+    return {size: len(starts) for size, starts in index.items()}
+
+def find_maximal_palindromes_of_length_k(seq, k, index=None):
     """
     Encontra todos os palíndromos maximais de tamanho exato k.
     
     Args:
         seq (str): Sequência de DNA
         k (int): Tamanho desejado dos palíndromos
+        index (dict, optional): Índice já construído para seq (evita nova varredura)
         
     Returns:
         dict: {sequência_palíndromo: [posições_início_1based]}
     """
-    n = len(seq)
-    found_positions = defaultdict(list)
+    if index is None:
+        index = build_palindrome_index(seq)
     
-    for i in range(0, n - k + 1):
-        sub = seq[i:i+k]
-        if is_palindrome(sub):
-            # Verificar se é maximal (não pode ser estendido)
-            can_extend = False
-            if i > 0 and i + k < n:
-                # Tentar estender para a esquerda e direita
-                extended = seq[i-1:i+k+1]
-                if is_palindrome(extended):
-                    can_extend = True
-            
-            if not can_extend:
-                found_positions[sub.upper()].append(i + 1)  # 1-based
+    found_positions = defaultdict(list)
+    for i in index.get(k, []):
+        found_positions[seq[i:i+k].upper()].append(i + 1)  # 1-based
     
     return found_positions
 
-def find_all_maximal_palindromes(seq):
+def find_all_maximal_palindromes(seq, index=None):
     """
     Encontra todos os palíndromos maximais de qualquer tamanho.
     
+    Usa rc_palindrome_radii sobre a sequência codificada, em tempo linear,
+    o que permite varrer o genoma inteiro e não só janelas pequenas.
+    
     Args:
         seq (str): Sequência de DNA
+        index (dict, optional): Índice já construído para seq (evita nova varredura)
         
     Returns:
-        list: Lista de tuplas (início, fim, sequência) em coordenadas 0-based
+        PalindromeHits: Tabela de (início, fim, sequência) em coordenadas 0-based
     """
-    palindromes = []
-    n = len(seq)
+    if index is None:
+        index = build_palindrome_index(seq)
+    return palindromes_from_index(seq, index)
+
+def iter_fasta_chunks(path, chunk_size):
+    """
+    Lê um arquivo FASTA (com um ou vários registros) em pedaços de até
+    chunk_size bases, sem carregar a sequência inteira na memória.
     
-    # Palíndromos de comprimento ímpar (centro único)
-    for i in range(n):
-        l, r = i, i
-        while l >= 0 and r < n and seq[l].upper() == rev_comp(seq[r]).upper():
-            l -= 1
-            r += 1
-        # O palíndromo maximal é de l+1 a r-1
-        if r - l > 1:  # Pelo menos 2 bases
-            palindromes.append((l + 1, r, seq[l+1:r]))
-    
-    # Palíndromos de comprimento par (centro entre duas bases)
-    for i in range(n - 1):
-        l, r = i, i + 1
-        while l >= 0 and r < n and seq[l].upper() == rev_comp(seq[r]).upper():
-            l -= 1
-            r += 1
-        if r - l > 2:  # Pelo menos 4 bases
-            palindromes.append((l + 1, r, seq[l+1:r]))
+    Args:
+        path (str): Caminho do arquivo FASTA
+        chunk_size (int): Número máximo de bases por pedaço
+        
+    Yields:
+        tuple: (id_do_registro, pedaço, último_pedaço_do_registro)
+    """
+    record_id = None
+    parts, size = [], 0
+    pending = None  # Pedaço guardado até sabermos se é o último do registro
     
-    # Remover duplicatas e ordenar
-    return sorted(list(set(palindromes)))
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith(">"):
+                if record_id is not None:
+                    if parts or pending is None:
+                        if pending is not None:
+                            yield record_id, pending, False
+                        pending = "".join(parts)
+                    yield record_id, pending, True
+                header = line[1:].split()
+                record_id = header[0] if header else ""
+                parts, size, pending = [], 0, None
+                continue
+            
+            line = line.strip()
+            if not line or record_id is None:
+                continue
+            parts.append(line)
+            size += len(line)
+            
+            while size >= chunk_size:
+                joined = "".join(parts)
+                if pending is not None:
+                    yield record_id, pending, False
+                pending = joined[:chunk_size]
+                rest = joined[chunk_size:]
+                parts, size = ([rest] if rest else []), len(rest)
+    
+    if record_id is not None:
+        if parts or pending is None:
+            if pending is not None:
+                yield record_id, pending, False
+            pending = "".join(parts)
+        yield record_id, pending, True
 
-def check_cds_overlap(gb_record, start, end):
+def stream_maximal_palindromes(chunks, max_length=1000):
+    """
+    Varre pedaços consecutivos de sequência e emite os palíndromos maximais
+    à medida que ficam definitivos.
+    
+    Pedaços consecutivos são analisados com sobreposição de max_length bases:
+    cada centro é emitido por exatamente um pedaço, e só quando há pelo menos
+    max_length/2 bases de cada lado dele. Assim nada se perde nem se repete
+    nas fronteiras, e a memória fica limitada ao tamanho do pedaço.
+    Palíndromos maiores que max_length são reportados truncados em max_length.
+    
+    Args:
+        chunks (iterable): Tuplas (id_do_registro, pedaço, último) de iter_fasta_chunks
+        max_length (int): Maior tamanho de palíndromo garantido (par)
+        
+    Yields:
+        tuple: (id_do_registro, início, fim, sequência) em coordenadas 0-based,
+            em ordem crescente de centro dentro de cada registro
+    """
+    if max_length < 2 or max_length % 2:
+        raise ValueError("max_length deve ser par e maior ou igual a 2")
+    half = max_length // 2
+    
+    buffer = ""
+    buf_start = 0    # Posição global da primeira base do buffer
+    next_center = 1  # Próximo centro global a emitir
+    
+    for record_id, chunk, last in chunks:
+        buffer += chunk
+        buf_end = buf_start + len(buffer)
+        stop = buf_end if last else buf_end - half
+        
+        if stop > next_center:
+            perfil.count("centers_tested", stop - next_center)
+            radii = rc_palindrome_radii(encode_sequence(buffer))
+            # Só os centros com palíndromo (raio > 0) passam pelo laço em Python
+            window = np.minimum(radii[next_center - buf_start:stop - buf_start], half)
+            found = np.flatnonzero(window)
+            for c, r in zip((found + next_center).tolist(), window[found].tolist()):
+                start = c - r
+                yield record_id, start, c + r, buffer[start-buf_start:c+r-buf_start]
+            next_center = stop
+        
+        if last:
+            buffer, buf_start, next_center = "", 0, 1
+        else:
+            # Mantém só o necessário para os próximos centros (sobreposição)
+            keep_from = max(buf_start, next_center - half)
+            buffer = buffer[keep_from - buf_start:]
+            buf_start = keep_from
+
+def count_sites_in_chunks(chunks, scanner, counts):
+    """
+    Repassa os pedaços de iter_fasta_chunks adiante, contando no caminho os
+    sítios de restrição de cada registro (o estado do autômato continua
+    entre pedaços, numa variável local: o scanner pode ser compartilhado).
+    
+    Args:
+        chunks (iterable): Tuplas (id_do_registro, pedaço, último)
+        scanner (enzimas.SiteScanner): Autômato de sítios
+        counts (dict): {id_do_registro: {índice_da_enzima: ocorrências}}, preenchido aqui
+    """
+    offset = state = 0
+    for record_id, chunk, last in chunks:
+        record_counts = counts.setdefault(record_id, defaultdict(int))
+        perfil.count("bases_scanned", len(chunk))
+        hits, state = scanner.advance(chunk, offset, state)
+        for _, _, e in hits:
+            record_counts[e] += 1
+        offset += len(chunk)
+        if last:
+            offset = state = 0
+        yield record_id, chunk, last
+
+@contextlib.contextmanager
+def palindrome_output(output=None, fmt=None, extra_columns=()):
+    """
+    Destino dos palíndromos da varredura do genoma inteiro: a tela (padrão)
+    ou um arquivo CSV/TSV/Markdown gravado linha a linha.
+    
+    Args:
+        output (str, optional): Arquivo de saída (padrão: a tela)
+        fmt (str, optional): Formato de output
+        extra_columns (tuple): Colunas a mais, depois da sequência (ex.: "gap", "mismatches")
+    
+    Yields:
+        function: emit(id_do_registro, início, fim, sequência, *extras), coordenadas 0-based
+    """
+    if not output:
+        def emit(record_id, start, end, pal, *extra):
+            fields = [record_id, f"{start + 1}..{end}", end - start, pal.upper(), *extra]
+            print("\t".join(map(str, fields)), flush=True)
+        yield emit
+        return
+    
+    columns = ["record", "start", "end", "length", "sequence", *extra_columns]
+    with saida.open_hit_writer(output, columns, fmt) as writer:
+        def emit(record_id, start, end, pal, *extra):
+            writer.write([record_id, start + 1, end, end - start, pal.upper(), *extra])
+        yield emit
+    print(f"Palíndromos gravados em: {os.path.abspath(output)}")
+
+@contextlib.contextmanager
+def store_palindromes(emit, db=None, params=None):
+    """
+    Repassa os palíndromos a emit e, com db, grava-os também no banco de
+    resultados, um conjunto por registro (região 0-0, o registro inteiro),
+    inseridos em lotes de banco.BATCH à medida que chegam (memória constante).
+    
+    Args:
+        emit (function): Destino dos palíndromos (de palindrome_output)
+        db (banco.ResultsDB, optional): Banco de resultados
+        params (dict, optional): Parâmetros da varredura, gravados com o conjunto
+    
+    Yields:
+        function: emit(id_do_registro, início, fim, sequência, *extras), coordenadas 0-based
+    """
+    if db is None:
+        yield emit
+        return
+    
+    with contextlib.ExitStack() as stack:
+        writers = {}
+        def tee(record_id, start, end, pal, *extra):
+            emit(record_id, start, end, pal, *extra)
+            out = writers.get(record_id)
+            if out is None:
+                out = writers[record_id] = stack.enter_context(
+                    db.writer("bacter_final", record_id, "palindrome", (0, 0), params or {}))
+            out.add(start + 1, end, end - start)
+        yield tee
+    print(f"Palíndromos gravados no banco: {os.path.abspath(db.path)}")
+
+def scan_whole_genome(fasta_path, k=None, min_length=10, chunk_size=1_000_000,
+                      max_length=1000, scanner=None, workers=1, output=None, fmt=None, db=None):
+    """
+    Varre o(s) genoma(s) de um FASTA inteiro em pedaços, imprimindo os
+    palíndromos maximais conforme são encontrados. Na mesma leitura conta os
+    sítios de enzimas de restrição de cada registro.
+    
+    Args:
+        fasta_path (str): Caminho do arquivo FASTA (pode ter vários registros)
+        k (int, optional): Se informado, mostra só palíndromos de tamanho k
+        min_length (int): Tamanho mínimo para mostrar um palíndromo
+        chunk_size (int): Bases lidas por pedaço
+        max_length (int): Maior tamanho de palíndromo garantido (sobreposição)
+        scanner (enzimas.SiteScanner, optional): Autômato de sítios de restrição
+        workers (int): Processos; acima de 1, o genoma é dividido em blocos (paralelo.py)
+        output (str, optional): Arquivo onde gravar os palíndromos, linha a linha,
+            em vez de mostrá-los na tela
+        fmt (str, optional): Formato de output: csv, tsv ou md (padrão: pela extensão)
+        db (banco.ResultsDB, optional): Banco onde gravar também os palíndromos mostrados
+    """
+    if scanner is None:
+        scanner = default_site_scanner()
+    
+    print(f"\n{'='*60}")
+    print("VARREDURA DO GENOMA INTEIRO")
+    print(f"{'='*60}")
+    print(f"Arquivo: {os.path.abspath(fasta_path)}")
+    print(f"Pedaços de {chunk_size:,} bases, sobreposição de {max_length} bases")
+    params = {"k": k, "min_length": min_length, "max_length": max_length}
+    
+    if workers > 1:
+        import paralelo  # Só carrega multiprocessing quando pedido
+        with perfil.span("scan_whole_genome", workers=workers), palindrome_output(output, fmt) as out, \
+                store_palindromes(out, db, params) as emit:
+            totals, largest, site_counts = paralelo.scan_whole_genome_tiles(
+                fasta_path, k, min_length, chunk_size, max_length, scanner, workers, emit)
+        print_whole_genome_summary(totals, largest, site_counts, scanner)
+        return
+    
+    totals = defaultdict(int)
+    largest = {}
+    site_counts = {}
+    shown = 0
+    
+    with perfil.span("scan_whole_genome"), palindrome_output(output, fmt) as out, \
+            store_palindromes(out, db, params) as emit:
+        chunks = count_sites_in_chunks(iter_fasta_chunks(fasta_path, chunk_size), scanner, site_counts)
+        for record_id, start, end, pal in stream_maximal_palindromes(chunks, max_length):
+            size = end - start
+            totals[record_id] += 1
+            if record_id not in largest or size > largest[record_id][1] - largest[record_id][0]:
+                largest[record_id] = (start, end, pal)
+            
+            if (size == k) if k is not None else (size >= min_length):
+                shown += 1
+                emit(record_id, start, end, pal)
+    
+    perfil.count("palindromes_found", sum(totals.values()))
+    perfil.count("hits_emitted", shown)
+    print_whole_genome_summary(totals, largest, site_counts, scanner)
+
+def scan_approximate_palindromes(fasta_path, mismatches=0, max_gap=0, min_length=10,
+                                 chunk_size=1_000_000, max_length=1000, output=None, fmt=None,
+                                 db=None):
+    """
+    Varre o(s) genoma(s) de um FASTA (lido pelo .2bit) atrás de palíndromos
+    aproximados, com mismatches e/ou espaçador central (aproximados.py), e
+    mostra os de tamanho >= min_length.
+    
+    Args:
+        fasta_path (str): Caminho do arquivo FASTA (pode ter vários registros)
+        mismatches (int): Máximo de pares que não pareiam
+        max_gap (int): Maior espaçador central
+        min_length (int): Tamanho mínimo (braços + espaçador)
+        chunk_size (int): Centros por bloco (cada bloco tem seu índice LCE)
+        max_length (int): Maior tamanho garantido; cada braço para em max_length/2
+        output (str, optional): Arquivo onde gravar os palíndromos
+        fmt (str, optional): Formato de output: csv, tsv ou md
+        db (banco.ResultsDB, optional): Banco onde gravar também os palíndromos
+    """
+    import aproximados  # Só constrói índices LCE quando pedido
+    
+    print(f"\n{'='*60}")
+    print("VARREDURA DO GENOMA INTEIRO - PALÍNDROMOS APROXIMADOS")
+    print(f"{'='*60}")
+    print(f"Arquivo: {os.path.abspath(fasta_path)}")
+    print(f"Até {mismatches} mismatch(es), espaçador de até {max_gap} bases, tamanho >= {min_length}")
+    params = {"mismatches": mismatches, "max_gap": max_gap, "min_length": min_length,
+              "max_length": max_length}
+    
+    summary = {}
+    with perfil.span("scan_approximate_palindromes"), \
+            palindrome_output(output, fmt, ("gap", "mismatches")) as out, \
+            store_palindromes(out, db, params) as emit:
+        for record_id, record in genoma2bit.open_genome(fasta_path).records.items():
+            hits = aproximados.find_approximate_palindromes(record, mismatches, max_gap, min_length,
+                                                            max_length, chunk_size)
+            for start, end, pal, gap, mm in hits:
+                emit(record_id, start, end, pal, gap, mm)
+            summary[record_id] = (len(hits), hits.longest())
+    
+    print(f"\n--- RESUMO ---")
+    for record_id, (total, largest) in summary.items():
+        if largest is None:
+            print(f"{record_id}: nenhum palíndromo aproximado com {min_length} bases ou mais")
+            continue
+        start, end, pal, gap, mm = largest
+        print(f"{record_id}: {total:,} palíndromos aproximados; maior: {pal.upper()} "
+              f"({end - start} bp, espaçador {gap}, {mm} mismatch(es), posição {start + 1}..{end})")
+
+def run_census(fasta_path, ks, markov_order=None, top=10, output=None, fmt=None):
+    """
+    Censo dos k-mers palindrômicos do(s) genoma(s) do FASTA (censo.py):
+    mostra, para cada k, as palavras mais sub e super-representadas em
+    relação ao modelo de Markov e grava o censo completo em output.
+    
+    Args:
+        fasta_path (str): Caminho do arquivo FASTA (pode ter vários registros)
+        ks (list): Tamanhos pares
+        markov_order (int, optional): Ordem do modelo de Markov (padrão k-2)
+        top (int): Palavras mostradas em cada ponta, por k
+        output (str, optional): Arquivo onde gravar o censo
+        fmt (str, optional): Formato de output: csv, tsv ou md
+    """
+    import censo  # Só carrega o censo quando pedido
+    
+    print(f"\n{'='*60}")
+    print("CENSO DE K-MERS PALINDRÔMICOS")
+    print(f"{'='*60}")
+    print(f"Arquivo: {os.path.abspath(fasta_path)}")
+    order = "k-2" if markov_order is None else str(markov_order)
+    print(f"k = {', '.join(map(str, ks))}; esperado pelo modelo de Markov de ordem {order}")
+    
+    codes = censo.genome_codes(fasta_path)
+    census = censo.palindromic_census(codes, ks, markov_order)
+    
+    for k, table in census.items():
+        observed, expected = table["observed"], table["expected"]
+        print(f"\n--- k={k}: {int(observed.sum()):,} ocorrências de {int((observed > 0).sum()):,} palavras ---")
+        if expected is None:
+            print("  (esperado só para k <= 16)")
+            continue
+        # Só palavras com esperado razoável; razão = observado / esperado
+        ok = np.flatnonzero(expected >= 5)
+        if not ok.size:
+            print("  Nenhuma palavra com esperado >= 5")
+            continue
+        ratio = observed[ok] / expected[ok]
+        order_idx = ok[np.argsort(ratio, kind="stable")]
+        for label, chosen in (("sub-representadas", order_idx[:top]),
+                              ("super-representadas", order_idx[::-1][:top])):
+            print(f"  Mais {label}:")
+            for i in chosen.tolist():
+                word = censo.kmer_string(int(table["word"][i]), k)
+                print(f"    {word}: observado {int(observed[i])}, esperado {expected[i]:.1f} "
+                      f"(razão {observed[i] / expected[i]:.3f})")
+    
+    if output:
+        with saida.open_hit_writer(output, ["k", "kmer", "observed", "expected", "ratio"], fmt) as writer:
+            for row in censo.census_rows(census):
+                writer.write(row)
+        print(f"\nCenso gravado em: {os.path.abspath(output)}")
+
+def print_whole_genome_summary(totals, largest, site_counts, scanner):
+    """
+    Imprime o resumo da varredura do genoma inteiro, por registro.
+    
+    Args:
+        totals (dict): {id_do_registro: número de palíndromos maximais}
+        largest (dict): {id_do_registro: (início, fim, sequência)} do maior palíndromo
+        site_counts (dict): {id_do_registro: {índice_da_enzima: ocorrências}}
+        scanner (enzimas.SiteScanner): Autômato usado na contagem dos sítios
+    """
+    print(f"\n--- RESUMO ---")
+    for record_id, total in totals.items():
+        start, end, pal = largest[record_id]
+        print(f"{record_id}: {total:,} palíndromos maximais; maior: "
+              f"{pal.upper()} ({end - start} bp, posição {start + 1}..{end})")
+        record_sites = sorted(site_counts.get(record_id, {}).items(), key=lambda item: -item[1])
+        if record_sites:
+            shown = ", ".join(f"{scanner.enzymes[e][0]}={n:,}" for e, n in record_sites[:10])
+            more = f" e mais {len(record_sites) - 10}" if len(record_sites) > 10 else ""
+            print(f"  Sítios de restrição: {shown}{more}")
+
+@perfil.timed("build_cds_index")
+def build_cds_index(gb_record):
+    """
+    Constrói, uma única vez, um índice de intervalos sobre as CDS do registro.
+    
+    As CDS ficam ordenadas pelo início, e cada nó de uma árvore binária
+    implícita sobre esse vetor guarda o maior fim da sua subárvore. Uma
+    consulta de sobreposição custa O(log n + resultados).
+    
+    Args:
+        gb_record: Registro GenBank do Biopython ou anotações de anotacoes.load_annotations
+        
+    Returns:
+        dict: Índice com os vetores 'starts', 'ends', 'max_end' e 'cds', e o
+            'fingerprint' (hash) das CDS
+    """
+    cds_list = []
+    
+    if isinstance(gb_record, anotacoes.Annotations):
+        # Colunas já prontas; só as CDS viram dicionários
+        for i in gb_record.features_of_type("CDS").tolist():
+            cds_list.append({
+                'locus_tag': gb_record.text(gb_record.locus[i]) or "N/A",
+                'product': gb_record.text(gb_record.product[i]) or "N/A",
+                'start': int(gb_record.start[i]) + 1,  # Converter para 1-based
+                'end': int(gb_record.end[i])
+            })
+    else:
+        for feature in gb_record.features:
+            if feature.type == "CDS":
+                # Coordenadas da feature (0-based no Biopython)
+                cds_list.append({
+                    'locus_tag': feature.qualifiers.get("locus_tag", ["N/A"])[0],
+                    'product': feature.qualifiers.get("product", ["N/A"])[0],
+                    'start': int(feature.location.start) + 1,  # Converter para 1-based
+                    'end': int(feature.location.end)
+                })
+    
+    # sort é estável: empates no início mantêm a ordem do arquivo
+    cds_list.sort(key=lambda cds: cds['start'])
+    starts = [cds['start'] for cds in cds_list]
+    ends = [cds['end'] for cds in cds_list]
+    max_end = list(ends)
+    
+    def augment(lo, hi):
+        # max_end[mid] passa a ser o maior fim dentro de [lo, hi)
+        if lo >= hi:
+            return 0
+        mid = (lo + hi) // 2
+        max_end[mid] = max(ends[mid], augment(lo, mid), augment(mid + 1, hi))
+        return max_end[mid]
+    
+    augment(0, len(cds_list))
+    # Identifica as anotações na chave do cache de regiões
+    fingerprint = hashlib.sha256(repr([(c['start'], c['end'], c['locus_tag'], c['product'])
+                                       for c in cds_list]).encode("utf-8")).hexdigest()
+    return {'starts': starts, 'ends': ends, 'max_end': max_end, 'cds': cds_list,
+            'fingerprint': fingerprint}
+
+def query_cds_index(index, start, end):
+    """
+    Consulta o índice de CDS por sobreposição com [start, end].
+    
+    Args:
+        index (dict): Índice de build_cds_index
+        start (int): Posição inicial (1-based)
+        end (int): Posição final (1-based)
+        
+    Returns:
+        list: CDS que se sobrepõem à região, em ordem de início
+    """
+    starts, ends, max_end = index['starts'], index['ends'], index['max_end']
+    found = []
+    
+    def visit(lo, hi):
+        if lo >= hi:
+            return
+        mid = (lo + hi) // 2
+        if max_end[mid] < start:  # Nada nesta subárvore chega até a região
+            return
+        visit(lo, mid)
+        if starts[mid] <= end:  # À direita, os inícios só aumentam
+            if ends[mid] >= start:
+                found.append(index['cds'][mid])
+            visit(mid + 1, hi)
+    
+    visit(0, len(starts))
+    return found
+
+def annotate_cds_overlaps(index, intervals):
+    """
+    Anota em lote uma lista de intervalos (palíndromos, grampos...) com as
+    CDS que se sobrepõem a cada um.
+    
+    Args:
+        index (dict): Índice de build_cds_index
+        intervals (iterable): Pares (início, fim) em coordenadas 1-based
+        
+    Returns:
+        list: Para cada intervalo, a lista de CDS sobrepostas
+    """
+    return [query_cds_index(index, start, end) for start, end in intervals]
+
+@perfil.timed("check_cds_overlap")
+def check_cds_overlap(gb_record, start, end, index=None):
     """
     Verifica se uma região genômica se sobrepõe a alguma CDS anotada.
     
@@ -150,73 +733,64 @@ def check_cds_overlap(gb_record, start, end):
         gb_record: Registro GenBank
         start (int): Posição inicial (1-based)
         end (int): Posição final (1-based)
+        index (dict, optional): Índice já construído por build_cds_index
         
     Returns:
         list: Lista de informações sobre CDS encontradas
     """
-    cds_found = []
-    
-    for feature in gb_record.features:
-        if feature.type == "CDS":
-            # Coordenadas da feature (0-based no Biopython)
-            f_start = int(feature.location.start) + 1  # Converter para 1-based
-            f_end = int(feature.location.end)
-            
-            # Verificar sobreposição
-            if not (f_end < start or f_start > end):
-                locus_tag = feature.qualifiers.get("locus_tag", ["N/A"])[0]
-                product = feature.qualifiers.get("product", ["N/A"])[0]
-                cds_found.append({
-                    'locus_tag': locus_tag,
-                    'product': product,
-                    'start': f_start,
-                    'end': f_end
-                })
-    
-    return cds_found
+    if index is None:
+        index = build_cds_index(gb_record)
+    return query_cds_index(index, start, end)
+
+_default_scanner = None
 
-def map_to_restriction_enzymes(palindromes):
+def default_site_scanner():
+    """Autômato de sítios para a lista de enzimas padrão (construído uma vez)."""
+    global _default_scanner
+    if _default_scanner is None:
+        _default_scanner = enzimas.SiteScanner()
+    return _default_scanner
+
+def load_site_scanner(enzymes_path=None):
+    """Autômato de sítios da lista de enzimas informada (ou da lista padrão)."""
+    if not enzymes_path:
+        return default_site_scanner()
+    if not os.path.exists(enzymes_path):
+        print(f"Erro: Arquivo de enzimas {os.path.abspath(enzymes_path)} não encontrado!")
+        sys.exit(1)
+    return enzimas.SiteScanner(enzimas.load_rebase(enzymes_path))
+
+def format_site_positions(positions):
+    """Formata posições (início, fita) de sítios; fita - é marcada com (-)."""
+    return "[" + ", ".join(f"{pos}" if strand > 0 else f"{pos}(-)" for pos, strand in positions) + "]"
+
+def map_to_restriction_enzymes(palindromes, scanner=None):
     """
     Mapeia sequências palindrômicas para enzimas de restrição conhecidas.
     
     Args:
         palindromes (list): Lista de sequências palindrômicas
+        scanner (enzimas.SiteScanner, optional): Autômato de sítios (padrão: lista interna)
         
     Returns:
         dict: Mapeamento de palíndromos para informações da enzima
     """
-    # Base de dados de enzimas de restrição (REBASE simplificada)
-    restriction_enzymes = {
-        "AAGCTT": ("HindIII", "Haemophilus influenzae Rd"),
-        "CTGCAG": ("PstI", "Providencia stuartii"),
-        "GAATTC": ("EcoRI", "Escherichia coli R"),
-        "GGATCC": ("BamHI", "Bacillus amyloliquefaciens H"),
-        "GTCGAC": ("SalI", "Streptomyces albus G"),
-        "GTATAC": ("BstEII", "Bacillus stearothermophilus EII"),
-        "GGCGCC": ("NarI", "Nocardia argentinensis"),
-        "CATATG": ("NdeI", "Neisseria denitrificans"),
-        "CCCGGG": ("SmaI", "Serratia marcescens"),
-        "GCGGCCGC": ("NotI", "Nocardia otitidiscaviarum"),
-        "TCTAGA": ("XbaI", "Xanthomonas badrii"),
-        "GCTAGC": ("NheI", "Neisseria mucosa"),
-        "GGTACC": ("KpnI", "Klebsiella pneumoniae"),
-        "GAGCTC": ("SacI", "Streptomyces achromogenes"),
-        "AGATCT": ("BglII", "Bacillus globigii"),
-        "AAGCTT": ("HindIII", "Haemophilus influenzae Rd"),
-        "TTAATTAA": ("AseI", "Aquifex aeolicus"),
-        "GCCGGC": ("NaeI", "Nocardia aerocolonigenes"),
-    }
+    if scanner is None:
+        scanner = default_site_scanner()
     
     enzyme_matches = {}
     unique_palindromes = set(palindromes)
     
     for pal in unique_palindromes:
-        if pal in restriction_enzymes:
-            enzyme_matches[pal] = restriction_enzymes[pal]
+        matches = scanner.exact_matches(pal)
+        if matches:
+            name, site, organism = matches[0]
+            enzyme_matches[pal] = (name, organism)
     
     return enzyme_matches
 
-def analyze_region(sequence, gb_record, start, end, k=None):
+@perfil.timed("analyze_region")
+def analyze_region(sequence, gb_record, start, end, k=None, cds_index=None, scanner=None):
     """
     Analisa uma região específica do genoma.
     
@@ -226,7 +800,18 @@ def analyze_region(sequence, gb_record, start, end, k=None):
         start (int): Posição inicial (1-based)
         end (int): Posição final (1-based)
         k (int, optional): Tamanho específico de palíndromos a buscar
+        cds_index (dict, optional): Índice de CDS já construído por build_cds_index
+        scanner (enzimas.SiteScanner, optional): Autômato de sítios de restrição
+    
+    Returns:
+        dict: 'palindromes' e 'sites' da região, no formato de
+            analyze_report_region (reaproveitados por store_region_results)
     """
+    if cds_index is None:
+        cds_index = build_cds_index(gb_record)
+    if scanner is None:
+        scanner = default_site_scanner()
+    
     print(f"\n{'='*60}")
     print(f"ANÁLISE DA REGIÃO {start}..{end}")
     print(f"{'='*60}")
@@ -237,7 +822,7 @@ def analyze_region(sequence, gb_record, start, end, k=None):
     
     # Verificar CDS
     print(f"\n--- ANÁLISE DE CDS/ORF ---")
-    cds_results = check_cds_overlap(gb_record, start, end)
+    cds_results = check_cds_overlap(gb_record, start, end, cds_index)
     if cds_results:
         print("✓ REGIÃO CONTÉM CDS/ORF ANOTADOS:")
         for cds in cds_results:
@@ -247,10 +832,13 @@ def analyze_region(sequence, gb_record, start, end, k=None):
     else:
         print("✗ Nenhuma CDS/ORF anotada encontrada nesta região")
     
+    # Índice único da região, reaproveitado por todas as buscas abaixo
+    index = build_palindrome_index(subseq)
+    
     # Buscar palíndromos
     if k is not None:
         print(f"\n--- PALÍNDROMOS MAXIMAIS DE TAMANHO {k} ---")
-        palindromes = find_maximal_palindromes_of_length_k(subseq, k)
+        palindromes = find_maximal_palindromes_of_length_k(subseq, k, index)
         
         if palindromes:
             print(f"Encontrados {len(palindromes)} palíndromos únicos:")
@@ -263,79 +851,93 @@ def analyze_region(sequence, gb_record, start, end, k=None):
     
     # Buscar todos os palíndromos maximais
     print(f"\n--- TODOS OS PALÍNDROMOS MAXIMAIS ---")
-    all_palindromes = find_all_maximal_palindromes(subseq)
+    all_palindromes = find_all_maximal_palindromes(subseq, index)
     
-    if all_palindromes:
-        # Agrupar por tamanho
-        by_size = defaultdict(list)
-        for start_pos, end_pos, seq in all_palindromes:
-            by_size[len(seq)].append((start_pos, end_pos, seq))
+    if len(all_palindromes):
+        # Agrupar por tamanho (filtros sobre a tabela, sem copiar sequências)
+        sizes = all_palindromes.sizes
         
         print(f"Encontrados {len(all_palindromes)} palíndromos maximais:")
-        for size in sorted(by_size.keys(), reverse=True):
-            palindromes_of_size = by_size[size]
+        for size in np.unique(sizes)[::-1].tolist():
+            palindromes_of_size = all_palindromes.filter(sizes == size)
             print(f"  Tamanho {size}: {len(palindromes_of_size)} palíndromos")
             
-            # Mostrar apenas os primeiros 5 de cada tamanho
-            for i, (start_pos, end_pos, seq) in enumerate(palindromes_of_size[:5]):
+            # Mostrar apenas os primeiros 5 de cada tamanho, com as CDS em que caem
+            shown = list(palindromes_of_size[:5])
+            overlaps = annotate_cds_overlaps(
+                cds_index, [(start + s, start + e - 1) for s, e, _ in shown])
+            for (start_pos, end_pos, seq), cds_hits in zip(shown, overlaps):
                 global_start = start + start_pos
                 global_end = start + end_pos - 1
-                print(f"    • {seq} (posição {global_start}..{global_end})")
+                genes = ", ".join(cds['locus_tag'] for cds in cds_hits) or "intergênico"
+                print(f"    • {seq} (posição {global_start}..{global_end}) [{genes}]")
             
             if len(palindromes_of_size) > 5:
                 print(f"    ... e mais {len(palindromes_of_size) - 5} palíndromos")
         
         # Encontrar o maior
-        largest = max(all_palindromes, key=lambda x: len(x[2]))
+        largest = all_palindromes.longest()
         largest_global_start = start + largest[0]
         largest_global_end = start + largest[1] - 1
         print(f"\nMAIOR PALÍNDROMO MAXIMAL:")
         print(f"  Sequência: {largest[2]}")
         print(f"  Tamanho: {len(largest[2])} bp")
         print(f"  Posição: {largest_global_start}..{largest_global_end}")
+        cds_hits = query_cds_index(cds_index, largest_global_start, largest_global_end)
+        if cds_hits:
+            print(f"  Dentro de: {', '.join(cds['locus_tag'] for cds in cds_hits)}")
     
-    # Mapear para enzimas de restrição
+    # Procurar sítios de enzimas de restrição em toda a região (uma só passada)
     print(f"\n--- ENZIMAS DE RESTRIÇÃO ---")
-    if all_palindromes:
-        all_sequences = [seq for _, _, seq in all_palindromes]
-        enzyme_matches = map_to_restriction_enzymes(all_sequences)
-        
-        if enzyme_matches:
-            print(f"Encontradas {len(enzyme_matches)} sequências que correspondem a enzimas de restrição:")
-            count = 0
-            for pal, (enzyme, organism) in enzyme_matches.items():
-                if count < 4:  # Mostrar apenas as primeiras 4
-                    print(f"  • {pal} => {enzyme} (origem: {organism})")
-                    count += 1
-            if len(enzyme_matches) > 4:
-                print(f"  ... e mais {len(enzyme_matches) - 4} enzimas")
-        else:
-            print("Nenhuma sequência corresponde a enzimas de restrição conhecidas")
+    sites = scanner.scan_sites(subseq, start - 1)
+    
+    if sites:
+        print(f"Encontradas {len(sites)} enzimas de restrição com sítios na região:")
+        for count, ((enzyme, site, organism), positions) in enumerate(sites.items()):
+            if count == 4:  # Mostrar apenas as primeiras 4
+                print(f"  ... e mais {len(sites) - 4} enzimas")
+                break
+            print(f"  • {site} => {enzyme} (origem: {organism}): "
+                  f"{len(positions)} sítio(s) em {format_site_positions(positions)}")
+    else:
+        print("Nenhum sítio de enzima de restrição conhecida nesta região")
+    
+    return {'palindromes': palindrome_coordinates(all_palindromes, start), 'sites': list(sites.items())}
 
-def find_largest_palindrome(sequence, gb_record, regions):
+def palindrome_coordinates(hits, start):
+    """
+    Inícios e fins 1-based, no genoma, dos palíndromos de uma região que
+    começa em start (hits de find_all_maximal_palindromes sobre a região).
+    """
+    return hits.start + start, hits.end + start - 1
+
+@perfil.timed("find_largest_palindrome")
+def find_largest_palindrome(sequence, gb_record, regions, scanner=None, region_palindromes=None):
     """
     Encontra o maior palíndromo maximal em todas as regiões especificadas.
+    
+    region_palindromes pode trazer o resultado de find_all_maximal_palindromes
+    de cada região já calculado (por exemplo em paralelo).
     """
     print(f"\n{'='*60}")
     print("BUSCA PELO MAIOR PALÍNDROMO MAXIMAL")
     print(f"{'='*60}")
     
-    all_palindromes = []
+    largest = None
     
-    for start, end in regions:
-        subseq = sequence[start-1:end]
-        palindromes = find_all_maximal_palindromes(subseq)
-        
-        # Converter para coordenadas globais
-        for pal_start, pal_end, seq in palindromes:
-            global_start = start + pal_start
-            global_end = start + pal_end - 1
-            all_palindromes.append((global_start, global_end, seq))
+    if region_palindromes is None:
+        region_palindromes = [find_all_maximal_palindromes(sequence[start-1:end])
+                              for start, end in regions]
     
-    if all_palindromes:
-        # Encontrar o maior
-        largest = max(all_palindromes, key=lambda x: len(x[2]))
-        
+    # O maior de cada região; em caso de empate fica o primeiro
+    for (start, end), palindromes in zip(regions, region_palindromes):
+        region_largest = palindromes.longest()
+        if region_largest and (largest is None or len(region_largest[2]) > len(largest[2])):
+            # Converter para coordenadas globais
+            pal_start, pal_end, seq = region_largest
+            largest = (start + pal_start, start + pal_end - 1, seq)
+    
+    if largest:
         print(f"MAIOR PALÍNDROMO MAXIMAL ENCONTRADO:")
         print(f"  Sequência: {largest[2]}")
         print(f"  Tamanho: {len(largest[2])} bp")
@@ -348,7 +950,7 @@ def find_largest_palindrome(sequence, gb_record, regions):
                 break
         
         # Mapear para enzimas de restrição
-        enzyme_matches = map_to_restriction_enzymes([largest[2]])
+        enzyme_matches = map_to_restriction_enzymes([largest[2]], scanner)
         if enzyme_matches:
             pal, (enzyme, organism) = next(iter(enzyme_matches.items()))
             print(f"  Enzima de restrição: {enzyme} (origem: {organism})")
@@ -357,11 +959,265 @@ def find_largest_palindrome(sequence, gb_record, regions):
     else:
         print("Nenhum palíndromo maximal encontrado nas regiões especificadas")
 
-def generate_report(sequence, gb_record, regions):
+# Tamanhos de k mostrados em cada região do relatório
+REPORT_KS = (4, 6, 8, 10, 12, 14, 16, 18, 20)
+
+def analyze_report_region(start, end, subseq, gb_record, cds_index, scanner):
+    """
+    Calcula os resultados de uma região usados no relatório, sem formatar
+    nada: é isto que fica no cache de regiões (ver cached_region_analysis).
+    
+    Args:
+        start (int): Posição inicial (1-based)
+        end (int): Posição final (1-based)
+        subseq (str): Sequência da região
+        gb_record: Registro GenBank (não usado se cds_index for informado)
+        cds_index (dict): Índice de CDS de build_cds_index
+        scanner (enzimas.SiteScanner): Autômato de sítios de restrição
+        
+    Returns:
+        dict: 'length', 'cds' (CDS sobrepostas), 'per_k' ({k: {palíndromo:
+            [posições_1based]}}), 'histogram' ({tamanho: quantidade}),
+            'largest' ((início, fim, sequência) 1-based, ou None), 'palindromes'
+            ((inícios, fins) 1-based de todos os maximais, de palindrome_coordinates)
+            e 'sites' ([((enzima, sítio, organismo), [(início, fita), ...])])
+    """
+    index = build_palindrome_index(subseq)
+    cds_results = check_cds_overlap(gb_record, start, end, cds_index)
+    
+    with perfil.span("report.k_sweep"):
+        per_k = {}
+        for k in REPORT_KS:
+            per_k[k] = {pal: [start - 1 + pos for pos in positions]
+                        for pal, positions in find_maximal_palindromes_of_length_k(subseq, k, index).items()}
+    
+    largest = None
+    all_pals = find_all_maximal_palindromes(subseq, index)
+    if len(all_pals):
+        s, e, pal = all_pals.longest()
+        largest = (start + s, start + e - 1, pal)
+    
+    with perfil.span("report.sites"):
+        sites = list(scanner.scan_sites(subseq, start - 1).items())
+    
+    return {'length': len(subseq), 'cds': cds_results, 'per_k': per_k,
+            'histogram': palindrome_size_histogram(index), 'largest': largest,
+            'palindromes': palindrome_coordinates(all_pals, start), 'sites': sites}
+
+def format_region_section(i, start, end, data):
+    """
+    Linhas em Markdown da seção de uma região, a partir de analyze_report_region.
+    
+    Args:
+        i (int): Índice da região (0-based)
+        start (int): Posição inicial (1-based)
+        end (int): Posição final (1-based)
+        data (dict): Resultados da região
+        
+    Returns:
+        list: Linhas da seção
+    """
+    report = []
+    
+    report.append(f"## Região {i+1}: {start}..{end}")
+    report.append("")
+    
+    # Informações básicas
+    report.append(f"Esta região possui {data['length']} pares de bases.")
+    report.append("")
+    
+    # Análise de CDS/ORF
+    report.append("### Genes Encontrados")
+    if data['cds']:
+        report.append("A região contém os seguintes genes:")
+        report.append("")
+        for cds in data['cds']:
+            report.append(f"- **{cds['locus_tag']}**: {cds['product']} (posições {cds['start']}..{cds['end']})")
+        report.append("")
+    else:
+        report.append("Nenhum gene foi encontrado nesta região.")
+        report.append("")
+    
+    # Palíndromos de diferentes tamanhos
+    report.append("### Palíndromos Encontrados")
+    report.append("")
+    
+    for k, palindromes_k in data['per_k'].items():
+        if palindromes_k:
+            report.append(f"**Palíndromos de {k} bases:** {len(palindromes_k)} sequências diferentes")
+            for pal, global_positions in list(palindromes_k.items())[:3]:  # Mostrar apenas os primeiros 3
+                report.append(f"- {pal} (posições: {global_positions})")
+            if len(palindromes_k) > 3:
+                report.append(f"- ... e mais {len(palindromes_k) - 3} sequências")
+            report.append("")
+    
+    # Todos os palíndromos maximais
+    if data['largest']:
+        histogram = data['histogram']
+        report.append("### Resumo Geral")
+        report.append("")
+        report.append("Distribuição dos palíndromos por tamanho:")
+        for size in sorted(histogram.keys(), reverse=True):
+            report.append(f"- {size} bases: {histogram[size]} sequências")
+    
+        largest_global_start, largest_global_end, largest = data['largest']
+        report.append("")
+        report.append(f"**Maior palíndromo encontrado:**")
+        report.append(f"- Sequência: {largest}")
+        report.append(f"- Tamanho: {len(largest)} bases")
+        report.append(f"- Localização: {largest_global_start}..{largest_global_end}")
+        report.append("")
+    
+    # Enzimas de restrição
+    report.append("### Sítios de Enzimas de Restrição")
+    report.append("")
+    if data['sites']:
+        report.append("Sítios de reconhecimento de enzimas de restrição conhecidas encontrados na região:")
+        report.append("")
+        for (enzyme, site, organism), positions in data['sites']:
+            report.append(f"- {site} → {enzyme} (de {organism}): posições {format_site_positions(positions)}")
+        report.append("")
+    else:
+        report.append("Nenhum sítio de enzima de restrição conhecida foi encontrado.")
+        report.append("")
+    
+    report.append("---")
+    report.append("")
+    return report
+
+# Versão do cache de regiões: incremente ao mudar o que analyze_report_region
+# calcula ou o formato dos dados guardados
+CACHE_VERSION = 1
+# Módulos cujo código entra, inteiro, na chave do cache: a análise das regiões
+# (este módulo), o autômato de sítios e as camadas de sequência e de tabelas
+CACHE_MODULES = ("bacter_final", "enzimas", "sequencias", "ocorrencias")
+
+_code_version = None
+
+def code_version():
+    """
+    Hash de CACHE_VERSION e do código-fonte dos módulos de CACHE_MODULES:
+    qualquer mudança num deles (ou no número da versão) invalida o cache.
+    """
+    global _code_version
+    if _code_version is None:
+        h = hashlib.sha256(str(CACHE_VERSION).encode("ascii"))
+        for name in CACHE_MODULES:
+            module = sys.modules[__name__] if name == "bacter_final" else sys.modules[name]
+            with open(module.__file__, "rb") as f:
+                h.update(name.encode("ascii") + b"\0" + f.read())
+        _code_version = h.hexdigest()
+    return _code_version
+
+def region_cache_key(start, subseq, cds_index, scanner):
+    """
+    Chave do cache de uma região: hash da sequência, da posição no genoma, dos
+    parâmetros da análise (tamanhos k, enzimas, anotações) e da versão do código.
+    """
+    h = hashlib.sha256()
+    h.update(repr((code_version(), start, REPORT_KS, scanner.enzymes,
+                   cds_index['fingerprint'])).encode("utf-8"))
+    h.update(str(subseq).upper().encode("ascii"))
+    return h.hexdigest()
+
+def cached_region_analysis(start, end, subseq, gb_record, cds_index, scanner, cache_dir=None):
+    """
+    analyze_report_region com cache em disco: uma entrada por chave
+    (region_cache_key) em cache_dir. Sem cache_dir, sempre calcula.
+    """
+    if not cache_dir:
+        return analyze_report_region(start, end, subseq, gb_record, cds_index, scanner)
+
+    path = os.path.join(cache_dir, region_cache_key(start, subseq, cds_index, scanner) + ".pkl")
+    if os.path.exists(path):
+        try:
+            with perfil.span("report.cache", start=start, end=end), open(path, "rb") as f:
+                data = pickle.load(f)
+            perfil.count("regions_from_cache")
+            return data
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            # Entrada corrompida ou de classes que mudaram: apaga, calcula de novo e regrava
+            perfil.count("regions_cache_corrupt")
+            os.remove(path)
+
+    data = analyze_report_region(start, end, subseq, gb_record, cds_index, scanner)
+    perfil.count("regions_computed")
+    os.makedirs(cache_dir, exist_ok=True)
+    # Grava em arquivo temporário e renomeia, para nunca deixar entrada pela metade
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+    return data
+
+@perfil.timed("report_region_section")
+def report_region_section(i, start, end, subseq, gb_record, cds_index, scanner, cache_dir=None):
+    """
+    Gera a seção do relatório de uma região (independente das outras regiões,
+    por isso pode ser calculada em paralelo, ver paralelo.py).
+    
+    Args:
+        i (int): Índice da região (0-based)
+        start (int): Posição inicial (1-based)
+        end (int): Posição final (1-based)
+        subseq (str): Sequência da região
+        gb_record: Registro GenBank (não usado se cds_index for informado)
+        cds_index (dict): Índice de CDS de build_cds_index
+        scanner (enzimas.SiteScanner): Autômato de sítios de restrição
+        cache_dir (str, optional): Diretório do cache de regiões; uma região já
+            analisada com a mesma sequência, parâmetros e código não é varrida de novo
+        
+    Returns:
+        dict: 'lines' (linhas em Markdown), 'data' (resultados de
+            analyze_report_region), 'largest' (maior palíndromo ou None) e
+            'enzymes' (enzimas encontradas)
+    """
+    data = cached_region_analysis(start, end, subseq, gb_record, cds_index, scanner, cache_dir)
+    return {'lines': format_region_section(i, start, end, data), 'data': data,
+            'largest': data['largest'][2] if data['largest'] else None,
+            'enzymes': {enzyme for enzyme, _ in data['sites']}}
+
+@perfil.timed("generate_report")
+def generate_report(sequence, gb_record, regions, cds_index=None, scanner=None, sections=None,
+                    cache_dir=None):
     """
     Gera um relatório completo em Markdown com todas as análises.
+    
+    As seções de cada região podem vir prontas em sections (uma por região,
+    de report_region_section), por exemplo calculadas em paralelo.
     """
+    return "".join(iter_report(sequence, gb_record, regions, cds_index, scanner, sections, cache_dir))
+
+def iter_report(sequence, gb_record, regions, cds_index=None, scanner=None, sections=None,
+                cache_dir=None):
+    """
+    Gera o relatório em Markdown aos pedaços: o cabeçalho, cada região assim
+    que fica pronta e, no fim, os resultados gerais. Quem grava pode escrever
+    cada pedaço no arquivo na hora, sem montar o documento inteiro.
+    
+    Args:
+        sections (iterable, optional): Seções por região (de report_region_section),
+            consumidas uma a uma
+        cache_dir (str, optional): Cache de regiões usado quando sections não é informado
+        
+    Yields:
+        str: Pedaços de texto; "".join(pedaços) é o relatório completo
+    """
+    if cds_index is None:
+        cds_index = build_cds_index(gb_record)
+    if scanner is None:
+        scanner = default_site_scanner()
+    
     report = []
+    first = True
+    
+    def flush():
+        # Linhas acumuladas até aqui, unidas como em "\n".join(relatório)
+        nonlocal first
+        text = ("" if first else "\n") + "\n".join(report)
+        first = False
+        report.clear()
+        return text
     
     # Cabeçalho do relatório
     report.append("# Relatório de Análise de Palíndromos - Maribacter sp. HTCC2170")
@@ -376,95 +1232,21 @@ def generate_report(sequence, gb_record, regions):
     # Análise de cada região
     all_palindromes = []
     all_restriction_enzymes = set()
+    region_data = []  # Resultados de cada região, reaproveitados nas respostas
     
-    for i, (start, end) in enumerate(regions):
-        report.append(f"## Região {i+1}: {start}..{end}")
-        report.append("")
-        
-        # Informações básicas
-        subseq = sequence[start-1:end]
-        report.append(f"Esta região possui {len(subseq)} pares de bases.")
-        report.append("")
-        
-        # Análise de CDS/ORF
-        report.append("### Genes Encontrados")
-        cds_results = check_cds_overlap(gb_record, start, end)
-        if cds_results:
-            report.append("A região contém os seguintes genes:")
-            report.append("")
-            for cds in cds_results:
-                report.append(f"- **{cds['locus_tag']}**: {cds['product']} (posições {cds['start']}..{cds['end']})")
-            report.append("")
-        else:
-            report.append("Nenhum gene foi encontrado nesta região.")
-            report.append("")
-        
-        # Palíndromos de diferentes tamanhos
-        report.append("### Palíndromos Encontrados")
-        report.append("")
-        
-        # Testar diferentes tamanhos de k
-        for k in [4, 6, 8, 10, 12, 14, 16, 18, 20]:
-            palindromes_k = find_maximal_palindromes_of_length_k(subseq, k)
-            if palindromes_k:
-                report.append(f"**Palíndromos de {k} bases:** {len(palindromes_k)} sequências diferentes")
-                for pal, positions in list(palindromes_k.items())[:3]:  # Mostrar apenas os primeiros 3
-                    global_positions = [start - 1 + pos for pos in positions]
-                    report.append(f"- {pal} (posições: {global_positions})")
-                if len(palindromes_k) > 3:
-                    report.append(f"- ... e mais {len(palindromes_k) - 3} sequências")
-                report.append("")
-        
-        # Todos os palíndromos maximais
-        all_pals = find_all_maximal_palindromes(subseq)
-        if all_pals:
-            # Agrupar por tamanho
-            by_size = defaultdict(list)
-            for start_pos, end_pos, seq in all_pals:
-                by_size[len(seq)].append((start_pos, end_pos, seq))
-            
-            report.append("### Resumo Geral")
-            report.append("")
-            report.append("Distribuição dos palíndromos por tamanho:")
-            for size in sorted(by_size.keys(), reverse=True):
-                palindromes_of_size = by_size[size]
-                report.append(f"- {size} bases: {len(palindromes_of_size)} sequências")
-            
-            # Encontrar o maior
-            largest = max(all_pals, key=lambda x: len(x[2]))
-            largest_global_start = start + largest[0]
-            largest_global_end = start + largest[1] - 1
-            report.append("")
-            report.append(f"**Maior palíndromo encontrado:**")
-            report.append(f"- Sequência: {largest[2]}")
-            report.append(f"- Tamanho: {len(largest[2])} bases")
-            report.append(f"- Localização: {largest_global_start}..{largest_global_end}")
-            report.append("")
-            
-            # Coletar para análise geral
-            for _, _, seq in all_pals:
-                all_palindromes.append(seq)
-        
-        # Enzimas de restrição
-        report.append("### Sítios de Enzimas de Restrição")
-        report.append("")
-        if all_pals:
-            all_sequences = [seq for _, _, seq in all_pals]
-            enzyme_matches = map_to_restriction_enzymes(all_sequences)
-            
-            if enzyme_matches:
-                report.append("Alguns palíndromos correspondem a sítios de enzimas de restrição conhecidas:")
-                report.append("")
-                for pal, (enzyme, organism) in enzyme_matches.items():
-                    report.append(f"- {pal} → {enzyme} (de {organism})")
-                    all_restriction_enzymes.add((enzyme, pal, organism))
-                report.append("")
-            else:
-                report.append("Nenhum palíndromo corresponde a enzimas de restrição conhecidas.")
-                report.append("")
-        
-        report.append("---")
-        report.append("")
+    if sections is None:
+        sections = (report_region_section(i, start, end, sequence[start-1:end],
+                                          gb_record, cds_index, scanner, cache_dir)
+                    for i, (start, end) in enumerate(regions))
+    
+    yield flush()
+    for section in sections:
+        report.extend(section['lines'])
+        yield flush()
+        region_data.append(section['data'])
+        if section['largest']:
+            all_palindromes.append(section['largest'])
+        all_restriction_enzymes.update(section['enzymes'])
     
     # Análise geral
     report.append("## Resultados Principais")
@@ -481,7 +1263,7 @@ def generate_report(sequence, gb_record, regions):
         report.append("")
         
         # Verificar se corresponde a enzima de restrição
-        enzyme_matches = map_to_restriction_enzymes([largest_overall])
+        enzyme_matches = map_to_restriction_enzymes([largest_overall], scanner)
         if enzyme_matches:
             pal, (enzyme, organism) = next(iter(enzyme_matches.items()))
             report.append(f"Este palíndromo corresponde ao sítio da enzima {enzyme}.")
@@ -509,12 +1291,10 @@ def generate_report(sequence, gb_record, regions):
     report.append("")
     report.append("**Resultados para k=6:**")
     for i, (start, end) in enumerate(regions):
-        subseq = sequence[start-1:end]
-        palindromes_k6 = find_maximal_palindromes_of_length_k(subseq, 6)
+        palindromes_k6 = region_data[i]['per_k'][6]
         if palindromes_k6:
             report.append(f"- Região {i+1} ({start}..{end}): {len(palindromes_k6)} sequências diferentes")
-            for pal, positions in palindromes_k6.items():
-                global_positions = [start - 1 + pos for pos in positions]
+            for pal, global_positions in palindromes_k6.items():
                 report.append(f"  - {pal} (posições: {global_positions})")
         else:
             report.append(f"- Região {i+1} ({start}..{end}): Nenhum palíndromo de 6 bases")
@@ -530,10 +1310,8 @@ def generate_report(sequence, gb_record, regions):
         report.append("Teste de maximalidade (verificando até que tamanho existem palíndromos):")
         for k in range(2, 22, 2):
             found_any = False
-            for start, end in regions:
-                subseq = sequence[start-1:end]
-                pals = find_maximal_palindromes_of_length_k(subseq, k)
-                if pals:
+            for data in region_data:
+                if data['histogram'].get(k):
                     found_any = True
                     break
             if found_any:
@@ -559,7 +1337,7 @@ def generate_report(sequence, gb_record, regions):
     report.append("Ambos os trechos analisados contêm genes anotados:")
     report.append("")
     for i, (start, end) in enumerate(regions):
-        cds_results = check_cds_overlap(gb_record, start, end)
+        cds_results = region_data[i]['cds']
         if cds_results:
             report.append(f"**Região {i+1} ({start}..{end}):**")
             for cds in cds_results:
@@ -571,7 +1349,64 @@ def generate_report(sequence, gb_record, regions):
     report.append("---")
     report.append("")
     
-    return "\n".join(report)
+    yield flush()
+
+@perfil.timed("store_region_results")
+def store_region_results(db, sequence, regions, cds_index, scanner, enzymes_path=None,
+                         region_results=None):
+    """
+    Grava no banco de resultados, para cada região, todos os palíndromos
+    maximais e os sítios de restrição, além das CDS do genoma (para consultas
+    do tipo "grampos que se sobrepõem à CDS X").
+    
+    Args:
+        db (banco.ResultsDB): Banco de resultados
+        sequence: Sequência completa do genoma
+        regions (list): Pares (início, fim) 1-based
+        cds_index (dict): Índice de build_cds_index
+        scanner (enzimas.SiteScanner): Autômato de sítios de restrição
+        enzymes_path (str, optional): Lista de enzimas usada (identifica o conjunto de sítios)
+        region_results (dict, optional): {(início, fim): resultados} já calculados pela
+            análise ou pelo relatório ('palindromes' e 'sites', como em
+            analyze_report_region); só as regiões que faltarem são varridas aqui
+    """
+    accession = sequence.id
+    db.store_cds(accession, cds_index['cds'])
+    sites_params = {"enzymes": os.path.basename(enzymes_path) if enzymes_path else "padrão"}
+    region_results = region_results or {}
+    
+    for start, end in regions:
+        data = region_results.get((start, end))
+        if data is None:
+            subseq = sequence[start-1:end]
+            data = {'palindromes': palindrome_coordinates(find_all_maximal_palindromes(subseq), start),
+                    'sites': list(scanner.scan_sites(subseq, start - 1).items())}
+        starts, ends = data['palindromes']
+        db.store("bacter_final", accession, "palindrome", (start, end), {},
+                 zip(starts.tolist(), ends.tolist(), (ends - starts + 1).tolist(),
+                     [0] * len(starts), [None] * len(starts)))
+        db.store("bacter_final", accession, "site", (start, end), sites_params,
+                 ((pos, pos + len(site) - 1, len(site), strand, enzyme)
+                  for (enzyme, site, _), positions in data['sites'] for pos, strand in positions))
+    print(f"Resultados gravados no banco: {os.path.abspath(db.path)}")
+
+def parse_census_ks(text):
+    """
+    Tamanhos do censo: "6", "4,6,8" ou "4-16" (só os pares do intervalo).
+    
+    Returns:
+        list: Tamanhos k, em ordem crescente
+    """
+    ks = set()
+    for part in text.split(","):
+        first, _, last = part.partition("-")
+        if last:
+            ks.update(k for k in range(int(first), int(last) + 1) if k % 2 == 0)
+        else:
+            ks.add(int(first))
+    if not ks:
+        raise ValueError(text)
+    return sorted(ks)
 
 def main():
     parser = argparse.ArgumentParser(
@@ -582,6 +1417,9 @@ Exemplos de uso:
   python bacter_final.py                    # Executa análise completa e gera relatório
   python bacter_final.py --k 6 --intervals 82583-83599 297449-299453
   python bacter_final.py --find-largest --intervals 82583-83599 297449-299453
+  python bacter_final.py --whole-genome --min-length 12
+  python bacter_final.py --whole-genome --fasta genomas.fasta --k 10
+  python bacter_final.py --census 4-16 --output censo.csv
         """
     )
     
@@ -592,9 +1430,116 @@ Exemplos de uso:
                         help="Encontrar o maior palíndromo maximal em todas as regiões")
     parser.add_argument("--generate-report", action="store_true", default=True,
                         help="Gerar relatório completo em Markdown (padrão)")
+    parser.add_argument("--whole-genome", action="store_true",
+                        help="Varrer o FASTA inteiro em pedaços, sem carregá-lo na memória")
+    parser.add_argument("--fasta", default=FASTA_PATH,
+                        help="Arquivo FASTA para --whole-genome (aceita vários registros)")
+    parser.add_argument("--min-length", type=int, default=10,
+                        help="Tamanho mínimo dos palíndromos mostrados em --whole-genome")
+    parser.add_argument("--chunk-size", type=int, default=1_000_000,
+                        help="Bases lidas por pedaço em --whole-genome")
+    parser.add_argument("--output",
+                        help="Em --whole-genome, grava os palíndromos neste arquivo, linha a linha")
+    parser.add_argument("--format", choices=saida.FORMATS,
+                        help="Formato de --output: csv, tsv ou md (padrão: pela extensão do arquivo)")
+    parser.add_argument("--mismatches", type=int, default=0,
+                        help="Em --whole-genome, aceita palíndromos com até este número de pares "
+                             "que não pareiam (índice LCE, aproximados.py)")
+    parser.add_argument("--max-gap", type=int, default=0,
+                        help="Em --whole-genome, aceita um espaçador central de até este número de bases")
+    parser.add_argument("--max-length", type=int, default=1000,
+                        help="Maior palíndromo garantido em --whole-genome (sobreposição entre pedaços)")
+    parser.add_argument("--census", nargs="?", const="4-16", metavar="KS",
+                        help="Censo dos k-mers palindrômicos do FASTA inteiro, com o esperado por "
+                             "um modelo de Markov (k pares: 6, 4,6,8 ou 4-16; padrão 4-16)")
+    parser.add_argument("--markov-order", type=int,
+                        help="Ordem do modelo de Markov do censo (padrão: k-2)")
+    parser.add_argument("--top", type=int, default=10,
+                        help="Palavras mais sub/super-representadas mostradas por k no censo")
+    parser.add_argument("--enzymes",
+                        help="Lista de enzimas (\"nome sítio [organismo]\" por linha, aceita IUPAC "
+                             "e o formato emboss_e do REBASE); padrão: lista interna")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processos para analisar as regiões (ou blocos de --whole-genome) "
+                             "em paralelo; 0 usa todos os núcleos")
+    parser.add_argument("--cache-dir", default=REPORT_CACHE_DIR,
+                        help="Cache dos resultados de cada região do relatório (padrão: data/cache/relatorio)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Recalcula todas as regiões do relatório, sem ler nem gravar o cache")
+    parser.add_argument("--db", nargs="?", const=DB_PATH,
+                        help="Grava os resultados também no banco SQLite (padrão: "
+                             "results/resultados.sqlite); consultas com src/comum/banco.py")
+    parser.add_argument("--profile-out",
+                        help="Grava tempos por etapa e contadores neste arquivo ao final")
+    parser.add_argument("--profile-format", choices=perfil.FORMATS, default="json",
+                        help="Formato de --profile-out: json (resumo) ou chrome (trace para "
+                             "chrome://tracing ou Perfetto)")
     
     args = parser.parse_args()
     
+    if args.profile_out:
+        perfil.enable(args.profile_out, args.profile_format)
+    
+    if args.workers < 0:
+        print("Erro: --workers deve ser 0 ou maior")
+        sys.exit(1)
+    if args.workers == 0:
+        import paralelo
+        args.workers = paralelo.default_workers()
+    
+    if args.census:
+        try:
+            ks = parse_census_ks(args.census)
+        except ValueError:
+            print(f"Erro: --census inválido: {args.census}")
+            sys.exit(1)
+        if not os.path.exists(args.fasta):
+            print(f"Erro: Arquivo {os.path.abspath(args.fasta)} não encontrado!")
+            sys.exit(1)
+        try:
+            run_census(args.fasta, ks, args.markov_order, args.top, args.output, args.format)
+        except ValueError as e:
+            print(f"Erro: {e}")
+            sys.exit(1)
+        return
+    
+    if args.whole_genome:
+        if args.k and args.k % 2 != 0:
+            print("Erro: k deve ser um número par")
+            sys.exit(1)
+        if args.max_length < 2 or args.max_length % 2 != 0:
+            print("Erro: --max-length deve ser um número par")
+            sys.exit(1)
+        if args.chunk_size <= args.max_length:
+            print("Erro: --chunk-size deve ser maior que --max-length")
+            sys.exit(1)
+        if not os.path.exists(args.fasta):
+            print(f"Erro: Arquivo {os.path.abspath(args.fasta)} não encontrado!")
+            sys.exit(1)
+        if args.mismatches < 0 or args.max_gap < 0:
+            print("Erro: --mismatches e --max-gap devem ser 0 ou maiores")
+            sys.exit(1)
+        approximate = args.mismatches > 0 or args.max_gap > 0
+        if approximate and args.k:
+            print("Erro: --k não se aplica a palíndromos aproximados; use --min-length")
+            sys.exit(1)
+        db = banco.ResultsDB(args.db) if args.db else None
+        try:
+            if approximate:
+                scan_approximate_palindromes(args.fasta, args.mismatches, args.max_gap, args.min_length,
+                                             args.chunk_size, args.max_length, args.output,
+                                             args.format, db)
+                return
+            scan_whole_genome(args.fasta, args.k, args.min_length, args.chunk_size, args.max_length,
+                              load_site_scanner(args.enzymes), args.workers, args.output, args.format, db)
+        except ValueError as e:
+            print(f"Erro: {e}")
+            sys.exit(1)
+        finally:
+            if db is not None:
+                db.close()
+        return
+    
     # Se não especificou argumentos, executar análise completa
     if not args.k and not args.find_largest and not args.intervals:
         print("Executando análise completa da tarefa...")
@@ -625,6 +1570,8 @@ Exemplos de uso:
     
     # Carregar dados do genoma
     sequence, gb_record = load_genome_data()
+    cds_index = build_cds_index(gb_record)
+    scanner = load_site_scanner(args.enzymes)
     
     # Verificar se os intervalos estão dentro do genoma
     genome_length = len(sequence)
@@ -636,33 +1583,72 @@ Exemplos de uso:
     print(f"\nAnálise de {len(regions)} região(ões) do genoma Maribacter sp. HTCC2170")
     print(f"Tamanho do genoma: {genome_length:,} bp")
     
-    # Se solicitou análise específica, executar
-    if args.k or args.find_largest:
-        # Analisar cada região
-        for i, (start, end) in enumerate(regions):
-            analyze_region(sequence, gb_record, start, end, args.k)
-        
-        # Se solicitado, encontrar o maior palíndromo
-        if args.find_largest:
-            find_largest_palindrome(sequence, gb_record, regions)
+    # Resultados por região já calculados pela análise ou pelo relatório,
+    # reaproveitados na gravação no banco (--db) em vez de varrer de novo
+    region_results = {}
+    
+    # Com --workers > 1, as regiões são analisadas em processos separados que
+    # leem o genoma de um bloco de memória compartilhada (ver paralelo.py)
+    parallel = contextlib.nullcontext()
+    if args.workers > 1:
+        import paralelo
+        parallel = paralelo.ParallelGenome(sequence, args.workers, cds_index, scanner)
+    
+    with parallel as genome:
+        # Se solicitou análise específica, executar
+        if args.k or args.find_largest:
+            # Analisar cada região
+            if genome is not None:
+                for text in genome.analyze_regions(regions, args.k):
+                    print(text, end="")
+            else:
+                for i, (start, end) in enumerate(regions):
+                    region_results[(start, end)] = analyze_region(sequence, gb_record, start, end,
+                                                                  args.k, cds_index, scanner)
+            
+            # Se solicitado, encontrar o maior palíndromo
+            if args.find_largest:
+                region_palindromes = genome.region_palindromes(regions) if genome is not None else None
+                find_largest_palindrome(sequence, gb_record, regions, scanner, region_palindromes)
+            
+            print(f"\n{'='*60}")
+            print("ANÁLISE CONCLUÍDA")
+            print(f"{'='*60}")
         
-        print(f"\n{'='*60}")
-        print("ANÁLISE CONCLUÍDA")
-        print(f"{'='*60}")
+        # Gerar relatório completo, gravando cada região assim que fica pronta
+        if args.generate_report:
+            print("\nGerando relatório completo...")
+            cache_dir = None if args.no_cache else args.cache_dir
+            if genome is not None:
+                sections = genome.report_sections(regions, cache_dir)
+            else:
+                sections = (report_region_section(i, start, end, sequence[start-1:end], gb_record,
+                                                  cds_index, scanner, cache_dir)
+                            for i, (start, end) in enumerate(regions))
+            if args.db:
+                def keep_for_db(sections):
+                    for region, section in zip(regions, sections):
+                        region_results[region] = section['data']
+                        yield section
+                sections = keep_for_db(sections)
+            
+            # Salvar relatório no diretório results
+            results_dir = os.path.join("..", "..", "results")
+            os.makedirs(results_dir, exist_ok=True)
+            
+            report_path = os.path.join(results_dir, "relatorio_palindromos_maribacter.md")
+            with perfil.span("generate_report"), open(report_path, "w", encoding="utf-8") as f:
+                for piece in iter_report(sequence, gb_record, regions, cds_index, scanner, sections,
+                                         cache_dir):
+                    f.write(piece)
+                    f.flush()
+    
+    if args.db:
+        with banco.ResultsDB(args.db) as db:
+            store_region_results(db, sequence, regions, cds_index, scanner, args.enzymes,
+                                 region_results)
     
-    # Gerar relatório completo
     if args.generate_report:
-        print("\nGerando relatório completo...")
-        report = generate_report(sequence, gb_record, regions)
-        
-        # Salvar relatório no diretório results
-        results_dir = os.path.join("..", "..", "results")
-        os.makedirs(results_dir, exist_ok=True)
-        
-        report_path = os.path.join(results_dir, "relatorio_palindromos_maribacter.md")
-        with open(report_path, "w", encoding="utf-8") as f:
-            f.write(report)
-        
         print(f"Relatório salvo em: {os.path.abspath(report_path)}")
         print("\nResumo do relatório:")
         print("- Análise completa de palíndromos maximais")
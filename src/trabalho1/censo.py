@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+censo.py
+
+Censo dos k-mers palindrômicos do genoma inteiro: quantas vezes cada
+palavra palindrômica de tamanho k (par) aparece, comparado com o esperado
+por um modelo de Markov da própria sequência. Palavras muito abaixo do
+esperado são candidatas a sítios evitados (ex.: sítios de restrição).
+
+Cada k-mer é uma palavra inteira de 2 bits por base (uint64, até k = 32).
+As palavras de todos os tamanhos saem de uma única passada: a palavra do
+(k+1)-mer em i é a do k-mer deslocada mais a base i+k, e a do complemento
+reverso ganha o complemento da base i+k no grupo mais alto; um k-mer é
+palíndromo exatamente quando as duas palavras são iguais. As contagens são
+feitas com np.bincount (ou np.unique, quando 4^k não cabe num vetor).
+
+O esperado (k <= 16) usa o modelo de Markov de ordem m (padrão k-2, o
+maior possível):
+    E(w) = prod N(w[i:i+m+1]) / prod N(w[i+1:i+m+1])
+com N contado nas janelas sem N do genoma. Para k <= 16 o censo lista todas
+as 4^(k/2) palavras palindrômicas, inclusive as que não aparecem.
+"""
+
+from typing import Dict, Iterable, Iterator, Optional
+import os
+import sys
+
+import numpy as np
+
+# Módulos compartilhados entre os trabalhos (src/comum)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "comum"))
+import genoma2bit
+import perfil
+
+MAX_K = 32
+MAX_EXPECTED_K = 16
+# Até 4^12 palavras, as contagens vão direto para um vetor (bincount)
+_DENSE_LEVEL = 12
+
+
+def kmer_string(word: int, k: int) -> str:
+    """Palavra de 2 bits por base de volta para texto (A, C, G, T)."""
+    return "".join("ACGT"[(word >> (2 * (k - 1 - t))) & 3] for t in range(k))
+
+
+class _LevelCounts:
+    """Contagens dos l-mers (sem N) de um nível, consultáveis em vetor."""
+
+    def __init__(self, words: np.ndarray, level: int):
+        self.level = level
+        if level == 0:
+            self.total = len(words)
+        elif level <= _DENSE_LEVEL:
+            self.dense = np.bincount(words.astype(np.int64), minlength=4 ** level)
+        else:
+            self.words, self.counts = np.unique(words, return_counts=True)
+
+    def __getitem__(self, words: np.ndarray) -> np.ndarray:
+        if self.level == 0:
+            return np.full(len(words), self.total, dtype=np.int64)
+        if self.level <= _DENSE_LEVEL:
+            return self.dense[words.astype(np.int64)]
+        if not len(self.words):
+            return np.zeros(len(words), dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.words, words), len(self.words) - 1)
+        return np.where(self.words[pos] == words, self.counts[pos], 0)
+
+
+def palindromic_words(k: int) -> np.ndarray:
+    """
+    Todas as 4^(k/2) palavras palindrômicas de tamanho k, em ordem crescente:
+    a metade esquerda seguida do complemento reverso dela.
+    """
+    half = k // 2
+    left = np.arange(4 ** half, dtype=np.uint64)
+    right = np.zeros_like(left)
+    for t in range(half):
+        base = (left >> np.uint64(2 * (half - 1 - t))) & np.uint64(3)
+        right |= (np.uint64(3) - base) << np.uint64(2 * t)
+    return (left << np.uint64(2 * half)) | right
+
+
+def _markov_expected(words: np.ndarray, k: int, order: int,
+                     counts: Dict[int, _LevelCounts]) -> np.ndarray:
+    """E(w) pelo modelo de Markov de ordem `order`, com as contagens por nível."""
+    expected = np.ones(len(words), dtype=np.float64)
+    for i in range(k - order):
+        sub = (words >> np.uint64(2 * (k - i - order - 1))) & np.uint64(4 ** (order + 1) - 1)
+        expected *= counts[order + 1][sub]
+    for i in range(1, k - order):
+        sub = (words >> np.uint64(2 * (k - i - order))) & np.uint64(4 ** order - 1)
+        denominator = counts[order][sub].astype(np.float64)
+        expected = np.divide(expected, denominator, out=np.zeros_like(expected),
+                             where=denominator > 0)
+    return expected
+
+
+@perfil.timed("palindromic_census")
+def palindromic_census(codes: np.ndarray, ks: Iterable[int] = range(4, 17, 2),
+                       markov_order: Optional[int] = None) -> Dict[int, Dict[str, np.ndarray]]:
+    """
+    Conta os k-mers palindrômicos de codes (códigos 0..4; 4 interrompe as
+    janelas) para cada k pedido, numa única passada.
+
+    Args:
+        codes (np.ndarray): Sequência codificada (sequencias.encode, ou
+            vários registros separados por um código 4)
+        ks (iterable): Tamanhos pares, até 32
+        markov_order (int, optional): Ordem do modelo de Markov (padrão k-2)
+
+    Returns:
+        dict: {k: {"word", "observed", "expected"}}, vetores alinhados; para
+            k <= 16 todas as palavras palindrômicas (expected com o esperado),
+            acima disso só as observadas (expected None)
+    """
+    ks = sorted(set(ks))
+    if not ks:
+        return {}
+    if ks[0] < 2 or ks[-1] > MAX_K or any(k % 2 for k in ks):
+        raise ValueError(f"k deve ser par, entre 2 e {MAX_K}")
+    if markov_order is not None and markov_order < 0:
+        raise ValueError("A ordem do modelo de Markov deve ser 0 ou maior")
+
+    def order_for(k):
+        return k - 2 if markov_order is None else min(markov_order, k - 2)
+
+    # Níveis cujas contagens entram no modelo de Markov
+    levels = set()
+    for k in ks:
+        if k <= MAX_EXPECTED_K:
+            levels |= {order_for(k), order_for(k) + 1}
+
+    codes = np.asarray(codes, dtype=np.uint8)
+    n = len(codes)
+    perfil.count("bases_scanned", n)
+    is_n = codes > 3
+    bases = np.where(is_n, 0, codes).astype(np.uint64)
+    comp = np.uint64(3) - bases
+    counts: Dict[int, _LevelCounts] = {}
+    if 0 in levels:
+        counts[0] = _LevelCounts(bases[~is_n], 0)
+
+    census = {}
+    forward = np.zeros(n + 1, dtype=np.uint64)
+    revcomp = np.zeros(n + 1, dtype=np.uint64)
+    valid = np.ones(n + 1, dtype=bool)
+    with perfil.span("palindromic_census.sweep", ks=len(ks)):
+        for k in range(1, ks[-1] + 1):
+            m = n - k + 1
+            if m <= 0:
+                break
+            new = slice(k - 1, k - 1 + m)
+            forward = (forward[:m] << np.uint64(2)) | bases[new]
+            revcomp = revcomp[:m] | (comp[new] << np.uint64(2 * (k - 1)))
+            valid = valid[:m] & ~is_n[new]
+            if k in levels:
+                counts[k] = _LevelCounts(forward[valid], k)
+            if k not in ks:
+                continue
+            hits = forward[valid & (forward == revcomp)]
+            perfil.count("palindromic_kmers", len(hits))
+            if k <= MAX_EXPECTED_K:
+                # Índice pela metade esquerda: um bincount cobre todas as palavras
+                words = palindromic_words(k)
+                observed = np.bincount((hits >> np.uint64(k)).astype(np.int64),
+                                       minlength=4 ** (k // 2))
+                census[k] = {"word": words, "observed": observed,
+                             "expected": _markov_expected(words, k, order_for(k), counts)}
+            else:
+                words, observed = np.unique(hits, return_counts=True)
+                census[k] = {"word": words, "observed": observed, "expected": None}
+
+    # k maiores que a sequência: nenhuma ocorrência, mas o esperado ainda
+    # sai das contagens de ordem menor (zero se nem essas cabem)
+    for k in ks:
+        if k in census:
+            continue
+        if k > MAX_EXPECTED_K:
+            census[k] = {"word": np.empty(0, dtype=np.uint64),
+                         "observed": np.zeros(0, dtype=np.int64), "expected": None}
+            continue
+        words = palindromic_words(k)
+        m = order_for(k)
+        expected = (_markov_expected(words, k, m, counts) if m + 1 in counts
+                    else np.zeros(len(words)))
+        census[k] = {"word": words, "observed": np.zeros(len(words), dtype=np.int64),
+                     "expected": expected}
+    return census
+
+
+def genome_codes(fasta_path: str) -> np.ndarray:
+    """
+    Códigos de todos os registros do FASTA (pelo .2bit), separados por um
+    código 4, para que nenhuma janela cruze dois registros.
+    """
+    records = genoma2bit.open_genome(fasta_path).records.values()
+    parts = []
+    for record in records:
+        parts.append(record.codes(0, len(record)))
+        parts.append(np.full(1, 4, dtype=np.uint8))
+    return np.concatenate(parts) if parts else np.empty(0, dtype=np.uint8)
+
+
+def census_rows(census: Dict[int, Dict[str, np.ndarray]]) -> Iterator[list]:
+    """
+    Linhas (k, kmer, observed, expected, ratio) do censo, por k e palavra;
+    expected e ratio ficam vazios quando não calculados.
+    """
+    for k in sorted(census):
+        table = census[k]
+        expected = table["expected"]
+        for i, (word, observed) in enumerate(zip(table["word"].tolist(), table["observed"].tolist())):
+            if expected is None:
+                yield [k, kmer_string(word, k), observed, "", ""]
+                continue
+            e = float(expected[i])
+            ratio = f"{observed / e:.4f}" if e > 0 else ""
+            yield [k, kmer_string(word, k), observed, f"{e:.2f}", ratio]
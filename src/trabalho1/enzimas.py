@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+enzimas.py
+
+Varredura de sítios de enzimas de restrição com um autômato de Aho–Corasick.
+
+Cada sítio de reconhecimento (com códigos IUPAC degenerados, como GGNNCC),
+nas duas fitas, entra no autômato pela sua âncora: o trecho que mais
+restringe a sequência (2 bits por base fixa, 1 por base de 2 opções, 0 por N)
+entre os que se expandem em até MAX_ANCHOR_VARIANTS sequências ACGT. Sítios
+pouco degenerados são a própria âncora; nos cheios de N (XcmI,
+CCANNNNNNNNNTGG) só CCA entra no autômato e o resto do sítio é conferido a
+cada ocorrência da âncora, posição a posição, com uma máscara das bases
+aceitas. Assim o autômato não explode (4^9 sequências para XcmI) e a
+sequência continua sendo lida uma vez só, qualquer que seja o número de
+enzimas (milhares, no REBASE).
+"""
+
+import itertools
+import os
+import sys
+
+# Módulos compartilhados entre os trabalhos (src/comum)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "comum"))
+import sequencias
+
+# Códigos IUPAC de nucleotídeos
+IUPAC = {
+    "A": "A", "C": "C", "G": "G", "T": "T",
+    "R": "AG", "Y": "CT", "S": "CG", "W": "AT", "K": "GT", "M": "AC",
+    "B": "CGT", "D": "AGT", "H": "ACT", "V": "ACG", "N": "ACGT",
+}
+IUPAC_COMP = str.maketrans("ACGTRYSWKMBDHVN", "TGCAYRSWMKVHDBN")
+# Máscara das bases aceitas por código IUPAC: bit c para o código c (A=0..T=3);
+# N na sequência (código 4) nunca é aceito
+IUPAC_MASK = {code: sum(1 << "ACGT".index(b) for b in bases) for code, bases in IUPAC.items()}
+
+# Maior número de sequências ACGT em que a âncora de um sítio se expande
+MAX_ANCHOR_VARIANTS = 16
+# Bits de informação de uma posição do sítio, pelo número de bases aceitas
+_POSITION_BITS = {1: 2.0, 2: 1.0, 3: 0.415, 4: 0.0}
+
+# Base de dados de enzimas de restrição (REBASE simplificada)
+# (nome, sítio de reconhecimento, organismo de origem)
+ENZYMES = [
+    ("HindIII", "AAGCTT", "Haemophilus influenzae Rd"),
+    ("PstI", "CTGCAG", "Providencia stuartii"),
+    ("EcoRI", "GAATTC", "Escherichia coli R"),
+    ("BamHI", "GGATCC", "Bacillus amyloliquefaciens H"),
+    ("SalI", "GTCGAC", "Streptomyces albus G"),
+    ("BstEII", "GTATAC", "Bacillus stearothermophilus EII"),
+    ("NarI", "GGCGCC", "Nocardia argentinensis"),
+    ("NdeI", "CATATG", "Neisseria denitrificans"),
+    ("SmaI", "CCCGGG", "Serratia marcescens"),
+    ("NotI", "GCGGCCGC", "Nocardia otitidiscaviarum"),
+    ("XbaI", "TCTAGA", "Xanthomonas badrii"),
+    ("NheI", "GCTAGC", "Neisseria mucosa"),
+    ("KpnI", "GGTACC", "Klebsiella pneumoniae"),
+    ("SacI", "GAGCTC", "Streptomyces achromogenes"),
+    ("BglII", "AGATCT", "Bacillus globigii"),
+    ("AseI", "TTAATTAA", "Aquifex aeolicus"),
+    ("NaeI", "GCCGGC", "Nocardia aerocolonigenes"),
+]
+
+
+def clean_site(site):
+    """
+    Normaliza um sítio: maiúsculas e só letras IUPAC (remove marcas de corte como ^).
+    """
+    return "".join(c for c in site.upper() if c in IUPAC)
+
+
+def expand_iupac(site):
+    """
+    Expande um sítio degenerado em todas as sequências ACGT que ele representa.
+
+    Args:
+        site (str): Sítio em códigos IUPAC (ex: "GGNNCC")
+
+    Returns:
+        list: Sequências ACGT (ex: 16 para "GGNNCC")
+    """
+    return ["".join(p) for p in itertools.product(*(IUPAC[c] for c in site))]
+
+
+def choose_anchor(site):
+    """
+    Trecho do sítio que entra no autômato: o de mais bits de informação
+    (2 por base fixa, 1 por base de 2 opções...) entre os que se expandem em
+    até MAX_ANCHOR_VARIANTS sequências; no empate, o de menos variantes.
+
+    Returns:
+        tuple: (início, fim exclusivo) da âncora dentro do sítio
+    """
+    best, best_key = (0, 1), None
+    for a in range(len(site)):
+        variants, bits = 1, 0.0
+        for b in range(a, len(site)):
+            options = len(IUPAC[site[b]])
+            variants *= options
+            if variants > MAX_ANCHOR_VARIANTS:
+                break
+            bits += _POSITION_BITS[options]
+            key = (bits, -variants, -(b + 1 - a))
+            if best_key is None or key > best_key:
+                best, best_key = (a, b + 1), key
+    return best
+
+
+def load_rebase(path):
+    """
+    Lê uma lista de enzimas em texto: uma por linha, "nome sítio [organismo]".
+    Linhas vazias ou começando com # são ignoradas; aceita também o formato
+    emboss_e do REBASE (só as duas primeiras colunas são usadas).
+
+    Args:
+        path (str): Caminho do arquivo
+
+    Returns:
+        list: Tuplas (nome, sítio, organismo)
+    """
+    enzymes = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            fields = line.split(None, 2)
+            if len(fields) < 2:
+                continue
+            site = clean_site(fields[1])
+            if site:
+                organism = fields[2].strip() if len(fields) > 2 and not fields[2][0].isdigit() else "N/A"
+                enzymes.append((fields[0], site, organism))
+    return enzymes
+
+
+class SiteScanner:
+    """
+    Autômato de Aho–Corasick sobre os sítios de uma lista de enzimas.
+
+    A tabela de transições é completa (4 saídas por estado, já incluindo as
+    ligações de falha), então cada base custa uma consulta numa lista.
+    O autômato não muda depois de construído: scan() e advance() guardam o
+    estado em variáveis locais, então um mesmo SiteScanner pode ser usado
+    por várias threads. Só feed() mantém estado entre chamadas (para varrer
+    um genoma em pedaços sem perder sítios nas fronteiras), e por isso cada
+    varredura em pedaços deve ter o seu SiteScanner ou usar advance().
+    """
+
+    def __init__(self, enzymes=ENZYMES):
+        self.enzymes = [(name, clean_site(site), organism) for name, site, organism in enzymes]
+        self._site_lengths = [len(site) for _, site, _ in self.enzymes]
+
+        # Padrões: (índice da enzima, tamanho, fita, fim da âncora no sítio,
+        # máscaras do sítio inteiro ou None quando a âncora é o sítio todo)
+        self.patterns = []
+        delta = [-1] * 4   # transições do trie, 4 por estado
+        outputs = [[]]
+
+        for e, (name, site, organism) in enumerate(self.enzymes):
+            strands = [(site, 1)]
+            rc_site = site.translate(IUPAC_COMP)[::-1]
+            if rc_site != site:  # Sítio não palindrômico: procura também na outra fita
+                strands.append((rc_site, -1))
+            for pattern_site, strand in strands:
+                a, b = choose_anchor(pattern_site)
+                masks = None
+                if (a, b) != (0, len(pattern_site)):
+                    masks = bytes(IUPAC_MASK[c] for c in pattern_site)
+                p = len(self.patterns)
+                self.patterns.append((e, len(pattern_site), strand, b - 1, masks))
+                for anchor in set(expand_iupac(pattern_site[a:b])):
+                    state = 0
+                    for code in sequencias.encode_bytes(anchor):
+                        if delta[state * 4 + code] < 0:
+                            delta[state * 4 + code] = len(outputs)
+                            delta.extend([-1] * 4)
+                            outputs.append([])
+                        state = delta[state * 4 + code]
+                    outputs[state].append(p)
+
+        # Busca em largura: ligações de falha e transições que faltam
+        fail = [0] * len(outputs)
+        queue = []
+        for code in range(4):
+            child = delta[code]
+            if child < 0:
+                delta[code] = 0
+            else:
+                queue.append(child)
+        for state in queue:  # a fila cresce enquanto é percorrida
+            outputs[state].extend(outputs[fail[state]])
+            for code in range(4):
+                child = delta[state * 4 + code]
+                if child < 0:
+                    delta[state * 4 + code] = delta[fail[state] * 4 + code]
+                else:
+                    fail[child] = delta[fail[state] * 4 + code]
+                    queue.append(child)
+
+        # Saídas de cada estado na ordem (enzima, fita +/-): junto com a
+        # ordenação das ocorrências conferidas, dá a mesma ordem de saída
+        # qualquer que seja a divisão em pedaços
+        order = lambda p: (self.patterns[p][0], -self.patterns[p][2])
+        self._delta = delta
+        self._outputs = [tuple(sorted(out, key=order)) if out else None for out in outputs]
+        # Bases guardadas entre pedaços para conferir sítios que cruzam a fronteira
+        self._carry = max((length for _, length, _, _, _ in self.patterns), default=1) - 1
+        self._state = 0
+
+    @property
+    def states(self):
+        """Número de estados do autômato."""
+        return len(self._outputs)
+
+    def reset(self):
+        """Volta ao estado inicial (início de uma nova sequência)."""
+        self._state = 0
+
+    def advance(self, seq, offset=0, state=0):
+        """
+        Varre um pedaço de sequência a partir de um estado da varredura,
+        sem guardar nada no objeto.
+
+        Args:
+            seq (str): Pedaço da sequência
+            offset (int): Posição 0-based do primeiro caractere de seq na sequência completa
+            state: Estado devolvido para o pedaço anterior (0 no início da sequência)
+
+        Returns:
+            tuple: (tuplas (início_1based, fita, índice_da_enzima) em ordem de
+                fim do sítio, estado ao fim de seq). Um sítio degenerado que
+                termina depois de seq sai na chamada seguinte.
+        """
+        delta, outputs, patterns = self._delta, self._outputs, self.patterns
+        automaton, carry, pending = state if state else (0, b"", ())
+        codes = sequencias.encode_bytes(seq)
+        hits = []
+        anchored = list(pending)  # (início 0-based do sítio, padrão) a conferir
+
+        # Códigos das bases (sequencias.CODES); 4 reinicia a busca
+        for i, code in enumerate(codes):
+            if code > 3:  # N ou outro símbolo interrompe qualquer sítio
+                automaton = 0
+                continue
+            automaton = delta[automaton * 4 + code]
+            out = outputs[automaton]
+            if out:
+                for p in out:
+                    e, length, strand, anchor_end, masks = patterns[p]
+                    if masks is None:
+                        hits.append((offset + i - length + 2, strand, e))
+                    else:
+                        anchored.append((offset + i - anchor_end, p))
+
+        if anchored:
+            hits, pending = self._check_anchored(hits, anchored, carry + codes,
+                                                 offset - len(carry), offset + len(codes))
+        else:
+            pending = ()
+        if self._carry:
+            carry = codes[-self._carry:] if len(codes) >= self._carry else (carry + codes)[-self._carry:]
+        return hits, (automaton, carry, pending)
+
+    def _check_anchored(self, hits, anchored, buf, buf_start, buf_end):
+        """
+        Confere, base a base, os sítios cujas âncoras foram vistas; os que
+        ainda não terminaram em buf ficam pendentes para o próximo pedaço.
+        """
+        patterns = self.patterns
+        pending = []
+        for start, p in anchored:
+            e, length, strand, _, masks = patterns[p]
+            if start + length > buf_end:
+                pending.append((start, p))
+                continue
+            j = start - buf_start
+            if j >= 0 and all(mask >> buf[j + t] & 1 for t, mask in enumerate(masks)):
+                hits.append((start + 1, strand, e))
+        lengths = self._site_lengths
+        hits.sort(key=lambda h: (h[0] + lengths[h[2]], h[2], -h[1]))
+        return hits, tuple(pending)
+
+    def feed(self, seq, offset=0):
+        """
+        Continua a varredura com mais um pedaço de sequência (estado guardado
+        no objeto; não usar o mesmo SiteScanner em duas varreduras ao mesmo tempo).
+
+        Args:
+            seq (str): Próximo pedaço da sequência
+            offset (int): Posição 0-based do primeiro caractere de seq na sequência completa
+
+        Returns:
+            list: Tuplas (início_1based, fita, índice_da_enzima), em ordem de fim do sítio
+        """
+        hits, self._state = self.advance(seq, offset, self._state)
+        return hits
+
+    def scan(self, seq, offset=0):
+        """
+        Varre uma sequência inteira (sem estado anterior; não altera o de feed()).
+
+        Returns:
+            list: Tuplas (início_1based, fita, índice_da_enzima)
+        """
+        return self.advance(seq, offset)[0]
+
+    def scan_sites(self, seq, offset=0):
+        """
+        Varre uma sequência e agrupa as ocorrências por enzima.
+
+        Returns:
+            dict: {(nome, sítio, organismo): [(início_1based, fita), ...]}, na ordem da lista de enzimas
+        """
+        by_enzyme = {}
+        for start, strand, e in sorted(self.scan(seq, offset), key=lambda h: (h[2], h[0], -h[1])):
+            by_enzyme.setdefault(self.enzymes[e], []).append((start, strand))
+        return by_enzyme
+
+    def exact_matches(self, seq):
+        """
+        Enzimas cujo sítio corresponde à sequência inteira (ex: um palíndromo maximal).
+
+        Returns:
+            list: Tuplas (nome, sítio, organismo)
+        """
+        found = []
+        for start, strand, e in self.scan(seq):
+            if start == 1 and len(self.enzymes[e][1]) == len(seq) and self.enzymes[e] not in found:
+                found.append(self.enzymes[e])
+        return found
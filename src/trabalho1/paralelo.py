@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+paralelo.py
+
+Execução em vários processos das análises de bacter_final.py.
+
+O genoma é copiado uma única vez para um bloco de multiprocessing.shared_memory
+(1 byte por base; num FASTA com vários registros, um depois do outro no mesmo
+bloco); cada processo do pool se conecta ao bloco pelo nome e lê só os
+trechos de que precisa, sem receber a sequência por pickle. As tarefas
+(regiões de --intervals ou blocos do genoma inteiro, com sobreposição) são
+distribuídas pelo pool e os resultados voltam na ordem original.
+
+Com o perfil ligado (perfil.enable), os processos do pool também medem: cada
+tarefa devolve os seus spans e contadores, somados ao perfil do principal.
+"""
+
+import contextlib
+import io
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+
+import bacter_final
+import enzimas
+import genoma2bit
+import perfil
+import sequencias
+
+# Estado de cada processo do pool (preenchido por _init_worker)
+_worker = {}
+
+
+class SharedSequence:
+    """
+    Sequência guardada num bloco de memória compartilhada. Imita a parte de
+    str usada pelas análises: len() e fatias (seq[a:b] devolve str).
+    """
+
+    def __init__(self, shm, length, record_id=""):
+        self._buf = shm.buf
+        self._length = length
+        self.id = record_id
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._length)
+            return bytes(self._buf[start:stop]).decode("ascii")[::step]
+        return self[key:key + 1] if key >= 0 else self[self._length + key:self._length + key + 1]
+
+
+def share_sequences(sequences, piece=1 << 22):
+    """
+    Copia sequências (str ou genoma2bit.PackedSequence) para um único bloco
+    de memória compartilhada, uma depois da outra, em pedaços, sem montar a
+    str inteira de nenhuma.
+
+    Returns:
+        tuple: (SharedMemory, início de cada sequência no bloco); quem chama
+            deve fechar o bloco e liberá-lo com unlink
+    """
+    offsets, total = [], 0
+    for sequence in sequences:
+        offsets.append(total)
+        total += len(sequence)
+    shm = shared_memory.SharedMemory(create=True, size=max(total, 1))
+    for offset, sequence in zip(offsets, sequences):
+        for start in range(0, len(sequence), piece):
+            chunk = sequencias.as_bytes(sequence[start:start + piece]).upper()
+            shm.buf[offset + start:offset + start + len(chunk)] = chunk
+    return shm, offsets
+
+
+def share_sequence(sequence, piece=1 << 22):
+    """
+    Copia uma sequência para um bloco de memória compartilhada (ver share_sequences).
+
+    Returns:
+        SharedMemory: Bloco criado (quem chama deve fechar e liberar com unlink)
+    """
+    return share_sequences([sequence], piece)[0]
+
+
+def _attach(name):
+    """
+    Conecta-se a um bloco existente. Os processos do pool usam o mesmo
+    resource_tracker do processo principal, que libera o bloco (unlink).
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        # Antes do 3.13 o construtor registra o bloco no resource_tracker.
+        # Como o tracker é o do processo principal (um conjunto de nomes),
+        # um unregister depois apagaria o registro do dono; em vez disso o
+        # registro é desligado só durante esta chamada.
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+def _init_worker(shm_name, length, record_id, cds_index, enzyme_list, profile=False):
+    shm = _attach(shm_name)
+    _worker["shm"] = shm
+    _worker["sequence"] = SharedSequence(shm, length, record_id)
+    _worker["cds_index"] = cds_index
+    _worker["scanner"] = enzimas.SiteScanner(enzyme_list)
+    # Com fork o processo herda o perfil do principal: começa do zero
+    perfil.reset()
+    if profile:
+        perfil.enable()
+
+
+def _profiled_task(task):
+    """Executa func(arg) e devolve o resultado com o perfil registrado na tarefa."""
+    func, arg = task
+    result = func(arg)
+    return result, perfil.collect()
+
+
+def _merge_profiles(results):
+    for result, (events, counters) in results:
+        perfil.merge(events, counters)
+        yield result
+
+
+class ParallelGenome:
+    """
+    Genoma em memória compartilhada com um pool de processos conectado a ele.
+    Use como gerenciador de contexto: ao sair, o pool é encerrado e o bloco liberado.
+
+    sequence também pode ser uma lista de registros: ficam todos no mesmo
+    bloco (e um só pool atende todos), e offsets dá o início de cada um.
+    """
+
+    def __init__(self, sequence, workers, cds_index=None, scanner=None):
+        self.workers = workers
+        self.cds_index = cds_index
+        self.scanner = scanner or bacter_final.default_site_scanner()
+        self._sequence = sequence
+        self._shm = None
+        self._pool = None
+        self.offsets = None
+
+    def __enter__(self):
+        if isinstance(self._sequence, (list, tuple)):
+            records, record_id = self._sequence, ""
+        else:
+            records, record_id = [self._sequence], getattr(self._sequence, "id", "")
+        self._shm, self.offsets = share_sequences(records)
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker,
+            initargs=(self._shm.name, sum(map(len, records)), record_id,
+                      self.cds_index, self.scanner.enzymes, perfil.enabled()))
+        return self
+
+    def __exit__(self, *exc):
+        self._pool.shutdown()
+        self._shm.close()
+        self._shm.unlink()
+        return False
+
+    def map(self, func, tasks):
+        """Executa func em cada tarefa no pool; resultados na ordem das tarefas."""
+        if not perfil.enabled():
+            return self._pool.map(func, tasks)
+        return _merge_profiles(self._pool.map(_profiled_task, [(func, task) for task in tasks]))
+
+    def analyze_regions(self, regions, k=None):
+        """Saída de analyze_region para cada região (texto), na ordem, à medida que ficam prontas."""
+        return self.map(_analyze_region_task, [(start, end, k) for start, end in regions])
+
+    def region_palindromes(self, regions):
+        """find_all_maximal_palindromes de cada região, na ordem."""
+        return list(self.map(_region_palindromes_task, regions))
+
+    def report_sections(self, regions, cache_dir=None):
+        """Seções do relatório (report_region_section) de cada região, na ordem, à medida que ficam prontas."""
+        return self.map(_report_section_task, [(i, region, cache_dir) for i, region in enumerate(regions)])
+
+
+def _analyze_region_task(task):
+    start, end, k = task
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        bacter_final.analyze_region(_worker["sequence"], None, start, end, k,
+                                    _worker["cds_index"], _worker["scanner"])
+    return out.getvalue()
+
+
+def _region_palindromes_task(region):
+    start, end = region
+    return bacter_final.find_all_maximal_palindromes(_worker["sequence"][start-1:end])
+
+
+def _report_section_task(task):
+    i, (start, end), cache_dir = task
+    return bacter_final.report_region_section(i, start, end, _worker["sequence"][start-1:end],
+                                              None, _worker["cds_index"], _worker["scanner"], cache_dir)
+
+
+def _tile_task(task):
+    """
+    Palíndromos maximais com centro em [a, b) e sítios que começam em [a, b)
+    do registro que começa em offset no bloco compartilhado (de tamanho n),
+    lendo do bloco só [a - half, b + half).
+    """
+    offset, n, a, b, half, k, min_length = task
+    lo, hi = max(0, a - half), min(n, b + half)
+    with perfil.span("scan_whole_genome.tile", start=a, bases=b - a):
+        tile = _worker["sequence"][offset + lo:offset + hi]
+
+        radii = bacter_final.rc_palindrome_radii(bacter_final.encode_sequence(tile))
+        shown, total, largest = [], 0, None
+        for c in range(max(a, 1), b):
+            r = min(radii[c - lo], half)
+            if r:
+                total += 1
+                if largest is None or 2 * r > largest[1] - largest[0]:
+                    largest = (c - r, c + r, tile[c-r-lo:c+r-lo])
+                if (2 * r == k) if k is not None else (2 * r >= min_length):
+                    shown.append((c - r, c + r, tile[c-r-lo:c+r-lo]))
+
+        sites = defaultdict(int)
+        for start, strand, e in _worker["scanner"].scan(tile, lo):
+            if a <= start - 1 < b:
+                sites[e] += 1
+
+    # Os mesmos contadores da varredura serial
+    perfil.count("bases_scanned", b - a)
+    perfil.count("centers_tested", b - max(a, 1))
+    perfil.count("palindromes_found", total)
+    perfil.count("hits_emitted", len(shown))
+    return shown, total, largest, dict(sites)
+
+
+def scan_whole_genome_tiles(fasta_path, k, min_length, chunk_size, max_length, scanner, workers, emit):
+    """
+    Versão paralela de bacter_final.scan_whole_genome: os registros do FASTA
+    (lidos pelo .2bit) vão juntos para um bloco de memória compartilhada, com
+    um só pool para o arquivo inteiro, e cada um é dividido em blocos de
+    chunk_size bases, com max_length/2 bases de contexto de cada lado.
+    Passa os palíndromos a emit(id, início, fim, sequência) na mesma ordem
+    da versão serial.
+
+    Returns:
+        tuple: (totals, largest, site_counts) no formato de print_whole_genome_summary
+    """
+    half = max_length // 2
+    longest_site = max((len(site) for _, site, _ in scanner.enzymes), default=0)
+    if longest_site > half:
+        raise ValueError(f"--max-length deve ser pelo menos {2 * longest_site} "
+                         "para contar sítios de restrição em blocos")
+
+    totals, largest = {}, {}
+    records = genoma2bit.open_genome(fasta_path).records
+    site_counts = {record_id: defaultdict(int) for record_id in records}
+
+    with ParallelGenome(list(records.values()), workers, scanner=scanner) as genome:
+        tasks, owners = [], []
+        for (record_id, record), offset in zip(records.items(), genome.offsets):
+            n = len(record)
+            for a in range(0, n, chunk_size):
+                tasks.append((offset, n, a, min(a + chunk_size, n), half, k, min_length))
+                owners.append(record_id)
+
+        for record_id, (shown, total, tile_largest, sites) in zip(owners, genome.map(_tile_task, tasks)):
+            for start, end, pal in shown:
+                emit(record_id, start, end, pal)
+            if total:
+                totals[record_id] = totals.get(record_id, 0) + total
+                best = largest.get(record_id)
+                if best is None or tile_largest[1] - tile_largest[0] > best[1] - best[0]:
+                    largest[record_id] = tile_largest
+            counts = site_counts[record_id]
+            for e, count in sites.items():
+                counts[e] += count
+
+    return totals, largest, site_counts
+
+
+def default_workers():
+    """Número padrão de processos: todos os núcleos disponíveis."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
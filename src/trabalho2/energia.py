@@ -0,0 +1,153 @@
+"""
+Energia livre (ΔG a 37 °C) de grampos pelo modelo de vizinhos mais próximos.
+
+A haste de um grampo com braço K tem K pares (prefixo[t] com sufixo[K-1-t])
+e K-1 empilhamentos entre pares vizinhos; o loop entra com uma penalidade
+que só depende do tamanho:
+    ΔG = soma dos empilhamentos + loop(L) + penalidade do par A·T terminal
+
+Tudo é feito em lote, sem laço por grampo: os códigos das bases (A=0, C=1,
+G=2, T=3, N=4) dos dois braços saem de uma indexação vetorial, cada par vira
+um código 5*base + parceira (0..24) e cada empilhamento o índice
+25*par + próximo par numa tabela de 625 valores. As energias são inteiras,
+em centésimos de kcal/mol (como no ViennaRNA), então as somas são exatas e
+cabem nas colunas int64 das tabelas de ocorrências.
+
+Parâmetros:
+    - empilhamentos Watson-Crick: SantaLucia (1998), ΔG37 unificado;
+    - loop: SantaLucia & Hicks (2004); um tamanho n fora da tabela usa o
+      maior tamanho tabelado x abaixo dele mais 2,44·R·T·ln(n/x) (acima
+      de 30, x = 30);
+    - par A·T terminal (só a ponta aberta da haste): +0,05.
+No modo aproximado os empilhamentos com um par G·T valem -0,5 e os com
+qualquer outro par errado (ou N) +0,5: médias grosseiras, só para ordenar
+candidatos. Mismatches terminais e bônus de loops especiais (tetraloops)
+ficam de fora.
+"""
+
+from typing import Dict
+import math
+import os
+import sys
+
+import numpy as np
+
+# Módulos compartilhados entre os trabalhos (src/comum)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "comum"))
+from sequencias import encode
+
+# Empilhamento Watson-Crick 5'-XY-3' (fita do prefixo), índice 4*X + Y
+NN_STACK = np.array([
+    -100, -144, -128, -88,    # AA AC AG AT
+    -145, -184, -217, -128,   # CA CC CG CT
+    -130, -224, -184, -144,   # GA GC GG GT
+    -58, -130, -145, -100,    # TA TC TG TT
+], dtype=np.int64)
+
+WOBBLE_STACK = -50
+MISMATCH_STACK = 50
+TERMINAL_AT = 5
+
+# Iniciação do loop do grampo (centésimos de kcal/mol), por tamanho
+LOOP_INITIATION: Dict[int, int] = {
+    3: 350, 4: 350, 5: 330, 6: 400, 7: 420, 8: 430, 9: 450, 10: 460,
+    12: 500, 14: 510, 16: 530, 18: 550, 20: 570, 25: 610, 30: 630,
+}
+_RT = 0.61632  # kcal/mol a 37 °C
+
+
+def _pair_class(a: int, b: int) -> str:
+    if a + b == 3:
+        return "wc"
+    if (a, b) in ((2, 3), (3, 2)):
+        return "wobble"
+    return "mismatch"
+
+
+def _build_stack_table() -> np.ndarray:
+    """Tabela de empilhamentos indexada por 25*(5a + b) + (5c + d)."""
+    table = np.empty(625, dtype=np.int64)
+    for a in range(5):
+        for b in range(5):
+            for c in range(5):
+                for d in range(5):
+                    kinds = {_pair_class(a, b), _pair_class(c, d)}
+                    if kinds == {"wc"}:
+                        value = NN_STACK[4 * a + c]
+                    elif "mismatch" in kinds:
+                        value = MISMATCH_STACK
+                    else:
+                        value = WOBBLE_STACK
+                    table[25 * (5 * a + b) + 5 * c + d] = value
+    return table
+
+
+STACK_TABLE = _build_stack_table()
+
+
+def loop_energy(loop: int) -> int:
+    """
+    Penalidade de um loop de `loop` bases (3 ou mais), em centésimos de kcal/mol.
+
+    Tamanhos fora de LOOP_INITIATION partem do maior tamanho tabelado
+    abaixo deles, com o termo logarítmico 2,44·R·T·ln(loop/tabelado).
+    """
+    if loop < 3:
+        raise ValueError("O loop de um grampo tem pelo menos 3 bases")
+    if loop in LOOP_INITIATION:
+        return LOOP_INITIATION[loop]
+    known = max(size for size in LOOP_INITIATION if size < loop)
+    return LOOP_INITIATION[known] + round(100 * 2.44 * _RT * math.log(loop / known))
+
+
+def loop_energies(loops: np.ndarray) -> np.ndarray:
+    """loop_energy para um vetor de tamanhos (uma consulta por tamanho distinto)."""
+    loops = np.asarray(loops, dtype=np.int64)
+    sizes, inverse = np.unique(loops, return_inverse=True)
+    return np.array([loop_energy(int(size)) for size in sizes], dtype=np.int64)[inverse]
+
+
+def hairpin_energies(codes: np.ndarray, starts: np.ndarray, loops: np.ndarray, K: int,
+                     batch: int = 1 << 18) -> np.ndarray:
+    """
+    ΔG37 de cada grampo candidato, em centésimos de kcal/mol.
+
+    Args:
+        codes (np.ndarray): Sequência codificada (sequencias.encode)
+        starts (np.ndarray): Inícios 0-based dos grampos em codes
+        loops (np.ndarray): Tamanho do loop de cada grampo
+        K (int): Tamanho do braço
+        batch (int): Grampos por lote (limita a memória das matrizes K por grampo)
+
+    Returns:
+        np.ndarray: Energias (int64), alinhadas com starts; negativas = estáveis
+    """
+    codes = np.asarray(codes, dtype=np.uint8)
+    starts = np.asarray(starts, dtype=np.int64)
+    loops = np.asarray(loops, dtype=np.int64)
+    energies = np.empty(len(starts), dtype=np.int64)
+    t = np.arange(K, dtype=np.int64)
+    for lo in range(0, len(starts), batch):
+        s, loop = starts[lo:lo + batch], loops[lo:lo + batch]
+        # Par t da haste: prefixo[t] com a base 2K+L-1-t do grampo
+        pairs = (5 * codes[s[:, None] + t].astype(np.int64)
+                 + codes[(s + 2 * K - 1 + loop)[:, None] - t])
+        stacks = STACK_TABLE[25 * pairs[:, :-1] + pairs[:, 1:]].sum(axis=1)
+        outer = pairs[:, 0]
+        energies[lo:lo + batch] = (stacks + loop_energies(loop)
+                                   + np.where((outer == 3) | (outer == 15), TERMINAL_AT, 0))
+    return energies
+
+
+def score_hairpins(hits):
+    """
+    A tabela de grampos (ocorrencias.HairpinHits) com a coluna energy
+    preenchida, calculada sobre hits.sequence.
+    """
+    codes = encode(hits.sequence)
+    return hits._derive(energy=hairpin_energies(codes, hits.start - 1, hits.loop, hits.K))
+
+
+def kcal(energies) -> np.ndarray:
+    """Centésimos de kcal/mol para kcal/mol."""
+    return np.asarray(energies) / 100
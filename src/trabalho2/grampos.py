@@ -1,134 +1,736 @@
-from typing import List, Dict
-import re
-import csv
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import argparse
+import bisect
 import sys
-import requests
 import os
+import numpy as np
 
-# Tabela para fazer complemento: A vira T, C vira G, etc.
-COMP = str.maketrans("ACGTNacgtn", "TGCANtgcan")
+import energia
+import regioes
 
+# Módulos compartilhados entre os trabalhos (src/comum)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "comum"))
+import banco
+import perfil
+from ocorrencias import ApproxHairpinHits, HairpinHits
+import saida
 
-def revcomp(seq: str) -> str:
+# Normalização compartilhada (bytes.translate, uma vez por sequência):
+# clean() deixa só ACGTN maiúsculas, revcomp() faz o complemento reverso e
+# encode() dá os códigos A=0, C=1, G=2, T=3, N=4. Uma base pareia com outra
+# quando a soma dos códigos dá 3 (A+T, C+G); N (4) nunca pareia.
+from sequencias import clean, encode, revcomp
+
+
+def find_hairpin_candidates(codes: np.ndarray, K: int, min_total: int = 12,
+                            max_total: int = 20) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Encontra todos os grampos candidatos (antes de remover sobreposições).
+    Compara, para todas as posições e todos os tamanhos de loop de uma vez,
+    cada base do prefixo com a base correspondente do sufixo.
+    Devolve (inícios 0-based, loops), ordenados por início e depois por loop.
+    """
+    loops = _loop_sizes(K, min_total, max_total)
+    n = len(codes)
+    if loops.size == 0 or n < 2 * K + loops[0]:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    # Posições onde cabe ao menos o menor grampo; o enchimento com N (4)
+    # faz os grampos maiores que passam do fim falharem sozinhos
+    m = n - (2 * K + loops[0]) + 1
+    padded = np.concatenate([codes, np.full(2 * K + loops[-1], 4, dtype=np.uint8)])
+    windows = np.lib.stride_tricks.sliding_window_view(padded, m)
+
+    ok = np.ones((loops.size, m), dtype=bool)
+    for t in range(K):
+        # sufixo[t] deve parear com prefixo[K-1-t]
+        left = windows[K - 1 - t]
+        right = windows[K + t + loops]
+        ok &= (left + right) == 3
+
+    perfil.count("candidates_tested", ok.size)
+    loop_idx, starts = np.nonzero(ok)
+    order = np.lexsort((loop_idx, starts))
+    return starts[order].astype(np.int64), loops[loop_idx[order]]
+
+
+def _popcount(x: np.ndarray) -> np.ndarray:
+    """
+    Número de bits 1 de cada elemento de um vetor de inteiros sem sinal.
+    """
+    if hasattr(np, "bitwise_count"):  # NumPy >= 2.0
+        return np.bitwise_count(x).astype(np.int64)
+    # Soma de bits em paralelo dentro da palavra (SWAR)
+    x = x.astype(np.uint64)
+    x = x - ((x >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    x = (x & np.uint64(0x3333333333333333)) + ((x >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    x = (x + (x >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return ((x * np.uint64(0x0101010101010101)) >> np.uint64(56)).astype(np.int64)
+
+
+def pack_stems(codes: np.ndarray, K: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Empacota, para cada posição i, as K bases seguintes numa palavra de 2 bits
+    por base (uint32 até K = 16, uint64 até K = 32):
+    - forward[i]: a base i+t no grupo t (como prefixo);
+    - revcomp[i]: o complemento da base i+K-1-t no grupo t (como sufixo), de
+      modo que prefixo em i e sufixo em j pareiam exatamente quando
+      forward[i] == revcomp[j];
+    - nmask[i] / nmask_rev[i]: bit 2t ligado onde a base do grupo t é N
+      (None quando a sequência não tem N).
+    Devolve (forward, revcomp, nmask, nmask_rev), com len(codes) - K + 1 posições.
+    """
+    if K > 32:
+        raise ValueError("K deve ser no máximo 32")
+    word = np.uint32 if K <= 16 else np.uint64
+    m = len(codes) - K + 1
+    n_positions = codes == 4
+    has_n = bool(n_positions.any())
+    bases = (np.where(n_positions, 0, codes) if has_n else codes).astype(word)
+    comp = word(3) - bases
+    forward = np.zeros(m, dtype=word)
+    revcomp = np.zeros(m, dtype=word)
+    # Fatias contíguas deslocadas em t: K passadas sobre vetores, sem laço por posição
+    for t in range(K):
+        forward |= bases[t:t + m] << word(2 * t)
+        revcomp |= comp[t:t + m] << word(2 * (K - 1 - t))
+    if not has_n:
+        return forward, revcomp, None, None
+
+    is_n = n_positions.astype(word)
+    nmask = np.zeros(m, dtype=word)
+    nmask_rev = np.zeros(m, dtype=word)
+    for t in range(K):
+        nmask |= is_n[t:t + m] << word(2 * t)
+        nmask_rev |= is_n[t:t + m] << word(2 * (K - 1 - t))
+    return forward, revcomp, nmask, nmask_rev
+
+
+def find_approx_hairpin_candidates(codes: np.ndarray, K: int, min_total: int = 12,
+                                   max_total: int = 20, mismatches: int = 1,
+                                   wobble: bool = False) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Como find_hairpin_candidates, mas aceitando até `mismatches` pares da
+    haste que não pareiam e, com wobble, pares G·T.
+
+    Cada haste vira uma palavra de 2 bits por base (pack_stems); para cada
+    tamanho de loop, um XOR entre as palavras do prefixo e do sufixo marca
+    de uma vez os K pares, e um popcount conta os que não pareiam. O custo
+    por candidato não depende de K.
+    Devolve (inícios 0-based, loops, mismatches), ordenados por início e loop.
+    """
+    loops = _loop_sizes(K, min_total, max_total)
+    n = len(codes)
+    if loops.size == 0 or n < 2 * K + loops[0]:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+    return _match_stems(*pack_stems(codes, K), K, loops, n, mismatches, wobble)
+
+
+def _loop_sizes(K: int, min_total: int, max_total: int) -> np.ndarray:
+    """
+    Tamanhos de loop válidos para K (3 a K-1, total entre min_total e max_total).
+    """
+    return np.array([loop for loop in range(3, K) if min_total <= 2 * K + loop <= max_total],
+                    dtype=np.int64)
+
+
+def _match_stems(forward: np.ndarray, revcomp: np.ndarray, nmask, nmask_rev, K: int,
+                 loops: np.ndarray, n: int, mismatches: int = 0,
+                 wobble: bool = False) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Compara, para cada tamanho de loop, a palavra do prefixo em i com a do
+    sufixo em i+K+loop (hastes empacotadas a 2 bits por base, com os pares
+    nos mesmos grupos). Sem mismatches nem wobble, basta a igualdade das
+    palavras; senão, XOR + popcount contam os pares que não pareiam.
+    Devolve (inícios 0-based, loops, mismatches), ordenados por início e loop.
+    """
+    word = forward.dtype.type
+    low = word(int("01" * K, 2))  # bit baixo de cada grupo de 2 bits
+    one = word(1)
+    exact = mismatches == 0 and not wobble
+
+    all_starts, all_loops, all_mm = [], [], []
+    for loop in loops.tolist():
+        m = n - (2 * K + loop) + 1
+        if m <= 0:
+            continue
+        perfil.count("candidates_tested", m)
+        left, right = forward[:m], revcomp[K + loop:K + loop + m]
+        if exact:
+            ok = left == right
+            if nmask is not None:
+                ok &= (nmask[:m] | nmask_rev[K + loop:K + loop + m]) == 0
+            ok = np.nonzero(ok)[0]
+            counts = np.zeros(ok.size, dtype=np.int64)
+        else:
+            x = left ^ right
+            differ = (x | (x >> one)) & low
+            if wobble:
+                # G·T e T·G: prefixo G/T (bit alto 1) e grupos diferindo só no bit alto
+                differ &= ~((x >> one) & ~x & (left >> one) & low)
+            if nmask is not None:
+                differ |= nmask[:m] | nmask_rev[K + loop:K + loop + m]
+            counts = _popcount(differ)
+            ok = np.nonzero(counts <= mismatches)[0]
+            counts = counts[ok]
+        all_starts.append(ok)
+        all_loops.append(np.full(ok.size, loop, dtype=np.int64))
+        all_mm.append(counts)
+
+    if not all_starts:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+    starts = np.concatenate(all_starts).astype(np.int64)
+    loops_out = np.concatenate(all_loops)
+    mm = np.concatenate(all_mm)
+    order = np.lexsort((loops_out, starts))
+    return starts[order], loops_out[order], mm[order]
+
+
+def sweep_hairpin_candidates(codes: np.ndarray, Ks: Iterable[int], min_total: int = 12,
+                             max_total: int = 20, mismatches: int = 0,
+                             wobble: bool = False) -> Dict[int, Tuple[np.ndarray, ...]]:
+    """
+    find_hairpin_candidates (ou find_approx_hairpin_candidates) para vários
+    K numa só varredura.
+
+    As palavras de 2 bits por base das hastes são estendidas uma base por
+    vez: a palavra do k-mer em i vira a do (k+1)-mer com um deslocamento e
+    um OU com a base i+k (e a do complemento reverso com o complemento da
+    base i+k no grupo mais alto). Cada K pedido é comparado assim que suas
+    palavras ficam prontas, então o custo é o de montar as hastes do maior
+    K uma vez, mais uma comparação O(1) por candidato (posição, K, loop).
+    Como as palavras guardam as bases inteiras, não há colisões.
+
+    Devolve {K: (inícios 0-based, loops)}; no modo aproximado (mismatches > 0
+    ou wobble), {K: (inícios, loops, mismatches)}.
+    """
+    wanted = sorted(set(Ks))
+    if not wanted:
+        return {}
+    if wanted[0] < 1 or wanted[-1] > 32:
+        raise ValueError("K deve estar entre 1 e 32")
+    approx = mismatches > 0 or wobble
+    word = np.uint32 if wanted[-1] <= 16 else np.uint64
+    two = word(2)
+    n = len(codes)
+    empty = np.empty(0, dtype=np.int64)
+    found = {K: (empty,) * (3 if approx else 2) for K in wanted}
+
+    n_positions = codes == 4
+    has_n = bool(n_positions.any())
+    bases = (np.where(n_positions, 0, codes) if has_n else codes).astype(word)
+    comp = word(3) - bases
+    is_n = n_positions.astype(word)
+    # Palavras dos 0-mers; a cada passo k o vetor perde a última posição
+    forward = np.zeros(n + 1, dtype=word)
+    revcomp = np.zeros(n + 1, dtype=word)
+    nmask = np.zeros(n + 1, dtype=word) if has_n else None
+    nmask_rev = np.zeros(n + 1, dtype=word) if has_n else None
+
+    for k in range(1, wanted[-1] + 1):
+        m = n - k + 1
+        if m <= 0:
+            break
+        new = slice(k - 1, k - 1 + m)
+        top = word(2 * (k - 1))
+        forward = (forward[:m] << two) | bases[new]
+        revcomp = revcomp[:m] | (comp[new] << top)
+        if has_n:
+            nmask = (nmask[:m] << two) | is_n[new]
+            nmask_rev = nmask_rev[:m] | (is_n[new] << top)
+        if k not in found:
+            continue
+        loops = _loop_sizes(k, min_total, max_total)
+        if loops.size == 0 or n < 2 * k + loops[0]:
+            continue
+        columns = _match_stems(forward, revcomp, nmask, nmask_rev, k, loops, n, mismatches, wobble)
+        found[k] = columns if approx else columns[:2]
+    return found
+
+
+def _select_greedy(hits: HairpinHits, order: np.ndarray) -> np.ndarray:
+    """
+    Percorre os grampos na ordem dada, descartando os que cruzam algum já escolhido.
+    """
+    chosen: List[int] = []
+    starts: List[int] = []  # inícios dos escolhidos, em ordem
+    ends: List[int] = []    # fins correspondentes
+    hit_starts, hit_ends = hits.start.tolist(), hits.end.tolist()
+
+    for i in order.tolist():
+        start, end = hit_starts[i], hit_ends[i]
+        p = bisect.bisect_left(starts, start)
+        # Basta olhar o vizinho da esquerda e o da direita
+        if p > 0 and ends[p - 1] >= start:
+            continue
+        if p < len(starts) and starts[p] <= end:
+            continue
+        starts.insert(p, start)
+        ends.insert(p, end)
+        chosen.append(i)
+
+    return np.array(chosen, dtype=np.int64)
+
+
+def _select_longest_first(hits: HairpinHits) -> np.ndarray:
     """
-    Faz o reverse-complement de uma sequência.
-    Exemplo: revcomp("TGGTAA") = "TTACCA"
+    Pega os grampos maiores primeiro, descartando os que cruzam algum já escolhido.
     """
-    return seq.translate(COMP)[::-1]
+    return _select_greedy(hits, np.lexsort((hits.start, -hits.length)))
 
 
-def clean(seq: str) -> str:
+def _select_most_stable(hits: HairpinHits) -> np.ndarray:
     """
-    Remove caracteres que não são DNA e deixa tudo maiúsculo.
-    Exemplo: clean("atcg123XYZ") = "ATCG"
+    Pega os grampos mais estáveis (menor ΔG) primeiro; empates vão para o
+    maior e depois para o que começa antes. Usa a coluna energy da tabela.
     """
-    return re.sub(r"[^ACGTNacgtn]", "", seq).upper()
+    if hits.energy is None:
+        raise ValueError("A seleção por energia precisa da coluna energy (energia.score_hairpins)")
+    return _select_greedy(hits, np.lexsort((hits.start, -hits.length, hits.energy)))
 
 
-def find_hairpins(seq: str, K: int, min_total: int = 12, max_total: int = 20) -> List[Dict]:
+def _select_weighted(hits: HairpinHits, weights: np.ndarray) -> np.ndarray:
+    """
+    Escalonamento de intervalos com pesos: escolhe o conjunto sem sobreposição
+    de maior peso total, em O(n log n) (programação dinâmica + busca binária).
+    """
+    order = np.lexsort((hits.start, hits.end)).tolist()
+    ends = hits.end[order].tolist()
+    starts = hits.start[order].tolist()
+    weights = weights[order].tolist()
+    best = [0] * (len(order) + 1)  # best[i] = melhor peso usando os i primeiros
+    prev = [0] * len(order)        # quantos grampos terminam antes do i-ésimo começar
+
+    for i, start in enumerate(starts):
+        prev[i] = bisect.bisect_left(ends, start)
+        best[i + 1] = max(best[i], weights[i] + best[prev[i]])
+
+    # Reconstrói a escolha de trás para frente
+    chosen: List[int] = []
+    i = len(order)
+    while i > 0:
+        if best[i] != best[i - 1]:  # o i-ésimo faz parte da melhor escolha
+            chosen.append(order[i - 1])
+            i = prev[i - 1]
+        else:
+            i -= 1
+
+    return np.array(chosen, dtype=np.int64)
+
+
+def _select_max_coverage(hits: HairpinHits) -> np.ndarray:
+    """
+    Escolhe os grampos que cobrem o maior número de bases.
+    """
+    return _select_weighted(hits, hits.length)
+
+
+def _select_max_count(hits: HairpinHits) -> np.ndarray:
+    """
+    Escolhe o maior número possível de grampos.
+    """
+    return _select_weighted(hits, np.ones(len(hits), dtype=np.int64))
+
+
+# Estratégias para remover sobreposições entre grampos
+# (cada uma devolve os índices dos grampos escolhidos)
+SELECTIONS = {
+    "longest": _select_longest_first,
+    "coverage": _select_max_coverage,
+    "count": _select_max_count,
+    "energy": _select_most_stable,
+}
+
+
+def select_non_overlapping(hits: HairpinHits, selection: str = "longest") -> HairpinHits:
+    """
+    Remove sobreposições entre grampos usando a estratégia escolhida
+    ("longest", "coverage", "count" ou "energy"). Devolve os escolhidos
+    ordenados por início. Com "energy", uma tabela ainda sem energias é
+    pontuada antes (energia.score_hairpins).
+    """
+    if selection not in SELECTIONS:
+        raise ValueError(f"Seleção desconhecida: {selection} (use {', '.join(SELECTIONS)})")
+    if selection == "energy" and hits.energy is None:
+        hits = energia.score_hairpins(hits)
+    chosen = SELECTIONS[selection](hits)
+    return hits[chosen[np.argsort(hits.start[chosen], kind="stable")]]
+
+
+@perfil.timed("find_hairpins")
+def find_hairpins(seq: str, K: int, min_total: int = 12, max_total: int = 20,
+                  selection: str = "longest", mismatches: int = 0,
+                  wobble: bool = False, score: bool = False,
+                  max_energy: Optional[float] = None) -> HairpinHits:
     """
     Procura grampos na sequência.
     Grampo = PREFIXO + LOOP + SUFIXO, onde SUFIXO é o reverse-complement do PREFIXO
+    Devolve uma tabela colunar (ocorrencias.HairpinHits): só as coordenadas
+    ficam guardadas; hits[i] monta o dicionário de um grampo quando pedido.
+    Com mismatches > 0 ou wobble, a haste pode ter até `mismatches` pares
+    que não pareiam (e pares G·T, com wobble); a tabela passa a ser uma
+    ApproxHairpinHits, com o número de mismatches de cada grampo.
+    Com score, selection="energy" ou max_energy, todos os candidatos recebem
+    o ΔG37 (energia.py, coluna energy) antes da seleção; max_energy (kcal/mol)
+    descarta os menos estáveis que ele.
     """
     S = clean(seq)
-    n = len(S)
-    hits: List[Dict] = []
-
-    # Para cada posição na sequência
-    for i in range(n):
-        # Testa diferentes tamanhos de loop
-        for loop in range(3, K):
-            L = 2 * K + loop  # Tamanho total
-            j = i + L
-            
-            # Verifica se cabe na sequência e está no tamanho certo
-            if L < min_total or L > max_total or j > n:
-                continue
-
-            # Pega o prefixo e sufixo
-            prefix = S[i:i + K]
-            suffix = S[i + K + loop:j]
-            
-            # Ignora se tem N
-            if "N" in prefix or "N" in suffix:
-                continue
-
-            # Verifica se é um grampo
-            if suffix == revcomp(prefix):
-                hits.append({
-                    "start": i + 1,
-                    "end": j,
-                    "loop": loop,
-                    "length": L,
-                    "substring": S[i:j],
-                    "prefix": prefix,
-                    "suffix": suffix
-                })
-
-    # Remove sobreposições (pega os maiores primeiro)
-    hits.sort(key=lambda h: (-h["length"], h["start"]))
-    chosen: List[Dict] = []
-    last_end = 0
-    
-    for h in hits:
-        if not chosen or h["start"] > last_end:
-            chosen.append(h)
-            last_end = h["end"]
+    perfil.count("bases_scanned", len(S))
+    approx = mismatches > 0 or wobble
 
-    chosen.sort(key=lambda h: h["start"])
+    # Codifica uma vez e testa todos os candidatos com operações vetoriais
+    codes = encode(S)
+    with perfil.span("find_hairpins.candidates", mismatches=mismatches, wobble=wobble):
+        if approx:
+            starts, loops, mm = find_approx_hairpin_candidates(codes, K, min_total, max_total,
+                                                              mismatches, wobble)
+        else:
+            starts, loops = find_hairpin_candidates(codes, K, min_total, max_total)
+    perfil.count("candidates_found", len(starts))
+    energies = _score_candidates(codes, K, starts, loops, selection, score, max_energy)
+    return _select_hits(S, K, starts, loops, mm if approx else None, selection, energies, max_energy)
+
+
+def _score_candidates(codes: np.ndarray, K: int, starts: np.ndarray, loops: np.ndarray,
+                      selection: str, score: bool, max_energy: Optional[float]) -> Optional[np.ndarray]:
+    """
+    ΔG37 dos candidatos (centésimos de kcal/mol), ou None se nada pede energia.
+    """
+    if not (score or selection == "energy" or max_energy is not None):
+        return None
+    with perfil.span("find_hairpins.energy", candidates=len(starts)):
+        return energia.hairpin_energies(codes, starts, loops, K)
+
+
+def _select_hits(S: str, K: int, starts: np.ndarray, loops: np.ndarray, mm,
+                 selection: str, energies: Optional[np.ndarray] = None,
+                 max_energy: Optional[float] = None) -> HairpinHits:
+    """
+    Monta a tabela dos candidatos (inícios 0-based), descarta os com ΔG acima
+    de max_energy e remove as sobreposições.
+    """
+    # Coordenadas 1-based: o grampo ocupa S[início-1:fim]
+    if mm is not None:
+        hits = ApproxHairpinHits(S, K, start=starts + 1, end=starts + 2 * K + loops, loop=loops,
+                                 mismatches=mm, energy=energies)
+    else:
+        hits = HairpinHits(S, K, start=starts + 1, end=starts + 2 * K + loops, loop=loops,
+                           energy=energies)
+    if max_energy is not None:
+        hits = hits.filter(hits.energy <= round(100 * max_energy))
+
+    # Remove sobreposições
+    with perfil.span("find_hairpins.selection", selection=selection):
+        chosen = select_non_overlapping(hits, selection)
+    perfil.count("hits_emitted", len(chosen))
     return chosen
 
 
+@perfil.timed("find_hairpins_sweep")
+def find_hairpins_sweep(seq: str, Ks: Iterable[int], min_total: int = 12, max_total: int = 20,
+                        selection: str = "longest", mismatches: int = 0,
+                        wobble: bool = False, score: bool = False,
+                        max_energy: Optional[float] = None) -> Dict[int, HairpinHits]:
+    """
+    find_hairpins para vários K com uma só varredura da sequência
+    (sweep_hairpin_candidates). Devolve {K: tabela}, na ordem dos K pedidos,
+    com as mesmas tabelas que find_hairpins daria para cada K.
+    """
+    S = clean(seq)
+    perfil.count("bases_scanned", len(S))
+    approx = mismatches > 0 or wobble
+    Ks = list(dict.fromkeys(Ks))
+    codes = encode(S)
+    with perfil.span("find_hairpins_sweep.candidates", ks=len(Ks)):
+        found = sweep_hairpin_candidates(codes, Ks, min_total, max_total, mismatches, wobble)
+    result = {}
+    for K in Ks:
+        starts, loops, *mm = found[K]
+        perfil.count("candidates_found", len(starts))
+        energies = _score_candidates(codes, K, starts, loops, selection, score, max_energy)
+        result[K] = _select_hits(S, K, starts, loops, mm[0] if approx else None, selection,
+                                 energies, max_energy)
+    return result
+
+
+def iter_hairpin_candidates(seq, K: int, min_total: int = 12, max_total: int = 20,
+                            chunk_size: int = 1 << 20, mismatches: int = 0,
+                            wobble: bool = False, score: bool = False,
+                            max_energy: Optional[float] = None) -> Iterator[Tuple[int, ...]]:
+    """
+    Versão em pedaços de find_hairpin_candidates: lê chunk_size bases por vez
+    (mais max_total - 1 de sobra para os grampos que cruzam o fim do pedaço)
+    e gera (início 0-based, loop) em ordem de início e depois de loop.
+    No modo aproximado (mismatches > 0 ou wobble) gera (início, loop, mismatches).
+    Com score ou max_energy, o ΔG37 (centésimos de kcal/mol) vem no fim da
+    tupla, e max_energy (kcal/mol) descarta os menos estáveis.
+    seq pode ser uma str já limpa ou um registro do .2bit (genoma2bit).
+    """
+    approx = mismatches > 0 or wobble
+    n = len(seq)
+    for a in range(0, n, chunk_size):
+        b = min(n, a + chunk_size)
+        codes = encode(seq[a:min(n, b + max_total - 1)])
+        if approx:
+            columns = find_approx_hairpin_candidates(codes, K, min_total, max_total, mismatches, wobble)
+        else:
+            columns = find_hairpin_candidates(codes, K, min_total, max_total)
+        keep = columns[0] < b - a
+        if score or max_energy is not None:
+            columns = (*columns, energia.hairpin_energies(codes, columns[0], columns[1], K))
+            if max_energy is not None:
+                keep &= columns[-1] <= round(100 * max_energy)
+        perfil.count("candidates_found", int(keep.sum()))
+        yield from zip((columns[0][keep] + a).tolist(), *(c[keep].tolist() for c in columns[1:]))
+
+
+def iter_non_overlapping(candidates: Iterable[Tuple[int, ...]], selection: str = "longest",
+                         scored: bool = False) -> Iterator[Tuple[int, ...]]:
+    """
+    Seleção sem sobreposição feita em linha, sobre (início, fim, loop) 1-based
+    em ordem de início (outros campos depois do loop são repassados como estão;
+    com scored, o último é o ΔG37, usado pela seleção "energy").
+
+    Os candidatos são agrupados em blocos de grampos que se sobrepõem em
+    cadeia; um bloco fecha quando chega um candidato que começa depois do
+    fim de todos os anteriores. Como grampos de blocos diferentes nunca se
+    cruzam, escolher bloco a bloco dá o mesmo resultado que
+    select_non_overlapping sobre a lista inteira, guardando só um bloco.
+    """
+    if selection not in SELECTIONS:
+        raise ValueError(f"Seleção desconhecida: {selection} (use {', '.join(SELECTIONS)})")
+    if selection == "energy" and not scored:
+        raise ValueError("A seleção por energia precisa de candidatos com ΔG (scored=True)")
+    block: List[Tuple[int, ...]] = []
+    block_end = 0
+
+    def close_block():
+        starts, ends, loops = zip(*(c[:3] for c in block))
+        energies = [c[-1] for c in block] if scored else None
+        table = HairpinHits(None, 0, start=starts, end=ends, loop=loops, energy=energies)
+        chosen = SELECTIONS[selection](table)
+        for i in sorted(chosen.tolist(), key=lambda i: starts[i]):
+            yield block[i]
+
+    for candidate in candidates:
+        start, end = candidate[0], candidate[1]
+        if block and start > block_end:
+            yield from close_block()
+            block = []
+        block_end = max(block_end, end) if block else end
+        block.append(candidate)
+    if block:
+        yield from close_block()
+
+
+def iter_hairpins(seq, K: int, min_total: int = 12, max_total: int = 20,
+                  selection: str = "longest", chunk_size: int = 1 << 20,
+                  mismatches: int = 0, wobble: bool = False, score: bool = False,
+                  max_energy: Optional[float] = None) -> Iterator[Dict]:
+    """
+    Versão em fluxo de find_hairpins: gera os grampos escolhidos (os mesmos
+    dicionários, na mesma ordem) à medida que a varredura avança, com
+    memória limitada a um pedaço da sequência e um bloco de candidatos.
+    """
+    S = clean(seq) if isinstance(seq, str) else seq
+    perfil.count("bases_scanned", len(S))
+    scored = score or selection == "energy" or max_energy is not None
+    candidates = ((i + 1, i + 2 * K + loop, loop, *rest)
+                  for i, loop, *rest in iter_hairpin_candidates(S, K, min_total, max_total,
+                                                                chunk_size, mismatches, wobble,
+                                                                scored, max_energy))
+    for start, end, loop, *rest in iter_non_overlapping(candidates, selection, scored):
+        perfil.count("hits_emitted")
+        hit = {"start": start, "end": end, "loop": loop, "length": end - start + 1,
+               "substring": S[start - 1:end], "prefix": S[start - 1:start - 1 + K],
+               "suffix": S[start - 1 + K + loop:end]}
+        if scored:
+            hit["energy"] = round(rest.pop() / 100, 2)
+        if rest:
+            hit["mismatches"] = rest[0]
+        yield hit
+
+
+@perfil.timed("fetch_fasta_region")
 def fetch_fasta_region(accession: str, start: int, end: int) -> str:
     """
-    Baixa uma parte da sequência do NCBI.
+    Obtém uma parte da sequência: do FASTA local, do cache em disco ou,
+    se não tiver jeito, do NCBI (ver regioes.py).
     """
-    url = ("https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi"
-           f"?db=nuccore&id={accession}&rettype=fasta&retmode=text"
-           f"&strand=1&seq_start={start}&seq_stop={end}")
-    
-    resp = requests.get(url, timeout=30)
-    txt = resp.text
-    lines = txt.splitlines()
-    
-    # Pula o cabeçalho e pega só a sequência
-    seq = clean("\n".join(lines[1:]))
-    return seq
+    return fetch_fasta_regions(accession, [(start, end)])[0]
+
+
+def fetch_fasta_regions(accession: str, regions: List[Tuple[int, int]]) -> List[str]:
+    """
+    Obtém várias partes da sequência de uma vez (regiões próximas vão
+    juntas numa única requisição ao NCBI).
+    """
+    return [clean(seq) for seq in regioes.fetch_regions(accession, regions)]
 
 
-def print_hits(hits: List[Dict], label: str) -> None:
+def format_hit(h: Dict) -> str:
+    """
+    Linha de texto de um grampo, como mostrada por print_hits.
+    """
+    text = (f"pos {h['start']}-{h['end']:>5}  len={h['length']:<2}  loop={h['loop']:<2}  "
+            f"hairpin='{h['substring']}'  prefix={h['prefix']}  suffix={h['suffix']}")
+    if "mismatches" in h:
+        text += f"  mismatches={h['mismatches']}"
+    if "energy" in h:
+        text += f"  dG={h['energy']:.2f}"
+    return text
+
+
+def hit_row(h: Dict) -> List:
+    """
+    Valores de um grampo na ordem das colunas do CSV (HairpinHits.CSV_HEADER,
+    ou ApproxHairpinHits.CSV_HEADER no modo aproximado, mais "energy" quando há).
+    """
+    row = [h["start"], h["end"], h["length"], h["loop"], h["prefix"], h["suffix"], h["substring"]]
+    if "mismatches" in h:
+        row.append(h["mismatches"])
+    if "energy" in h:
+        row.append(h["energy"])
+    return row
+
+
+def print_hits(hits: HairpinHits, label: str) -> None:
     """
     Mostra os grampos encontrados.
     """
     print(f"\n{label}  total={len(hits)}")
     for h in hits:
-        print(
-            f"pos {h['start']}-{h['end']:>5}  len={h['length']:<2}  loop={h['loop']:<2}  "
-            f"hairpin='{h['substring']}'  prefix={h['prefix']}  suffix={h['suffix']}"
-        )
+        print(format_hit(h))
 
 
-def save_hits_csv(hits: List[Dict], path: str) -> None:
+def stream_hits(hits: Iterable[Dict], label: str, path: str, fmt: str = "csv",
+                columns: List[str] = HairpinHits.CSV_HEADER) -> int:
     """
-    Salva os resultados em um arquivo CSV.
+    Mostra e grava os grampos à medida que chegam (de iter_hairpins), sem
+    guardar a lista. Devolve quantos grampos foram gravados.
     """
-    with open(path, "w", newline="") as f:
-        w = csv.writer(f)
-        w.writerow(["start", "end", "length", "loop", "prefix", "suffix", "substring"])
+    print(f"\n{label}")
+    with saida.open_hit_writer(path, columns, fmt) as out:
         for h in hits:
-            w.writerow([h["start"], h["end"], h["length"], h["loop"], h["prefix"], h["suffix"], h["substring"]])
+            print(format_hit(h), flush=out.rows == 0)
+            out.write(hit_row(h))
+    print(f"total={out.rows}")
+    return out.rows
+
+
+def save_hits_csv(hits: HairpinHits, path: str) -> None:
+    """
+    Salva os resultados em um arquivo CSV (as sequências são lidas em lotes).
+    """
+    hits.to_csv(path)
+
+
+def store_hits(db: banco.ResultsDB, accession: str, a: int, b: int, K: int,
+               selection: str, spans: Iterable[Tuple[int, int]], mismatches: int = 0,
+               wobble: bool = False, max_total: int = 20,
+               max_energy: Optional[float] = None) -> int:
+    """
+    Grava no banco de resultados os grampos da região a-b, dados como pares
+    (início, fim) relativos à região; no banco ficam em coordenadas do genoma.
+    """
+    offset = a - 1
+    with perfil.span("db.store"), open_hit_store(db, accession, a, b, K, selection, mismatches,
+                                                 wobble, max_total, max_energy) as out:
+        out.extend((s + offset, e + offset, K, 0, None) for s, e in spans)
+    return out.count
+
+
+def open_hit_store(db: banco.ResultsDB, accession: str, a: int, b: int, K: int,
+                   selection: str, mismatches: int = 0, wobble: bool = False,
+                   max_total: int = 20, max_energy: Optional[float] = None) -> banco.DatasetWriter:
+    """
+    Conjunto do banco para os grampos da região a-b (use com with), gravado
+    em lotes à medida que os grampos chegam; ver store_streamed_hits.
+    """
+    params = {"K": K, "selection": selection, "mismatches": mismatches, "wobble": wobble,
+              "max_total": max_total}
+    if max_energy is not None:
+        params["max_energy"] = max_energy
+    return db.writer("grampos", accession, "hairpin", (a, b), params)
+
+
+def store_streamed_hits(hits: Iterable[Dict], out: banco.DatasetWriter, a: int,
+                        K: int) -> Iterator[Dict]:
+    """
+    Repassa os grampos de iter_hairpins (coordenadas relativas à região que
+    começa em a) e grava cada um no conjunto out, em coordenadas do genoma.
+    """
+    for h in hits:
+        out.add(h["start"] + a - 1, h["end"] + a - 1, K)
+        yield h
+
+
+def parse_ks(text: str) -> List[int]:
+    """
+    Lista de K da linha de comando: "6", "5,6,8" ou "5-10".
+    """
+    ks: List[int] = []
+    for part in text.split(","):
+        first, _, last = part.partition("-")
+        ks.extend(range(int(first), int(last or first) + 1))
+    if not ks or min(ks) < 1:
+        raise argparse.ArgumentTypeError(f"K inválido: {text}")
+    return list(dict.fromkeys(ks))
 
 
 def main() -> int:
     """
     Programa principal.
     """
+    parser = argparse.ArgumentParser(description="Detecção de grampos (hairpins) em DNA")
+    parser.add_argument("--selection", choices=sorted(SELECTIONS), default="longest",
+                        help="Como remover sobreposições: longest (maiores primeiro), "
+                             "coverage (mais bases cobertas), count (mais grampos) ou "
+                             "energy (mais estáveis primeiro, menor ΔG37)")
+    parser.add_argument("--profile-out",
+                        help="Grava tempos por etapa e contadores neste arquivo ao final")
+    parser.add_argument("--profile-format", choices=perfil.FORMATS, default="json",
+                        help="Formato de --profile-out: json (resumo) ou chrome (trace)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Na parte 2, mostra e grava cada grampo assim que é escolhido "
+                             "(memória constante, qualquer que seja o número de grampos)")
+    parser.add_argument("--format", choices=saida.FORMATS, default="csv",
+                        help="Formato do arquivo de resultados: csv, tsv ou md (tabela Markdown)")
+    parser.add_argument("--mismatches", type=int, default=0,
+                        help="Pares da haste que podem não parear (modo aproximado)")
+    parser.add_argument("--wobble", action="store_true",
+                        help="Aceita pares G·T na haste (modo aproximado)")
+    parser.add_argument("--ks", type=parse_ks, default=[6],
+                        help="Valores de K da parte 2: 6, 5,6,8 ou 5-10 (todos numa só varredura)")
+    parser.add_argument("--max-total", type=int, default=20,
+                        help="Tamanho máximo do grampo (prefixo + loop + sufixo)")
+    parser.add_argument("--energy", action="store_true",
+                        help="Calcula o ΔG37 (kcal/mol, vizinhos mais próximos) de cada grampo "
+                             "e o inclui na saída")
+    parser.add_argument("--max-energy", type=float,
+                        help="Descarta grampos com ΔG37 acima deste valor em kcal/mol "
+                             "(ex.: -3), antes de remover sobreposições")
+    parser.add_argument("--db", nargs="?", const=os.path.join("..", "..", "results", "resultados.sqlite"),
+                        help="Grava os grampos da parte 2 também no banco SQLite (padrão: "
+                             "results/resultados.sqlite); consultas com src/comum/banco.py")
+    args = parser.parse_args()
+
+    if args.mismatches < 0:
+        print("Erro: --mismatches deve ser 0 ou maior")
+        return 1
+    if args.profile_out:
+        perfil.enable(args.profile_out, args.profile_format)
+    approx = {"mismatches": args.mismatches, "wobble": args.wobble}
+    scoring = {"score": args.energy, "max_energy": args.max_energy}
+    scored = args.energy or args.selection == "energy" or args.max_energy is not None
     
-    # Parte 1: sequência do enunciado
+    # Parte 1: sequência do enunciado (K=6 e K=5 numa só varredura)
     s = "ATCTTAAAAACTGGTAACGAACTTACCAATACGTACTCGTTTTTCACACACACGTCACGTGATTTGATCACTTTTT"
     
-    for K in (6, 5):
-        hits = find_hairpins(s, K)
+    for K, hits in find_hairpins_sweep(s, (6, 5), selection=args.selection, **approx,
+                                       **scoring).items():
         print_hits(hits, f"(1) Enunciado  K={K}")
 
     # Parte 2: Maribacter
@@ -136,17 +738,58 @@ def main() -> int:
     a, b = 88450, 98458
 
     region = fetch_fasta_region(acc, a, b)
-    K2 = 6
-    hits2 = find_hairpins(region, K2)
-    print_hits(hits2, f"(2) Maribacter {acc}:{a}-{b}  K={K2}")
+    sizes = {"max_total": args.max_total}
 
-    # Salva em CSV no diretório results
+    # Salva no diretório results (CSV por padrão)
     results_dir = os.path.join("..", "..", "results")
     os.makedirs(results_dir, exist_ok=True)
-    
-    out_csv = os.path.join(results_dir, f"maribacter_{acc}_{a}_{b}_K{K2}.csv")
-    save_hits_csv(hits2, out_csv)
-    print(f"\nCSV salvo: {os.path.abspath(out_csv)}")
+    mode = (f"_mm{args.mismatches}" if args.mismatches else "") + ("_wobble" if args.wobble else "")
+    columns = ApproxHairpinHits.CSV_HEADER if mode else HairpinHits.CSV_HEADER
+    if scored:
+        columns = columns + ["energy"]
+
+    # Sem --stream, todos os K saem de uma só varredura da região
+    by_k = {} if args.stream else find_hairpins_sweep(region, args.ks, selection=args.selection,
+                                                      **sizes, **approx, **scoring)
+    db = banco.ResultsDB(args.db) if args.db else None
+    try:
+        for K2 in args.ks:
+            label = f"(2) Maribacter {acc}:{a}-{b}  K={K2}"
+            out_path = os.path.join(results_dir, f"maribacter_{acc}_{a}_{b}_K{K2}{mode}.{args.format}")
+
+            stored = None
+            if args.stream:
+                hits2 = iter_hairpins(region, K2, selection=args.selection, **sizes, **approx,
+                                      **scoring)
+                if db is None:
+                    stream_hits(hits2, label, out_path, args.format, columns)
+                else:
+                    # Cada grampo vai para o banco no caminho, em lotes (memória constante)
+                    with open_hit_store(db, acc, a, b, K2, args.selection, **sizes, **approx,
+                                        max_energy=args.max_energy) as out_db:
+                        stream_hits(store_streamed_hits(hits2, out_db, a, K2), label, out_path,
+                                    args.format, columns)
+                    stored = out_db.count
+            else:
+                hits2 = by_k[K2]
+                print_hits(hits2, label)
+                if args.format == "csv":
+                    save_hits_csv(hits2, out_path)
+                else:
+                    with saida.open_hit_writer(out_path, columns, args.format) as out:
+                        for h in hits2:
+                            out.write(hit_row(h))
+                if db is not None:
+                    stored = store_hits(db, acc, a, b, K2, args.selection,
+                                        zip(hits2.start.tolist(), hits2.end.tolist()), **sizes,
+                                        **approx, max_energy=args.max_energy)
+            print(f"\n{args.format.upper()} salvo: {os.path.abspath(out_path)}")
+
+            if stored is not None:
+                print(f"{stored} grampos gravados no banco: {os.path.abspath(args.db)}")
+    finally:
+        if db is not None:
+            db.close()
 
     return 0
 
@@ -0,0 +1,165 @@
+"""
+Obtenção de trechos de sequência com cache local.
+
+Ordem de busca para cada região (coordenadas 1-based, inclusivas):
+1. FASTA local (o mesmo data/maribacter_HTCC2170.fasta usado pelo trabalho 1),
+   se ele tiver o registro da accession pedida, lido pelo .2bit com mmap;
+2. cache em disco, uma entrada por (accession, início, fim);
+3. NCBI efetch, com sessão HTTP reaproveitada, novas tentativas e regiões
+   próximas agrupadas em uma única requisição.
+
+As funções devolvem o texto cru da sequência (sem cabeçalho nem quebras de
+linha); a limpeza fica com quem chama.
+"""
+
+from typing import Dict, List, Optional, Tuple
+import os
+import sys
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Módulos compartilhados entre os trabalhos (src/comum)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "comum"))
+import genoma2bit
+import perfil
+
+# URL do efetch; a variável NCBI_EFETCH_URL troca por um servidor local (ex.: em testes)
+EFETCH_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi"
+
+LOCAL_FASTA = os.path.join("..", "..", "data", "maribacter_HTCC2170.fasta")
+CACHE_DIR = os.path.join("..", "..", "data", "cache", "ncbi")
+
+# Regiões separadas por até MAX_GAP bases vão na mesma requisição
+MAX_GAP = 50_000
+
+_session: Optional[requests.Session] = None
+
+
+def get_session() -> requests.Session:
+    """
+    Devolve a sessão HTTP compartilhada (conexões reaproveitadas e novas
+    tentativas em erros temporários do NCBI).
+    """
+    global _session
+    if _session is None:
+        retry = Retry(total=4, backoff_factor=0.5,
+                      status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=frozenset(["GET"]))
+        _session = requests.Session()
+        _session.mount("http://", HTTPAdapter(max_retries=retry))
+        _session.mount("https://", HTTPAdapter(max_retries=retry))
+    return _session
+
+
+def read_local_region(path: str, accession: str, start: int, end: int) -> Optional[str]:
+    """
+    Lê o trecho [start, end] de um FASTA local, se ele cobrir a accession.
+    O FASTA é convertido uma vez para .2bit (ver comum/genoma2bit.py) e lido
+    com mmap, decodificando só o trecho pedido.
+    Devolve None quando o arquivo não tem o registro ou a região.
+    """
+    if not os.path.exists(path):
+        return None
+    rec = genoma2bit.open_genome(path).find(accession)
+    if rec is None or start < 1 or end > len(rec) or start > end:
+        return None
+    return rec[start - 1:end]
+
+
+def _cache_path(accession: str, start: int, end: int) -> str:
+    """
+    Caminho da entrada do cache em disco para uma região.
+    """
+    safe = "".join(c if c.isalnum() or c in "._-" else "_" for c in accession)
+    return os.path.join(CACHE_DIR, safe, f"{start}_{end}.seq")
+
+
+def _read_cache(accession: str, start: int, end: int) -> Optional[str]:
+    path = _cache_path(accession, start, end)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="ascii") as f:
+        return f.read()
+
+
+def _write_cache(accession: str, start: int, end: int, seq: str) -> None:
+    path = _cache_path(accession, start, end)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Grava em arquivo temporário e renomeia, para nunca deixar entrada pela metade
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="ascii") as f:
+        f.write(seq)
+    os.replace(tmp, path)
+
+
+def _efetch(accession: str, start: int, end: int) -> str:
+    """
+    Baixa um trecho do NCBI e devolve só a sequência (sem cabeçalho).
+    Uma resposta com tamanho diferente do pedido (cortada no meio, por
+    exemplo) levanta ValueError, para nunca ir para o cache.
+    """
+    params = {"db": "nuccore", "id": accession, "rettype": "fasta", "retmode": "text",
+              "strand": 1, "seq_start": start, "seq_stop": end}
+    url = os.environ.get("NCBI_EFETCH_URL", EFETCH_URL)
+    resp = get_session().get(url, params=params, timeout=30)
+    resp.raise_for_status()
+    lines = resp.text.splitlines()
+    if not lines or not lines[0].startswith(">"):
+        raise ValueError(f"Resposta inesperada do NCBI para {accession}:{start}-{end}")
+    seq = "".join(line.strip() for line in lines[1:])
+    if len(seq) != end - start + 1:
+        raise ValueError(f"Resposta incompleta do NCBI para {accession}:{start}-{end}: "
+                         f"{len(seq)} bases, esperadas {end - start + 1}")
+    return seq
+
+
+def _merge_spans(regions: List[Tuple[int, int]], max_gap: int) -> List[Tuple[int, int]]:
+    """
+    Junta regiões próximas (distância até max_gap) em trechos maiores.
+    """
+    spans: List[Tuple[int, int]] = []
+    for start, end in sorted(regions):
+        if spans and start <= spans[-1][1] + max_gap + 1:
+            spans[-1] = (spans[-1][0], max(spans[-1][1], end))
+        else:
+            spans.append((start, end))
+    return spans
+
+
+def fetch_regions(accession: str, regions: List[Tuple[int, int]],
+                  local_fasta: Optional[str] = None, max_gap: int = MAX_GAP) -> List[str]:
+    """
+    Obtém várias regiões de uma accession de uma vez.
+    Devolve as sequências na mesma ordem de regions.
+    """
+    if local_fasta is None:
+        local_fasta = LOCAL_FASTA
+    found: Dict[Tuple[int, int], str] = {}
+
+    for start, end in set(regions):
+        with perfil.span("regioes.local", start=start, end=end):
+            seq = read_local_region(local_fasta, accession, start, end)
+        if seq is None:
+            with perfil.span("regioes.cache", start=start, end=end):
+                seq = _read_cache(accession, start, end)
+            perfil.count("regions_from_cache", int(seq is not None))
+        else:
+            perfil.count("regions_from_local_fasta")
+        if seq is not None:
+            found[(start, end)] = seq
+
+    # O que faltou vai para o NCBI, em lotes de regiões próximas
+    missing = [r for r in set(regions) if r not in found]
+    for span_start, span_end in _merge_spans(missing, max_gap):
+        with perfil.span("regioes.efetch", start=span_start, end=span_end):
+            span = _efetch(accession, span_start, span_end)
+        perfil.count("ncbi_requests")
+        for start, end in missing:
+            if span_start <= start and end <= span_end:
+                seq = span[start - span_start:end - span_start + 1]
+                _write_cache(accession, start, end, seq)
+                found[(start, end)] = seq
+
+    return [found[r] for r in regions]
@@ -0,0 +1,158 @@
+"""
+Configuração comum dos testes: os módulos dos trabalhos ficam importáveis
+pelo nome, como quando os programas são executados de dentro de src/.
+"""
+
+from types import SimpleNamespace
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for part in (("src", "comum"), ("src", "trabalho1"), ("src", "trabalho2"), ("scripts",)):
+    sys.path.insert(0, os.path.join(ROOT, *part))
+
+# -- Referências ingênuas compartilhadas entre os testes --------------------
+# (importadas com "from conftest import ...")
+
+PAIRS = {("A", "T"), ("T", "A"), ("C", "G"), ("G", "C")}
+WOBBLE = {("G", "T"), ("T", "G")}
+COMPLEMENT = str.maketrans("ACGT", "TGCA")
+
+
+def pair_kind(a, b):
+    """Classe do par de bases (a, b): "wc", "wobble" (G·T) ou "mismatch"."""
+    if (a, b) in PAIRS:
+        return "wc"
+    if (a, b) in WOBBLE:
+        return "wobble"
+    return "mismatch"
+
+
+def naive_revcomp(seq):
+    """Complemento reverso (A, C, G, T; o resto fica como está)."""
+    return seq.translate(COMPLEMENT)[::-1]
+
+
+def random_sequence(rng, n, alphabet="ACGT", weights=None):
+    """Sequência aleatória de n símbolos de alphabet (com pesos opcionais)."""
+    return "".join(rng.choices(alphabet, weights, k=n))
+
+
+def write_fasta(path, records, width=60):
+    """Grava [(nome, sequência), ...] como FASTA, em linhas de width bases."""
+    with open(path, "w", encoding="utf-8") as f:
+        for name, seq in records:
+            f.write(f">{name} descrição qualquer\n")
+            for i in range(0, len(seq), width):
+                f.write(seq[i:i + width] + "\n")
+    return str(path)
+
+
+def write_genbank(path, features, seq="ACGT" * 500, record_id="CP000001.1"):
+    """Grava um GenBank com as features [(tipo, início 0-based, fim, fita, qualificadores), ...]."""
+    from Bio import SeqIO
+    from Bio.Seq import Seq
+    from Bio.SeqFeature import FeatureLocation, SeqFeature
+    from Bio.SeqRecord import SeqRecord
+
+    record = SeqRecord(Seq(seq), id=record_id, name="TESTE", description="registro de teste",
+                       annotations={"molecule_type": "DNA"})
+    for kind, start, end, strand, qualifiers in features:
+        record.features.append(SeqFeature(FeatureLocation(start, end, strand), type=kind,
+                                          qualifiers=qualifiers))
+    with open(path, "w", encoding="utf-8") as f:
+        SeqIO.write(record, f, "genbank")
+    return str(path)
+
+
+def cds_record(*spans):
+    """Registro no formato do Biopython só com as CDS (início 0-based, fim)."""
+    features = [SimpleNamespace(type="CDS", location=SimpleNamespace(start=s, end=e),
+                                qualifiers={"locus_tag": [f"L{i}"], "product": ["proteína"]})
+                for i, (s, e) in enumerate(spans)]
+    return SimpleNamespace(features=features)
+
+
+def naive_maximal_palindromes(seq):
+    """
+    (início 0-based, fim exclusivo, texto) de cada palíndromo maximal com
+    pelo menos 2 bases: expande cada centro par uma base por vez; N (e o
+    resto) nunca pareia.
+    """
+    found = []
+    upper = seq.upper()
+    for c in range(1, len(seq)):
+        left, right = c - 1, c
+        while left >= 0 and right < len(seq) and (upper[left], upper[right]) in PAIRS:
+            left -= 1
+            right += 1
+        if right - left > 2:
+            found.append((left + 1, right, seq[left + 1:right]))
+    return sorted(found)
+
+
+def naive_candidates(S, K, min_total=12, max_total=20):
+    """(início 0-based, loop) de todo grampo exato, como no laço original."""
+    found = []
+    for i in range(len(S)):
+        for loop in range(3, K):
+            L = 2 * K + loop
+            if L < min_total or L > max_total or i + L > len(S):
+                continue
+            prefix, suffix = S[i:i + K], S[i + K + loop:i + L]
+            if "N" not in prefix and "N" not in suffix and suffix == naive_revcomp(prefix):
+                found.append((i, loop))
+    return found
+
+
+def naive_approx_candidates(S, K, min_total, max_total, mismatches, wobble):
+    """(início, loop, mismatches) contando, par a par, os pares da haste que não pareiam."""
+    found = []
+    for i in range(len(S)):
+        for loop in range(3, K):
+            L = 2 * K + loop
+            if not min_total <= L <= max_total or i + L > len(S):
+                continue
+            allowed = {"wc", "wobble"} if wobble else {"wc"}
+            mm = sum(1 for t in range(K) if pair_kind(S[i + t], S[i + L - 1 - t]) not in allowed)
+            if mm <= mismatches:
+                found.append((i, loop, mm))
+    return found
+
+
+def naive_hairpin_candidates(S, K, min_total=12, max_total=20, mismatches=0, wobble=False):
+    """As referências exata ou aproximada, conforme o modo pedido (como o motor escolhe)."""
+    if mismatches or wobble:
+        return naive_approx_candidates(S, K, min_total, max_total, mismatches, wobble)
+    return naive_candidates(S, K, min_total, max_total)
+
+
+def naive_longest_first(candidates, K):
+    """Maiores primeiro, descartando quem cruza qualquer grampo já escolhido."""
+    chosen = []
+    for i, loop in sorted(candidates, key=lambda c: (-(2 * K + c[1]), c[0])):
+        start, end = i + 1, i + 2 * K + loop
+        if all(end < s or start > e for s, e in chosen):
+            chosen.append((start, end))
+    return sorted(chosen)
+
+
+def spans(hits):
+    """(início, fim) de cada linha de uma tabela de ocorrências."""
+    return list(zip(hits.start.tolist(), hits.end.tolist()))
+
+
+def non_overlapping(picked):
+    """Intervalos fechados (início, fim), em ordem, sem nenhuma base em comum."""
+    picked = sorted(picked)
+    return all(a[1] < b[0] for a, b in zip(picked, picked[1:]))
+
+
+def best_non_overlapping(candidates, weight):
+    """Maior soma de weight(início, fim) entre todos os subconjuntos sem sobreposição (força bruta)."""
+    best = 0
+    for mask in range(1, 1 << len(candidates)):
+        subset = [candidates[i] for i in range(len(candidates)) if mask >> i & 1]
+        if non_overlapping(subset):
+            best = max(best, sum(weight(s, e) for s, e in subset))
+    return best
@@ -0,0 +1,74 @@
+"""
+Cópia compacta das anotações (.anot) contra o GenBank lido pelo Biopython,
+e reconstrução quando o .gb muda de tamanho ou de data.
+"""
+
+import os
+
+from Bio import SeqIO
+
+import anotacoes
+from conftest import write_genbank
+
+
+FEATURES = [
+    ("source", 0, 2000, 1, {}),
+    ("gene", 10, 400, 1, {"locus_tag": ["L_0001"]}),
+    ("CDS", 10, 400, 1, {"locus_tag": ["L_0001"], "product": ["proteína hipotética"]}),
+    ("CDS", 500, 900, -1, {"locus_tag": ["L_0002"]}),
+    ("tRNA", 950, 1020, -1, {"product": ["tRNA-Ala"]}),
+    ("CDS", 1500, 1999, None, {"product": ["sem locus"]}),
+]
+
+
+def rows(annotations):
+    text = annotations.text
+    return [(text(annotations.type[i]), int(annotations.start[i]), int(annotations.end[i]),
+             int(annotations.strand[i]), text(annotations.locus[i]), text(annotations.product[i]))
+            for i in range(len(annotations))]
+
+
+def test_snapshot_matches_biopython(tmp_path):
+    path = write_genbank(tmp_path / "g.gb", FEATURES)
+    record = SeqIO.read(path, "genbank")
+    expected = [(f.type, int(f.location.start), int(f.location.end), f.location.strand or 0,
+                 f.qualifiers.get("locus_tag", [""])[0], f.qualifiers.get("product", [""])[0])
+                for f in record.features]
+
+    for _ in range(2):  # Construído e depois só mapeado
+        annotations = anotacoes.load_annotations(path)
+        assert rows(annotations) == expected
+        assert (annotations.id, annotations.length) == ("CP000001.1", 2000)
+        assert annotations.features_of_type("CDS").tolist() == [2, 3, 5]
+        assert annotations.features_of_type("rRNA").tolist() == []
+
+
+def test_rebuilds_when_genbank_changes(tmp_path, monkeypatch):
+    builds = []
+    build = anotacoes.build
+    monkeypatch.setattr(anotacoes, "build", lambda *args: (builds.append(args), build(*args)))
+    path = write_genbank(tmp_path / "g.gb", FEATURES)
+    anotacoes.load_annotations(path)
+    anotacoes.load_annotations(path)
+    assert len(builds) == 1
+
+    # Mesmo tamanho, .gb mais novo (outro locus_tag com o mesmo número de letras)
+    stat = os.stat(path)
+    write_genbank(path, FEATURES[:1] + [("gene", 10, 400, 1, {"locus_tag": ["L_9999"]})] + FEATURES[2:])
+    assert os.stat(path).st_size == stat.st_size
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert rows(anotacoes.load_annotations(path))[1][4] == "L_9999"
+    assert len(builds) == 2
+
+    # Tamanho diferente com a data de antes
+    stat = os.stat(path)
+    write_genbank(path, FEATURES[:3])
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert len(anotacoes.load_annotations(path)) == 3
+    assert len(builds) == 3
+
+    # Cabeçalho truncado também é refeito
+    with open(anotacoes.snapshot_path(path), "r+b") as f:
+        f.truncate(10)
+    assert len(anotacoes.load_annotations(path)) == 3
+    assert len(builds) == 4
@@ -0,0 +1,116 @@
+"""
+Palíndromos aproximados (LCE sobre S + $ + rc(S) + #) contra a extensão
+base a base de cada centro, com mismatches, espaçador, N, limite de braço
+e blocos pequenos.
+"""
+
+import random
+
+import numpy as np
+import pytest
+
+import aproximados
+from conftest import PAIRS, naive_maximal_palindromes, random_sequence
+
+
+def naive_lce(symbols, i, j, cap):
+    """Compara símbolo a símbolo; negativos nunca coincidem."""
+    length = 0
+    while (length < cap and i + length < len(symbols) and j + length < len(symbols)
+           and symbols[i + length] >= 0 and symbols[i + length] == symbols[j + length]):
+        length += 1
+    if i == j:
+        # Um sufixo contra ele mesmo: o índice responde o tamanho do sufixo
+        return min(len(symbols) - i, cap)
+    return length
+
+
+def naive_approximate(seq, mismatches, max_gap, min_length, half):
+    """
+    Para cada espaçador e cada centro, estende uma base por vez, gastando
+    um mismatch a cada par que não pareia; o palíndromo termina no último
+    par que pareia.
+    """
+    found = []
+    n = len(seq)
+    for gap in range(max_gap + 1):
+        for c in range(1, n):
+            if c + gap >= n:
+                continue
+            if gap >= 2 and (seq[c], seq[c + gap - 1]) in PAIRS:
+                continue
+            arm = used = best = best_used = 0
+            while arm < half and c - 1 - arm >= 0 and c + gap + arm < n:
+                if (seq[c - 1 - arm], seq[c + gap + arm]) in PAIRS:
+                    arm += 1
+                    best, best_used = arm, used
+                else:
+                    if used == mismatches:
+                        break
+                    used += 1
+                    arm += 1
+            if best and 2 * best + gap >= min_length:
+                found.append((c - best, c + best + gap, gap, best_used))
+    return sorted(found)
+
+
+def rows(hits):
+    return sorted(zip(hits.start.tolist(), hits.end.tolist(),
+                      hits.gap.tolist(), hits.mismatches.tolist()))
+
+
+def test_lce_matches_naive_comparison():
+    rng = random.Random(19)
+    for trial in range(60):
+        symbols = [rng.choice([0, 1, 2, 3, -1] if trial % 3 == 0 else [0, 1])
+                   for _ in range(rng.randint(1, 80))]
+        cap = rng.choice([None, 1, 3, 16])
+        index = aproximados.LCEIndex(np.array(symbols), cap=cap)
+        limit = index.cap
+        i = np.array([rng.randrange(len(symbols)) for _ in range(50)])
+        j = np.array([rng.randrange(len(symbols)) for _ in range(50)])
+        expected = [naive_lce(symbols, a, b, limit) for a, b in zip(i.tolist(), j.tolist())]
+        assert index.lce(i, j).tolist() == expected
+
+
+def test_approximate_matches_naive_extension():
+    rng = random.Random(5)
+    for trial in range(300):
+        alphabet = "ACGTN" if trial % 5 == 0 else ("AT" if trial % 3 == 0 else "ACGT")
+        seq = random_sequence(rng, rng.randint(0, 120), alphabet)
+        mismatches = rng.randint(0, 3)
+        max_gap = rng.randint(0, 4)
+        min_length = rng.randint(2, 10)
+        max_length = rng.choice([4, 8, 20, 1000])
+        tile_size = rng.choice([1 << 20, 7, 13])
+        hits = aproximados.find_approximate_palindromes(
+            seq, mismatches, max_gap, min_length, max_length, tile_size)
+        assert rows(hits) == naive_approximate(
+            seq, mismatches, max_gap, min_length, max_length // 2), (seq, mismatches, max_gap)
+
+
+def test_exact_case_matches_maximal_palindromes():
+    rng = random.Random(6)
+    for _ in range(50):
+        seq = random_sequence(rng, rng.randint(0, 200), rng.choice(["ACGT", "AT", "ACGTN"]))
+        hits = aproximados.find_approximate_palindromes(seq, 0, 0, min_length=4)
+        expected = [(s, e) for s, e, _ in naive_maximal_palindromes(seq) if e - s >= 4]
+        assert [(s, e) for s, e, _, _ in rows(hits)] == expected
+        assert not hits.gap.any() and not hits.mismatches.any()
+
+
+def test_mismatch_and_gap_examples():
+    # GAATTC com o par central trocado: um mismatch no meio
+    hits = aproximados.find_approximate_palindromes("GAAGTTC", 0, 1, min_length=6)
+    assert rows(hits) == [(0, 7, 1, 0)]
+    hits = aproximados.find_approximate_palindromes("GACATC", 1, 0, min_length=6)
+    assert rows(hits) == [(0, 6, 0, 1)]
+    assert len(aproximados.find_approximate_palindromes("GACATC", 0, 0, min_length=6)) == 0
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"mismatches": -1}, {"max_gap": -1}, {"max_length": 7}, {"max_length": 0},
+])
+def test_invalid_parameters(kwargs):
+    with pytest.raises(ValueError):
+        aproximados.find_approximate_palindromes("ACGT", **kwargs)
@@ -0,0 +1,140 @@
+"""
+Banco de resultados (SQLite): gravação em lotes, substituição de conjuntos,
+consultas por sobreposição contra um filtro direto e a gravação dos
+palíndromos da varredura do genoma inteiro.
+"""
+
+import random
+
+import pytest
+
+import banco
+import bacter_final
+
+
+@pytest.fixture
+def db(tmp_path):
+    with banco.ResultsDB(str(tmp_path / "resultados.sqlite")) as results:
+        yield results
+
+
+def hit_rows(db, accession=None):
+    sql = "SELECT accession, type, start, end, k, strand, name FROM hits"
+    args = ()
+    if accession:
+        sql += " WHERE accession=?"
+        args = (accession,)
+    return sorted(db.conn.execute(sql, args).fetchall())
+
+
+def naive_query(rows, start, end=None, min_k=None, k=None):
+    """Filtro direto: toda ocorrência com alguma base em [start, end]."""
+    end = float("inf") if end is None else end
+    found = {(s, e, hk, strand, name) for s, e, hk, strand, name in rows
+             if s <= end and e >= start
+             and (min_k is None or hk >= min_k) and (k is None or hk == k)}
+    return sorted(found, key=lambda r: (r[0], r[1]))
+
+
+def test_writer_flushes_at_batch_boundary(db):
+    n = banco.BATCH + 1
+    with db.writer("teste", "X.1", "palindrome", (1, 100_000), {"k": None}) as out:
+        for i in range(banco.BATCH - 1):
+            out.add(i + 1, i + 4, 4)
+        assert out.count == 0                 # ainda no lote pendente
+        out.add(banco.BATCH, banco.BATCH + 3, 4)
+        assert out.count == banco.BATCH       # lote cheio: inserido
+        out.add(n, n + 9, 10)
+        assert out.count == banco.BATCH
+    assert out.count == n
+    assert db.conn.execute("SELECT COUNT(*) FROM hits").fetchone()[0] == n
+    assert db._max_length("X.1", "palindrome") == 10
+
+
+def test_store_replaces_same_dataset_only(db):
+    assert db.store("teste", "X.1", "hairpin", (1, 500), {"K": 6}, [(1, 16, 6, 0, None)]) == 1
+    db.store("teste", "X.1", "hairpin", (1, 500), {"K": 5}, [(3, 16, 5, 0, None)])
+    db.store("teste", "X.1", "hairpin", (1, 500), {"K": 6}, [(20, 35, 6, 0, None), (40, 55, 6, 0, None)])
+    assert hit_rows(db) == [("X.1", "hairpin", 3, 16, 5, 0, None),
+                            ("X.1", "hairpin", 20, 35, 6, 0, None),
+                            ("X.1", "hairpin", 40, 55, 6, 0, None)]
+    assert db.conn.execute("SELECT COUNT(*) FROM datasets").fetchone()[0] == 2
+
+
+def test_error_keeps_previous_dataset(db):
+    db.store("teste", "X.1", "site", (1, 500), {}, [(10, 15, 6, 1, "EcoRI")])
+    with pytest.raises(RuntimeError):
+        with db.writer("teste", "X.1", "site", (1, 500), {}, batch=2) as out:
+            out.extend([(1, 6, 6, 1, "BamHI")] * 5)   # dois lotes já inseridos
+            raise RuntimeError("análise interrompida")
+    assert hit_rows(db) == [("X.1", "site", 10, 15, 6, 1, "EcoRI")]
+
+
+def test_unknown_type_is_rejected(db):
+    with pytest.raises(ValueError):
+        db.writer("teste", "X.1", "gene", (1, 2), {})
+
+
+def test_overlap_queries_match_naive_filter(db):
+    rng = random.Random(16)
+    rows = {"X.1": [], "Y.1": []}
+    for dataset in range(4):
+        for accession in rows:
+            hits = []
+            # Poucos longos (até 3 kb) no meio de muitos curtos: o limite da
+            # busca pelo maior comprimento tem de alcançar os longos
+            for _ in range(rng.randint(50, 400)):
+                start = rng.randint(1, 20_000)
+                length = rng.choice([rng.randint(2, 30)] * 30 + [rng.randint(500, 3000)])
+                hits.append((start, start + length - 1, length, rng.choice([0, 1, -1]), None))
+            db.store("teste", accession, "palindrome", (1, 25_000), {"lote": dataset}, hits)
+            rows[accession].extend(hits)
+    for _ in range(300):
+        accession = rng.choice(list(rows))
+        start = rng.randint(1, 23_000)
+        end = rng.choice([start, start + rng.randint(0, 2000), None])
+        min_k = rng.choice([None, None, 10, 600])
+        k = rng.choice([None] * 5 + [rng.randint(2, 30)])
+        assert db.query(accession, "palindrome", start, end, min_k=min_k, k=k) == \
+            naive_query(rows[accession], start, end, min_k, k)
+    assert db.query("Z.1", "palindrome") == []
+    assert db.query("X.1", "hairpin") == []
+
+
+def test_query_by_cds(db):
+    db.store_cds("X.1", [{"locus_tag": "L1", "product": "p1", "start": 100, "end": 200},
+                         {"locus_tag": "L2", "product": "p2", "start": 500, "end": 900}])
+    db.store("teste", "X.1", "hairpin", (1, 1000), {},
+             [(90, 100, 4, 0, None), (201, 215, 5, 0, None), (150, 160, 4, 0, None)])
+    assert db.find_cds("L2") == ("X.1", 500, 900, "p2")
+    assert db.query_cds("L1", "hairpin") == [(90, 100, 4, 0, None), (150, 160, 4, 0, None)]
+    assert db.query_cds("L1", "hairpin", min_k=5) == []
+    with pytest.raises(KeyError):
+        db.query_cds("L3", "hairpin")
+
+
+def test_store_palindromes_keeps_one_writer_per_record(db):
+    rng = random.Random(160)
+    emitted, expected = [], {"r1": [], "r2": [], "r3": []}
+    records = ["r1"] * 3 + ["r2"] * 2 + ["r1", "r3"] * 4
+    with bacter_final.store_palindromes(lambda *hit: emitted.append(hit), db, {"min_length": 4}) as emit:
+        for record in records:
+            for _ in range(rng.randint(1, banco.BATCH // 3)):
+                start = rng.randint(0, 50_000)
+                end = start + rng.randint(4, 40)
+                emit(record, start, end, "A" * (end - start))
+                expected[record].append((start + 1, end, end - start, 0, None))
+    assert len(emitted) == sum(map(len, expected.values()))
+    for record, hits in expected.items():
+        assert db.query(record, "palindrome") == naive_query(hits, 1)
+        assert db.conn.execute("SELECT COUNT(*) FROM datasets WHERE accession=?",
+                               (record,)).fetchone() == (1,)
+
+
+def test_store_palindromes_rolls_back_on_error(db):
+    db.store("bacter_final", "r1", "palindrome", (0, 0), {}, [(1, 4, 4, 0, None)])
+    with pytest.raises(KeyboardInterrupt):
+        with bacter_final.store_palindromes(lambda *hit: None, db, {}) as emit:
+            emit("r1", 10, 20, "A" * 10)
+            raise KeyboardInterrupt
+    assert db.query("r1", "palindrome") == [(1, 4, 4, 0, None)]
@@ -0,0 +1,54 @@
+"""
+Índice de intervalos das CDS (árvore implícita com o maior fim de cada
+subárvore) contra a varredura linear de todas as CDS.
+"""
+
+import random
+
+import bacter_final
+from conftest import cds_record
+
+
+def linear_scan(spans, start, end):
+    """CDS (1-based, em ordem de início e depois do arquivo) com alguma base em [start, end]."""
+    found = [(s + 1, e, f"L{i}") for i, (s, e) in enumerate(spans) if s + 1 <= end and e >= start]
+    return sorted(found, key=lambda cds: cds[0])
+
+
+def query(index, start, end):
+    return [(cds['start'], cds['end'], cds['locus_tag'])
+            for cds in bacter_final.query_cds_index(index, start, end)]
+
+
+def test_index_matches_linear_scan():
+    rng = random.Random(4)
+    for trial in range(200):
+        spans = []
+        for _ in range(rng.randint(0, 60)):
+            s = rng.randint(0, 2000)
+            spans.append((s, s + rng.choice([1, rng.randint(1, 50), rng.randint(100, 1500)])))
+        if spans and trial % 4 == 0:
+            spans += [spans[0]] * 3   # Inícios repetidos
+        index = bacter_final.build_cds_index(cds_record(*spans))
+        # Consultas nas próprias pontas das CDS (encostando) e ao acaso
+        points = [p for s, e in spans for p in (s, s + 1, e, e + 1)] + [0, 1, 4000]
+        for _ in range(100):
+            start = rng.choice(points + [rng.randint(0, 3600)])
+            end = rng.choice([start, start + rng.randint(0, 300), rng.choice(points)])
+            assert query(index, start, end) == linear_scan(spans, start, end)
+
+
+def test_touching_endpoints():
+    index = bacter_final.build_cds_index(cds_record((99, 200), (200, 300)))  # 100..200 e 201..300
+    assert query(index, 200, 200) == [(100, 200, "L0")]
+    assert query(index, 201, 201) == [(201, 300, "L1")]
+    assert query(index, 200, 201) == [(100, 200, "L0"), (201, 300, "L1")]
+    assert query(index, 1, 99) == []
+    assert query(index, 301, 400) == []
+
+
+def test_empty_index():
+    index = bacter_final.build_cds_index(cds_record())
+    assert index['cds'] == []
+    assert bacter_final.query_cds_index(index, 1, 10 ** 9) == []
+    assert bacter_final.annotate_cds_overlaps(index, [(1, 5), (6, 9)]) == [[], []]
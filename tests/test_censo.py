@@ -0,0 +1,80 @@
+"""
+Censo de k-mers palindrômicos (uma passada com palavras de 2 bits) contra
+a contagem direta das janelas de texto e o modelo de Markov calculado
+palavra a palavra.
+"""
+
+from collections import Counter
+import math
+import random
+
+import pytest
+
+import censo
+import sequencias
+from conftest import naive_revcomp, random_sequence
+
+
+def window_counts(seq, k):
+    """Janelas de tamanho k sem N; k = 0 conta as bases válidas."""
+    if k == 0:
+        return Counter({"": sum(1 for base in seq if base != "N")})
+    return Counter(seq[i:i + k] for i in range(len(seq) - k + 1) if "N" not in seq[i:i + k])
+
+
+def naive_expected(word, order, counts):
+    """E(w) = prod N(w[i:i+m+1]) / prod N(w[i+1:i+m+1]); 0 quando o denominador é zero."""
+    k = len(word)
+    numerator = math.prod(counts[order + 1][word[i:i + order + 1]] for i in range(k - order))
+    denominator = math.prod(counts[order][word[i:i + order]] for i in range(1, k - order))
+    return numerator / denominator if denominator else 0.0
+
+
+@pytest.mark.parametrize("order", [None, 0, 1, 3])
+def test_census_matches_window_counts(order):
+    rng = random.Random(23 if order is None else order)
+    ks = [2, 4, 6, 8, 14, 18]
+    for trial in range(12):
+        weights = [24, 24, 24, 24, 4] if trial % 2 else None
+        seq = random_sequence(rng, rng.randint(0, 300), "ACGTN" if weights else "ACGT", weights)
+        census = censo.palindromic_census(sequencias.encode(seq), ks, order)
+        counts = {k: window_counts(seq, k) for k in range(0, 20)}
+        for k in ks:
+            table = census[k]
+            words = [censo.kmer_string(w, k) for w in table["word"].tolist()]
+            assert all(w == naive_revcomp(w) for w in words)
+            observed = dict(zip(words, table["observed"].tolist()))
+            palindromes = {w: c for w, c in counts[k].items() if w == naive_revcomp(w)}
+            if k > censo.MAX_EXPECTED_K:
+                assert observed == palindromes
+                assert table["expected"] is None
+                continue
+            assert len(words) == 4 ** (k // 2)
+            assert all(observed[w] == palindromes.get(w, 0) for w in words)
+            m = k - 2 if order is None else min(order, k - 2)
+            # Palavras acima de k = 8 por amostra (4^7 palavras para k = 14)
+            pairs = list(zip(words, table["expected"].tolist()))
+            for w, e in (pairs if k <= 8 else rng.sample(pairs, 200)):
+                assert e == pytest.approx(naive_expected(w, m, counts), rel=1e-9, abs=1e-12)
+
+
+def test_record_separator_breaks_windows():
+    # GAATTC só aparece atravessando o separador: não conta
+    seq = "GAA" + "N" + "TTC" + "N" + "GAATTC"
+    census = censo.palindromic_census(sequencias.encode(seq), [6])
+    observed = dict(zip((censo.kmer_string(w, 6) for w in census[6]["word"].tolist()),
+                        census[6]["observed"].tolist()))
+    assert observed["GAATTC"] == 1
+    assert sum(observed.values()) == 1
+
+
+def test_k_longer_than_sequence():
+    census = censo.palindromic_census(sequencias.encode("ACGT"), [2, 6, 20])
+    assert census[6]["observed"].sum() == 0 and len(census[6]["word"]) == 64
+    assert len(census[20]["word"]) == 0 and census[20]["expected"] is None
+
+
+@pytest.mark.parametrize("ks, order", [([3], None), ([0], None), ([34], None), ([4], -1)])
+def test_invalid_parameters(ks, order):
+    with pytest.raises(ValueError):
+        censo.palindromic_census(sequencias.encode("ACGT"), ks, order)
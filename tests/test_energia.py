@@ -0,0 +1,60 @@
+"""
+Energias de grampos (tabela de 625 empilhamentos, em lote) contra a soma
+par a par dos parâmetros de vizinhos mais próximos.
+"""
+
+import math
+import random
+
+import numpy as np
+import pytest
+
+import energia
+import grampos
+from sequencias import encode
+from conftest import pair_kind, random_sequence
+
+NN = dict(zip((x + y for x in "ACGT" for y in "ACGT"), energia.NN_STACK.tolist()))
+
+
+def naive_energy(seq, start, loop, K):
+    """Soma os empilhamentos da haste, o loop e a penalidade A·T da ponta."""
+    hairpin = seq[start:start + 2 * K + loop]
+    left, right = hairpin[:K], hairpin[K + loop:][::-1]
+    total = 0
+    for t in range(K - 1):
+        kinds = {pair_kind(left[t], right[t]), pair_kind(left[t + 1], right[t + 1])}
+        if kinds == {"wc"}:
+            total += NN[left[t:t + 2]]
+        else:
+            total += energia.MISMATCH_STACK if "mismatch" in kinds else energia.WOBBLE_STACK
+    if {left[0], right[0]} == {"A", "T"}:
+        total += energia.TERMINAL_AT
+    return total + energia.loop_energy(loop)
+
+
+def test_loop_energy_uses_nearest_smaller_size():
+    assert energia.loop_energy(4) == 350
+    assert energia.loop_energy(30) == 630
+    # 11 parte de 10, 40 parte de 30
+    assert energia.loop_energy(11) == 460 + round(100 * 2.44 * energia._RT * math.log(11 / 10))
+    assert energia.loop_energy(40) == 630 + round(100 * 2.44 * energia._RT * math.log(40 / 30))
+    assert energia.loop_energies(np.array([40, 4, 11, 4])).tolist() == [
+        energia.loop_energy(40), 350, energia.loop_energy(11), 350]
+    with pytest.raises(ValueError):
+        energia.loop_energy(2)
+
+
+@pytest.mark.parametrize("K, mismatches, wobble", [(6, 0, False), (5, 1, True), (8, 2, False)])
+def test_hairpin_energies_match_pairwise_sum(K, mismatches, wobble):
+    rng = random.Random(K)
+    seq = random_sequence(rng, 20_000, "ACGTN", [99, 99, 99, 99, 1])
+    codes = encode(seq)
+    if mismatches or wobble:
+        starts, loops, _ = grampos.find_approx_hairpin_candidates(codes, K, 12, 30, mismatches, wobble)
+    else:
+        starts, loops = grampos.find_hairpin_candidates(codes, K, 12, 30)
+    assert len(starts)
+    energies = energia.hairpin_energies(codes, starts, loops, K, batch=1000)
+    expected = [naive_energy(seq, s, loop, K) for s, loop in zip(starts.tolist(), loops.tolist())]
+    assert energies.tolist() == expected
@@ -0,0 +1,102 @@
+"""
+Autômato de sítios de restrição: busca direta dos padrões IUPAC, sítios
+cheios de N (âncora no autômato e conferência do resto), varredura em
+pedaços e um mesmo SiteScanner usado por várias threads.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import random
+import time
+
+import pytest
+
+import enzimas
+from conftest import random_sequence
+
+# Sítios degenerados do REBASE, de GGNNCC (expandido inteiro) a XcmI (9 N)
+DEGENERATE = [
+    ("NlaIV", "GGNNCC", "Neisseria lactamica"),
+    ("AlwNI", "CAGNNNCTG", "Acinetobacter lwoffii N"),
+    ("BsaBI", "GATNNNNATC", "Bacillus stearothermophilus"),
+    ("BglI", "GCCNNNNNGGC", "Bacillus globigii"),
+    ("SfiI", "GGCCNNNNNGGCC", "Streptomyces fimbriatus"),
+    ("XcmI", "CCANNNNNNNNNTGG", "Xanthomonas campestris"),
+    ("BsiHKAI", "GWGCWC", "Bacillus sp."),
+    ("AccB1I", "GGYRCC", "Acinetobacter calcoaceticus"),
+    ("BsaWI", "WCCGGW", "Bacillus stearothermophilus W1246"),
+    ("MslI", "CAYNNNNRTG", "Micrococcus sp."),
+    ("BaeGI", "GKGCMC", "Bacillus sp."),
+]
+ACGT_N = ("ACGTN", [99, 99, 99, 99, 4])
+
+
+def naive_sites(enzymes, seq):
+    """Confere cada sítio (IUPAC, nas duas fitas) em cada posição, base a base."""
+    upper = seq.upper()
+    found = []
+    for e, (_, site, _) in enumerate(enzymes):
+        site = enzimas.clean_site(site)
+        strands = [(site, 1)]
+        rc_site = site.translate(enzimas.IUPAC_COMP)[::-1]
+        if rc_site != site:
+            strands.append((rc_site, -1))
+        for pattern, strand in strands:
+            for i in range(len(upper) - len(pattern) + 1):
+                if all(upper[i + t] in enzimas.IUPAC[c] for t, c in enumerate(pattern)):
+                    found.append((i + 1, strand, e))
+    return sorted(found)
+
+
+@pytest.mark.parametrize("enzymes", [enzimas.ENZYMES, DEGENERATE])
+def test_scan_matches_naive_search(enzymes):
+    scanner = enzimas.SiteScanner(enzymes)
+    rng = random.Random(len(enzymes))
+    for _ in range(20):
+        seq = random_sequence(rng, rng.randint(0, 3000), *ACGT_N)
+        assert sorted(scanner.scan(seq)) == naive_sites(enzymes, seq)
+
+
+def test_n_rich_site_stays_small():
+    # Expandido inteiro, XcmI sozinho passava de um milhão de estados
+    start = time.perf_counter()
+    scanner = enzimas.SiteScanner([("XcmI", "CCANNNNNNNNNTGG", "Xanthomonas campestris")])
+    assert time.perf_counter() - start < 0.5
+    assert scanner.states <= 8
+    assert enzimas.choose_anchor("CCANNNNNNNNNTGG") in ((0, 3), (12, 15))
+    # Sítios pouco degenerados continuam inteiros no autômato
+    assert enzimas.choose_anchor("GGNNCC") == (0, 6)
+
+    seq = "TT" + "CCA" + "ACGTACGTA" + "TGG" + "CCAGTNAAAATGG" + "CCA" + "A" * 8 + "TGG"
+    assert scanner.scan(seq) == naive_sites(scanner.enzymes, seq) == [(3, 1, 0)]
+
+
+@pytest.mark.parametrize("enzymes", [enzimas.ENZYMES, DEGENERATE])
+def test_chunks_match_whole_scan(enzymes):
+    scanner = enzimas.SiteScanner(enzymes)
+    rng = random.Random(11)
+    seq = random_sequence(rng, 20_000, *ACGT_N)
+    whole = scanner.scan(seq)
+    # Pedaços de 1 base deixam sítios pendentes por várias chamadas
+    for sizes in ((1, 7, 4093, 333, 15_000, 566), (1,) * 40 + (19_960,), (5, 3) * 2500):
+        hits, state, offset = [], 0, 0
+        for size in sizes:
+            chunk_hits, state = scanner.advance(seq[offset:offset + size], offset, state)
+            hits.extend(chunk_hits)
+            offset += size
+        assert hits == whole
+
+    # feed() guarda o estado no objeto; um scan() no meio não interfere
+    fed = scanner.feed(seq[:10_001])
+    scanner.scan(seq[:500])
+    fed += scanner.feed(seq[10_001:], 10_001)
+    assert fed == whole
+
+
+def test_shared_scanner_across_threads():
+    scanner = enzimas.SiteScanner(enzimas.ENZYMES + DEGENERATE)
+    rng = random.Random(12)
+    sequences = [random_sequence(rng, rng.randint(5_000, 20_000), *ACGT_N) for _ in range(16)]
+    expected = [scanner.scan(seq) for seq in sequences]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        for _ in range(3):
+            assert list(pool.map(scanner.scan, sequences)) == expected
@@ -0,0 +1,105 @@
+"""
+Genoma em 2 bits por base: ida e volta do FASTA (N no começo, no meio e no
+fim, minúsculas, outros símbolos), fatias que cruzam trechos de N e
+reconstrução quando o FASTA muda de tamanho ou de data.
+"""
+
+import functools
+import os
+import random
+
+import pytest
+
+import genoma2bit
+from conftest import random_sequence, write_fasta
+
+
+def expected_text(seq):
+    """O que o .2bit devolve: maiúsculas, e N no lugar de tudo que não é ACGT."""
+    return "".join(b if b in "ACGT" else "N" for b in seq.upper())
+
+
+def with_n_runs(rng, n):
+    """Sequência com trechos de N (e outros símbolos) no começo, no meio e no fim."""
+    parts = ["N" * rng.randint(1, 9)]
+    while sum(map(len, parts)) < n:
+        parts.append(random_sequence(rng, rng.randint(0, 30), "ACGTacgt"))
+        parts.append(rng.choice(["N", "n", "R", "-"]) * rng.randint(1, 12))
+    return "".join(parts) + "N" * rng.randint(1, 9)
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    # Pedaços minúsculos: trechos de N e bytes de 4 bases cruzam os pedaços
+    monkeypatch.setattr(genoma2bit, "_iter_fasta",
+                        functools.partial(genoma2bit._iter_fasta, chunk_size=5))
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_round_trip_and_slices(tmp_path, request, chunked):
+    if chunked:
+        request.getfixturevalue("small_chunks")
+    rng = random.Random(8)
+    records = [("r1", with_n_runs(rng, 300)), ("vazio", ""), ("r2", random_sequence(rng, 1001, "acgt")),
+               ("r3", "N" * 17), ("r4", with_n_runs(rng, 50))]
+    path = write_fasta(tmp_path / "genoma.fa", records, width=rng.choice([7, 60]))
+    store = genoma2bit.open_genome(path)
+    assert list(store.records) == [name for name, _ in records]
+
+    for name, seq in records:
+        rec, text = store[name], expected_text(seq)
+        assert len(rec) == len(text)
+        assert rec[:] == str(rec) == text
+        for _ in range(300):
+            a, b = sorted(rng.randint(-5, len(text) + 5) for _ in range(2))
+            assert rec[a:b] == text[a:b]
+            step = rng.choice([2, 3, -1, -4])
+            assert rec[a:b:step] == text[a:b:step]
+            assert rec.codes(a, b).tolist() == ["ACGTN".index(c) for c in text[max(0, a):max(0, b)]]
+        if text:
+            assert rec[-1] == text[-1] and rec[0] == text[0]
+        with pytest.raises(IndexError):
+            rec[len(text)]
+
+
+def test_slices_across_n_runs(tmp_path):
+    seq = "NNNN" + "ACGTA" + "N" * 10 + "ggcc" + "NN" + "TTTA" + "NNN"
+    rec = genoma2bit.open_genome(write_fasta(tmp_path / "n.fa", [("x", seq)])).first()
+    text = expected_text(seq)
+    for a in range(len(text) + 1):
+        for b in range(a, len(text) + 1):
+            assert rec[a:b] == text[a:b]
+    assert rec._n_starts == [0, 9, 23, 29] and rec._n_ends == [4, 19, 25, 32]
+
+
+def test_rebuilds_when_fasta_changes(tmp_path, monkeypatch):
+    builds = []
+    build = genoma2bit.build
+    monkeypatch.setattr(genoma2bit, "build", lambda *args: (builds.append(args), build(*args)))
+    path = write_fasta(tmp_path / "g.fa", [("x", "ACGTACGT")])
+    assert genoma2bit.open_genome(path).first()[:] == "ACGTACGT"
+    genoma2bit.open_genome(path)
+    assert len(builds) == 1
+
+    # Mesmo tamanho, FASTA mais novo
+    stat = os.stat(path)
+    write_fasta(path, [("x", "TTTTCCCC")])
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert genoma2bit.open_genome(path).first()[:] == "TTTTCCCC"
+    assert len(builds) == 2
+
+    # Tamanho diferente com a data de antes (cópia preservando a data)
+    stat = os.stat(path)
+    write_fasta(path, [("x", "GGGGAAAANN")])
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert genoma2bit.open_genome(path).first()[:] == "GGGGAAAANN"
+    assert len(builds) == 3
+
+    # .2bit de uma versão anterior do formato é refeito
+    with open(genoma2bit.store_path(path), "r+b") as f:
+        f.seek(4)
+        f.write((genoma2bit.VERSION - 1).to_bytes(4, "little"))
+    genoma2bit.open_genome(path)
+    assert len(builds) == 4
+    assert genoma2bit.open_genome(path).first()[:] == "GGGGAAAANN"
+    assert len(builds) == 4
@@ -0,0 +1,201 @@
+"""
+Motores de grampos contra implementações ingênuas (laço por posição e
+por loop, comparando strings), e as versões em fluxo (em pedaços, com
+max_total - 1 bases de sobra) contra as que leem a sequência inteira.
+"""
+
+import random
+
+import pytest
+
+import genoma2bit
+import grampos
+from ocorrencias import HairpinHits
+from sequencias import encode, revcomp
+from conftest import (best_non_overlapping, naive_approx_candidates, naive_candidates,
+                      naive_hairpin_candidates, naive_longest_first, naive_revcomp,
+                      non_overlapping, random_sequence, spans, write_fasta)
+
+
+@pytest.mark.parametrize("alphabet", ["ACGT", "AT", "ACGTN"])
+def test_candidates_match_naive(alphabet):
+    rng = random.Random(alphabet)
+    for _ in range(150):
+        S = random_sequence(rng, rng.randint(0, 150), alphabet)
+        K = rng.randint(3, 9)
+        max_total = rng.choice([20, 30])
+        starts, loops = grampos.find_hairpin_candidates(encode(S), K, 12, max_total)
+        assert list(zip(starts.tolist(), loops.tolist())) == naive_candidates(S, K, 12, max_total)
+
+
+@pytest.mark.parametrize("K", [5, 6])
+def test_find_hairpins_matches_naive(K):
+    rng = random.Random(K)
+    for _ in range(100):
+        S = random_sequence(rng, rng.randint(0, 300), "ACGT" if rng.random() < 0.5 else "AT")
+        hits = grampos.find_hairpins(S, K)
+        assert spans(hits) == naive_longest_first(naive_candidates(S, K), K)
+        for h in hits:
+            assert h["suffix"] == revcomp(h["prefix"])
+            assert h["substring"] == S[h["start"] - 1:h["end"]]
+
+
+def table(*spans):
+    """Tabela de grampos só com coordenadas (início, fim) 1-based; K=4, loop = tamanho - 8."""
+    starts, ends = zip(*spans)
+    return HairpinHits(None, 4, start=starts, end=ends,
+                               loop=[e - s + 1 - 8 for s, e in spans])
+
+
+def chosen(hits, selection):
+    return spans(grampos.select_non_overlapping(hits, selection))
+
+
+def old_greedy(hits):
+    """A seleção antiga: só compara com o fim do último escolhido."""
+    order = sorted(spans(hits), key=lambda h: (h[0] - h[1], h[0]))
+    picked, last_end = [], 0
+    for start, end in order:
+        if not picked or start > last_end:
+            picked.append((start, end))
+            last_end = end
+    return sorted(picked)
+
+
+def test_longest_first_checks_every_chosen_hairpin():
+    # Em ordem de tamanho, C vem depois de B, que termina depois do início de C:
+    # a seleção antiga descartava C sem que ele cruzasse ninguém
+    hits = table((30, 49), (60, 75), (1, 12))
+    assert old_greedy(hits) == [(30, 49), (60, 75)]
+    assert chosen(hits, "longest") == [(1, 12), (30, 49), (60, 75)]
+
+
+def test_weighted_selection_beats_longest_first():
+    # O maior (16 bases) cruza os dois vizinhos de 12, que juntos cobrem mais
+    hits = table((5, 20), (1, 12), (14, 25))
+    assert chosen(hits, "longest") == [(5, 20)]
+    assert chosen(hits, "coverage") == [(1, 12), (14, 25)]
+    assert chosen(hits, "count") == [(1, 12), (14, 25)]
+
+
+def test_weighted_selection_is_optimal():
+    rng = random.Random(6)
+    weights = {"coverage": lambda s, e: e - s + 1, "count": lambda s, e: 1}
+    for _ in range(200):
+        candidates = []
+        for _ in range(rng.randint(1, 9)):
+            start = rng.randint(1, 60)
+            candidates.append((start, start + rng.randint(11, 19)))
+        hits = table(*candidates)
+        for selection, weight in weights.items():
+            picked = chosen(hits, selection)
+            assert non_overlapping(picked)
+            assert sum(weight(s, e) for s, e in picked) == best_non_overlapping(candidates, weight)
+
+
+@pytest.mark.parametrize("alphabet", ["ACGT", "ACGTN"])
+def test_approx_candidates_match_naive(alphabet):
+    rng = random.Random(alphabet)
+    for _ in range(150):
+        S = random_sequence(rng, rng.randint(0, 90), alphabet)
+        K = rng.randint(4, 8)
+        mismatches, wobble = rng.randint(0, 3), rng.random() < 0.5
+        starts, loops, mm = grampos.find_approx_hairpin_candidates(encode(S), K, 12, 20, mismatches, wobble)
+        assert list(zip(starts.tolist(), loops.tolist(), mm.tolist())) == \
+            naive_approx_candidates(S, K, 12, 20, mismatches, wobble)
+
+
+def test_approx_long_stems_match_naive():
+    # K de 16 a 18: as palavras da haste ocupam mais da metade de um uint64
+    rng = random.Random(18)
+    for _ in range(40):
+        S = random_sequence(rng, rng.randint(30, 120), "ACGTN")
+        K = rng.choice([16, 17, 18])
+        mismatches, wobble = rng.randint(0, 8), rng.random() < 0.5
+        starts, loops, mm = grampos.find_approx_hairpin_candidates(encode(S), K, 2 * K + 3, 2 * K + 6,
+                                                                   mismatches, wobble)
+        assert list(zip(starts.tolist(), loops.tolist(), mm.tolist())) == \
+            naive_approx_candidates(S, K, 2 * K + 3, 2 * K + 6, mismatches, wobble)
+
+
+def test_sweep_matches_per_k_engines():
+    rng = random.Random(20)
+    for trial in range(40):
+        S = random_sequence(rng, rng.randint(1, 300), "ACGTN" if trial % 3 == 0 else "ACGT")
+        Ks = list(range(1, rng.randint(2, 13)))
+        max_total = rng.randint(12, 39)
+        mismatches, wobble = (rng.randint(0, 2), trial % 4 == 1) if trial % 2 else (0, False)
+        swept = grampos.sweep_hairpin_candidates(encode(S), Ks, 12, max_total, mismatches, wobble)
+        for K in Ks:
+            assert list(zip(*(c.tolist() for c in swept[K]))) == \
+                naive_hairpin_candidates(S, K, 12, max_total, mismatches, wobble)
+        by_k = grampos.find_hairpins_sweep(S, [6, 5], mismatches=mismatches, wobble=wobble)
+        for K in (6, 5):
+            assert list(by_k[K]) == list(grampos.find_hairpins(S, K, mismatches=mismatches, wobble=wobble))
+
+
+def planted_at_boundaries(rng, n, chunk_size, K, max_total):
+    """Sequência com grampos exatos de max_total bases começando perto das fronteiras dos pedaços."""
+    seq = list(random_sequence(rng, n, "ACGTN", [30, 20, 20, 30, 1]))
+    loop = max_total - 2 * K
+    for b in range(chunk_size, n, chunk_size):
+        # Último início do pedaço, primeiro do seguinte e um que termina na fronteira
+        for start in rng.sample([b - 1, b, b - max_total + 1, b - max_total // 2], 2):
+            stem = random_sequence(rng, K)
+            hairpin = stem + random_sequence(rng, loop) + naive_revcomp(stem)
+            if 0 <= start and start + max_total <= n:
+                seq[start:start + max_total] = hairpin
+    return "".join(seq)
+
+
+@pytest.mark.parametrize("mismatches, wobble", [(0, False), (1, False), (0, True), (2, True)])
+def test_streamed_candidates_match_naive(mismatches, wobble):
+    rng = random.Random(mismatches * 2 + wobble)
+    for _ in range(25):
+        K = rng.randint(4, 7)
+        max_total = rng.choice([2 * K + 3, 20, 24])
+        chunk_size = rng.choice([1, max_total - 1, max_total, rng.randint(5, 60)])
+        S = planted_at_boundaries(rng, rng.randint(0, 400), chunk_size, K, max_total)
+        streamed = list(grampos.iter_hairpin_candidates(S, K, 12, max_total, chunk_size,
+                                                        mismatches, wobble))
+        expected = naive_hairpin_candidates(S, K, 12, max_total, mismatches, wobble)
+        assert streamed == [tuple(c) for c in expected], (S, K, max_total, chunk_size)
+
+
+@pytest.mark.parametrize("selection", sorted(grampos.SELECTIONS))
+def test_streamed_selection_matches_whole_table(selection):
+    rng = random.Random(selection)
+    for _ in range(60):
+        picked = []
+        position = 1
+        for _ in range(rng.randint(0, 40)):
+            position += rng.randint(0, 12)
+            loop = rng.randint(3, 8)
+            picked.append((position, position + 2 * rng.randint(3, 6) + loop - 1, loop,
+                           rng.randint(-900, -100)))
+        scored = selection == "energy" or rng.random() < 0.5
+        candidates = picked if scored else [c[:3] for c in picked]
+        table = HairpinHits(None, 0, start=[c[0] for c in picked], end=[c[1] for c in picked],
+                            loop=[c[2] for c in picked],
+                            energy=[c[3] for c in picked] if scored else None)
+        whole = spans(grampos.select_non_overlapping(table, selection)) if picked else []
+        streamed = [c[:2] for c in grampos.iter_non_overlapping(iter(candidates), selection, scored)]
+        assert streamed == whole
+
+
+@pytest.mark.parametrize("kwargs", [
+    {}, {"selection": "count"}, {"selection": "coverage", "max_total": 24},
+    {"mismatches": 1, "wobble": True}, {"selection": "energy"}, {"score": True, "max_energy": -3.0},
+])
+def test_iter_hairpins_matches_find_hairpins(kwargs, tmp_path):
+    rng = random.Random(str(kwargs))
+    K = 5
+    max_total = kwargs.get("max_total", 20)
+    for trial in range(8):
+        chunk_size = rng.choice([max_total - 1, max_total, 37, 1 << 20])
+        S = planted_at_boundaries(rng, rng.randint(0, 3_000), chunk_size, K, max_total)
+        whole = list(grampos.find_hairpins(S, K, **kwargs))
+        assert list(grampos.iter_hairpins(S, K, chunk_size=chunk_size, **kwargs)) == whole
+    # Também direto de um registro do .2bit, sem montar a str
+    record = genoma2bit.open_genome(write_fasta(tmp_path / "g.fa", [("x", S)])).first()
+    assert list(grampos.iter_hairpins(record, K, chunk_size=41, **kwargs)) == whole
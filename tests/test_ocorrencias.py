@@ -0,0 +1,132 @@
+"""
+Tabelas colunares de ocorrências contra listas de registros montadas à mão:
+indexação (inteiro, fatia, índices, máscara), filter, sorted, iteração e o
+CSV gravado em lotes, com e sem a coluna opcional de energia.
+"""
+
+import csv
+import io
+import random
+
+import numpy as np
+import pytest
+
+from ocorrencias import ApproxHairpinHits, ApproxPalindromeHits, HairpinHits, PalindromeHits
+from conftest import random_sequence
+
+
+def palindrome_table(rng, seq, n, approx=False):
+    starts = [rng.randrange(len(seq) - 10) for _ in range(n)]
+    ends = [s + 2 * rng.randint(1, 5) for s in starts]
+    if not approx:
+        table = PalindromeHits(seq, start=starts, end=ends)
+        return table, [(s, e, seq[s:e]) for s, e in zip(starts, ends)]
+    gaps = [rng.randint(0, 3) for _ in starts]
+    mms = [rng.randint(0, 2) for _ in starts]
+    table = ApproxPalindromeHits(seq, start=starts, end=ends, gap=gaps, mismatches=mms)
+    return table, [(s, e, seq[s:e], g, m) for s, e, g, m in zip(starts, ends, gaps, mms)]
+
+
+def hairpin_table(rng, seq, n, K=4, energy=False, approx=False):
+    starts = [rng.randint(1, len(seq) - 30) for _ in range(n)]
+    loops = [rng.randint(3, 8) for _ in starts]
+    ends = [s + 2 * K + loop - 1 for s, loop in zip(starts, loops)]
+    columns = {"start": starts, "end": ends, "loop": loops}
+    if energy:
+        columns["energy"] = [rng.randint(-900, 50) for _ in starts]
+    if approx:
+        columns["mismatches"] = [rng.randint(0, 2) for _ in starts]
+    table = (ApproxHairpinHits if approx else HairpinHits)(seq, K, **columns)
+    records = []
+    for i, (s, e, loop) in enumerate(zip(starts, ends, loops)):
+        record = {"start": s, "end": e, "loop": loop, "length": e - s + 1, "substring": seq[s - 1:e],
+                  "prefix": seq[s - 1:s - 1 + K], "suffix": seq[s - 1 + K + loop:e]}
+        if energy:
+            record["energy"] = round(columns["energy"][i] / 100, 2)
+        if approx:
+            record["mismatches"] = columns["mismatches"][i]
+        records.append(record)
+    return table, records
+
+
+def tables(rng, seq, n):
+    yield palindrome_table(rng, seq, n)
+    yield palindrome_table(rng, seq, n, approx=True)
+    yield hairpin_table(rng, seq, n)
+    yield hairpin_table(rng, seq, n, energy=True)
+    yield hairpin_table(rng, seq, n, approx=True, energy=True)
+
+
+@pytest.mark.parametrize("n", [0, 1, 37])
+def test_indexing_and_iteration_match_records(n):
+    rng = random.Random(n)
+    seq = random_sequence(rng, 400)
+    for table, records in tables(rng, seq, n):
+        assert len(table) == n and list(table) == records
+        for i in range(-n, n):
+            assert table[i] == records[i]
+        for i in (n, -n - 1):
+            with pytest.raises(IndexError):
+                table[i]
+        for _ in range(20):
+            a, b = sorted(rng.randint(-n - 2, n + 2) for _ in range(2))
+            assert list(table[a:b]) == records[a:b]
+            assert list(table[a:b:2]) == records[a:b:2]
+            picked = [rng.randrange(n) for _ in range(rng.randint(0, 5))] if n else []
+            assert list(table[np.array(picked, dtype=np.int64)]) == [records[i] for i in picked]
+            mask = np.array([rng.random() < 0.5 for _ in range(n)], dtype=bool)
+            expected = [r for r, keep in zip(records, mask) if keep]
+            assert list(table[mask]) == list(table.filter(mask.tolist())) == expected
+        derived = table[1:]
+        assert type(derived) is type(table) and derived.sequence is table.sequence
+        if n > 1:
+            assert np.shares_memory(derived.start, table.start)   # Fatia é vista, não cópia
+
+
+def test_sorted_is_stable_on_every_key():
+    rng = random.Random(14)
+    seq = random_sequence(rng, 400)
+    for table, records in tables(rng, seq, 60):
+        as_dict = [r if isinstance(r, dict) else dict(zip(("start", "end"), r)) for r in records]
+        for keys in (("start",), ("end",), ("end", "start")):
+            order = sorted(range(len(records)), key=lambda i: tuple(as_dict[i][k] for k in keys))
+            assert list(table.sorted(*keys)) == [records[i] for i in order]
+        order = sorted(range(len(records)), key=lambda i: -(as_dict[i]["end"] - as_dict[i]["start"]))
+        assert list(table[np.lexsort((table.start - table.end,))]) == [records[i] for i in order]
+
+
+def test_longest_is_first_of_largest_size():
+    seq = "ACGT" * 10
+    hits = PalindromeHits(seq, start=[0, 4, 9, 20], end=[2, 10, 15, 26])
+    assert hits.sizes.tolist() == [2, 6, 6, 6]
+    assert hits.longest() == (4, 10, seq[4:10])
+    assert PalindromeHits(seq, start=[], end=[]).longest() is None
+
+
+def naive_csv(table, records):
+    rows = [table.csv_header]
+    for r in records:
+        if isinstance(r, tuple):
+            s, e, sub = r[:3]
+            rows.append([s + 1, e, e - s] + list(r[3:]) + [sub])
+        else:
+            row = [r[k] for k in ("start", "end", "length", "loop", "prefix", "suffix", "substring")]
+            row += [r[k] for k in ("mismatches", "energy") if k in r]
+            rows.append(row)
+    return [[str(v) for v in row] for row in rows]
+
+
+@pytest.mark.parametrize("batch", [1, 7, 10_000])
+def test_csv_in_batches_matches_records(tmp_path, batch):
+    rng = random.Random(batch)
+    seq = random_sequence(rng, 400)
+    for i, (table, records) in enumerate(tables(rng, seq, 23)):
+        out = io.StringIO()
+        table.to_csv(out, batch)
+        assert list(csv.reader(io.StringIO(out.getvalue()))) == naive_csv(table, records)
+        table.to_csv(str(tmp_path / f"t{i}.csv"), batch)
+        with open(tmp_path / f"t{i}.csv", newline="") as f:
+            assert f.read() == out.getvalue()
+    # A energia opcional entra no fim, depois das colunas fixas
+    assert hairpin_table(rng, seq, 1, energy=True, approx=True)[0].csv_header == \
+        ApproxHairpinHits.CSV_HEADER + ["energy"]
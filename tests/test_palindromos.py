@@ -0,0 +1,85 @@
+"""
+Motor de palíndromos maximais (Manacher sobre a sequência codificada)
+contra a expansão base a base, em sequências aleatórias, ricas em AT,
+com N e com minúsculas.
+"""
+
+from collections import defaultdict
+import random
+
+import pytest
+
+import bacter_final
+import enzimas
+from conftest import cds_record, naive_maximal_palindromes, random_sequence
+
+
+@pytest.mark.parametrize("alphabet", ["ACGT", "AT", "ACGTN", "acgtACGTNN"])
+def test_all_maximal_palindromes_match_naive(alphabet):
+    rng = random.Random(alphabet)
+    for _ in range(150):
+        seq = random_sequence(rng, rng.randint(0, 120), alphabet)
+        assert list(bacter_final.find_all_maximal_palindromes(seq)) == naive_maximal_palindromes(seq)
+
+
+@pytest.mark.parametrize("alphabet", ["ACGT", "AT", "ACGTN"])
+def test_palindromes_of_length_k_match_naive(alphabet):
+    rng = random.Random(alphabet)
+    for _ in range(100):
+        seq = random_sequence(rng, rng.randint(0, 150), alphabet)
+        index = bacter_final.build_palindrome_index(seq)
+        for k in (2, 4, 6, 8, 10):
+            expected = defaultdict(list)
+            for start, end, pal in naive_maximal_palindromes(seq):
+                if end - start == k:
+                    expected[pal.upper()].append(start + 1)
+            assert bacter_final.find_maximal_palindromes_of_length_k(seq, k) == expected
+            assert bacter_final.find_maximal_palindromes_of_length_k(seq, k, index) == expected
+
+
+def test_long_at_run_is_one_palindrome_per_center():
+    seq = "AT" * 500
+    hits = bacter_final.find_all_maximal_palindromes(seq)
+    assert list(hits) == naive_maximal_palindromes(seq)
+    assert hits.longest() == (0, 1000, seq)
+
+
+def naive_index(seq):
+    index = defaultdict(list)
+    for start, end, _ in naive_maximal_palindromes(seq):
+        index[end - start].append(start)
+    return {size: sorted(starts) for size, starts in index.items()}
+
+
+@pytest.mark.parametrize("alphabet", ["ACGT", "AT", "ACGTN"])
+def test_index_and_histogram_match_naive(alphabet):
+    rng = random.Random(alphabet * 2)
+    for _ in range(100):
+        seq = random_sequence(rng, rng.randint(0, 150), alphabet)
+        expected = naive_index(seq)
+        index = bacter_final.build_palindrome_index(seq)
+        assert index == expected
+        assert bacter_final.palindrome_size_histogram(index) == \
+            {size: len(starts) for size, starts in expected.items()}
+
+
+def test_report_region_scans_once_for_every_k(monkeypatch):
+    scans = []
+    radii = bacter_final.rc_palindrome_radii
+    monkeypatch.setattr(bacter_final, "rc_palindrome_radii",
+                        lambda codes: (scans.append(len(codes)), radii(codes))[1])
+    rng = random.Random(2)
+    seq = random_sequence(rng, 600, "AT")
+    start, end = 101, 500
+    subseq = seq[start - 1:end]
+    cds_index = bacter_final.build_cds_index(cds_record())
+    data = bacter_final.analyze_report_region(start, end, subseq, None, cds_index, enzimas.SiteScanner())
+    assert scans == [len(subseq)]   # Uma varredura responde todos os k e o histograma
+
+    expected = naive_index(subseq)
+    for k in bacter_final.REPORT_KS:
+        per_k = defaultdict(list)
+        for s in expected.get(k, []):
+            per_k[subseq[s:s + k]].append(start + s)
+        assert data['per_k'][k] == per_k
+    assert data['histogram'] == {size: len(starts) for size, starts in expected.items()}
@@ -0,0 +1,93 @@
+"""
+Genoma em memória compartilhada: os processos do pool leem o mesmo bloco
+e, ao sair, só o processo principal o libera (sem avisos do resource_tracker);
+a varredura em blocos usa um só pool para o FASTA inteiro, dá a mesma saída
+da serial e traz o perfil medido nos processos do pool.
+"""
+
+import os
+import random
+import subprocess
+import sys
+import textwrap
+
+import bacter_final
+import enzimas
+import paralelo
+import perfil
+from conftest import naive_revcomp, random_sequence, write_fasta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = textwrap.dedent("""
+    import random, sys
+    sys.path[:0] = [{comum!r}, {trabalho1!r}]
+    import bacter_final, paralelo
+    rng = random.Random(11)
+    seq = "".join(rng.choice("AT") for _ in range(40_000))
+    regions = [(1, 10_000), (10_001, 25_000), (25_001, 40_000)] * 2
+    with paralelo.ParallelGenome(seq, 3) as genome:
+        name = genome._shm.name
+        found = genome.region_palindromes(regions)
+    rows = lambda hits: list(zip(hits.start.tolist(), hits.end.tolist()))
+    expected = [rows(bacter_final.find_all_maximal_palindromes(seq[a - 1:b])) for a, b in regions]
+    assert [rows(hits) for hits in found] == expected and all(expected)
+    try:
+        paralelo.shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        print("released")
+""")
+
+
+def test_pool_reads_shared_block_and_owner_releases_it():
+    script = SCRIPT.format(comum=os.path.join(ROOT, "src", "comum"),
+                           trabalho1=os.path.join(ROOT, "src", "trabalho1"))
+    done = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True,
+                          timeout=120)
+    assert done.returncode == 0, done.stderr
+    assert done.stdout.strip() == "released"
+    assert "resource_tracker" not in done.stderr and "Traceback" not in done.stderr, done.stderr
+
+
+def scan_output(capsys, *args, **kwargs):
+    """Saída de scan_whole_genome, com a ordem das enzimas de mesma contagem normalizada."""
+    bacter_final.scan_whole_genome(*args, **kwargs)
+    lines = capsys.readouterr().out.splitlines()
+    return [", ".join(sorted(line.split(", "))) if "Sítios" in line else line for line in lines]
+
+
+def test_whole_genome_tiles_use_one_pool_and_match_serial_scan(tmp_path, capsys, monkeypatch):
+    rng = random.Random(111)
+    records = []
+    for i, n in enumerate([9_000, 0, 150, 21_337, 4_000]):
+        seq = random_sequence(rng, n, "ACGTN", [30, 20, 20, 30, 1])
+        arm = random_sequence(rng, 60, "ACGT")
+        records.append((f"r{i}", seq[:n // 2] + arm + naive_revcomp(arm) + seq[n // 2:]))
+    path = write_fasta(tmp_path / "genoma.fa", records)
+    scanner = enzimas.SiteScanner(enzimas.ENZYMES[:6])
+    args = (path, None, 8, 2_000, 200, scanner)
+
+    pools = []
+
+    class CountedPool(paralelo.ProcessPoolExecutor):
+        def __init__(self, *a, **kw):
+            pools.append(self)
+            super().__init__(*a, **kw)
+
+    monkeypatch.setattr(paralelo, "ProcessPoolExecutor", CountedPool)
+    monkeypatch.setattr(perfil, "_enabled", True)
+    perfil.reset()
+    serial = scan_output(capsys, *args, workers=1)
+    serial_counters = perfil.summary()["counters"]
+    perfil.reset()
+    parallel = scan_output(capsys, *args, workers=3)
+    summary = perfil.summary()
+    perfil.reset()
+
+    assert parallel == serial and len(serial) > 100
+    assert len(pools) == 1
+    # Os blocos medidos nos processos do pool chegam ao perfil do principal
+    tiles = sum(-(-len(seq) // 2_000) for _, seq in records)
+    assert summary["spans"]["scan_whole_genome.tile"]["calls"] == tiles
+    assert summary["counters"] == serial_counters
+    assert serial_counters["bases_scanned"] == sum(len(seq) for _, seq in records)
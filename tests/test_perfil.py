@@ -0,0 +1,120 @@
+"""
+Instrumentação (spans e contadores) com um relógio falso: resumo, trace do
+Chrome, arquivos gravados por dump(), collect()/merge() entre processos e o
+caminho desligado, que não registra nada.
+"""
+
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+
+import perfil
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Liga o perfil com um relógio que só anda quando o teste manda (em ns)."""
+    now = [1_000_000]
+    monkeypatch.setattr(perfil, "time", SimpleNamespace(perf_counter_ns=lambda: now[0]))
+    monkeypatch.setattr(perfil, "_enabled", False)
+    monkeypatch.setattr(perfil, "atexit", SimpleNamespace(register=lambda *args: None))
+    perfil.reset()
+    perfil.enable()
+    yield now
+    perfil.reset()
+
+
+def advance(now, ns):
+    now[0] += ns
+
+
+@perfil.timed("decorada")
+def decorated(now, ns):
+    advance(now, ns)
+    return ns
+
+
+def test_disabled_records_nothing(monkeypatch):
+    monkeypatch.setattr(perfil, "_enabled", False)
+    perfil.reset()
+    assert perfil.span("a") is perfil.span("b", x=1)   # Sempre o mesmo contexto vazio
+    with perfil.span("a"):
+        perfil.count("bases", 10)
+    assert decorated([0], 5) == 5
+    assert not perfil.enabled()
+    assert perfil.summary() == {"spans": {}, "counters": {}}
+    assert perfil.chrome_trace()["traceEvents"] == []
+
+
+def test_spans_and_counters(clock):
+    with perfil.span("externo", start=1):
+        advance(clock, 2_000)
+        with perfil.span("interno"):
+            advance(clock, 3_000)
+        perfil.count("bases", 7)
+        perfil.count("bases", 3)
+        perfil.count("regioes")
+    with perfil.span("interno"):
+        advance(clock, 1_000)
+    assert decorated(clock, 4_000) == 4_000
+
+    summary = perfil.summary()
+    assert list(summary["spans"]) == ["interno", "externo", "decorada"]   # Ordem de término
+    assert summary["spans"]["interno"] == {"calls": 2, "total_s": 4e-6, "min_s": 1e-6, "max_s": 3e-6}
+    assert summary["spans"]["externo"] == {"calls": 1, "total_s": 5e-6, "min_s": 5e-6, "max_s": 5e-6}
+    assert summary["counters"] == {"bases": 10, "regioes": 1}
+
+    events = perfil.chrome_trace()["traceEvents"]
+    assert [(e["name"], e["ph"], e["ts"], e["dur"]) for e in events[:-1]] == [
+        ("interno", "X", 2.0, 3.0), ("externo", "X", 0.0, 5.0),
+        ("interno", "X", 5.0, 1.0), ("decorada", "X", 6.0, 4.0)]
+    assert events[1]["args"] == {"start": 1}
+    assert {e["pid"] for e in events} == {os.getpid()}
+    assert events[-1] == {"name": "counters", "ph": "C", "pid": os.getpid(), "tid": events[-1]["tid"],
+                          "ts": 10.0, "args": {"bases": 10, "regioes": 1}}
+
+
+def test_collect_and_merge(clock):
+    with perfil.span("tarefa"):
+        advance(clock, 1_000)
+    perfil.count("bases", 4)
+    events, counters = perfil.collect()
+    assert perfil.summary() == {"spans": {}, "counters": {}}   # collect() descarta o que devolveu
+    assert counters == {"bases": 4} and [e[0] for e in events] == ["tarefa"]
+
+    # O que vem de outro processo mantém o pid dele
+    worker = [(name, start, duration, 4242, tid, args) for name, start, duration, _, tid, args in events]
+    perfil.count("bases", 1)
+    perfil.merge(worker, counters)
+    perfil.merge(worker, {"bases": 2, "centros": 9})
+    summary = perfil.summary()
+    assert summary["spans"]["tarefa"]["calls"] == 2
+    assert summary["counters"] == {"bases": 7, "centros": 9}
+    assert [e["pid"] for e in perfil.chrome_trace()["traceEvents"][:-1]] == [4242, 4242]
+
+
+def test_dump_writes_both_formats(clock, tmp_path):
+    with perfil.span("etapa"):
+        advance(clock, 2_500)
+    perfil.count("bases", 12)
+    perfil.dump(str(tmp_path / "perfil.json"))
+    perfil.dump(str(tmp_path / "trace.json"), "chrome")
+    with open(tmp_path / "perfil.json", encoding="utf-8") as f:
+        assert json.load(f) == perfil.summary()
+    with open(tmp_path / "trace.json", encoding="utf-8") as f:
+        trace = json.load(f)
+    assert trace == json.loads(json.dumps(perfil.chrome_trace()))
+    assert [e["name"] for e in trace["traceEvents"]] == ["etapa", "counters"]
+
+
+def test_enable_rejects_unknown_format_and_registers_dump(monkeypatch):
+    registered = []
+    monkeypatch.setattr(perfil, "_enabled", False)
+    monkeypatch.setattr(perfil, "atexit", SimpleNamespace(register=lambda *args: registered.append(args)))
+    with pytest.raises(ValueError):
+        perfil.enable("x.json", "xml")
+    assert not perfil.enabled() and registered == []
+    perfil.enable("trace.json", "chrome")
+    assert perfil.enabled() and registered == [(perfil.dump, "trace.json", "chrome")]
@@ -0,0 +1,110 @@
+"""
+regioes.fetch_regions contra um efetch falso (http.server no localhost,
+apontado por NCBI_EFETCH_URL): FASTA local, cache em disco, lotes de
+regiões próximas, novas tentativas em 5xx e respostas cortadas.
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import random
+import threading
+
+import pytest
+
+import regioes
+
+ACCESSION = "TESTE.1"
+random.seed(7)
+GENOME = "".join(random.choice("ACGT") for _ in range(5_000))
+
+
+class FakeEfetch:
+    """Servidor efetch local que registra as requisições recebidas."""
+
+    def __init__(self):
+        self.requests = []
+        self.failures = 0      # quantas respostas 503 dar antes de responder
+        self.truncate = False  # devolve a sequência sem a última base
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+                fake.requests.append(query)
+                if fake.failures:
+                    fake.failures -= 1
+                    self.send_response(503)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                start, stop = int(query["seq_start"]), int(query["seq_stop"])
+                seq = GENOME[start - 1:stop]
+                if fake.truncate:
+                    seq = seq[:-1]
+                lines = [seq[i:i + 70] for i in range(0, len(seq), 70)]
+                body = "\n".join([f">{query['id']}:{start}-{stop}"] + lines).encode()
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/efetch.fcgi"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def efetch(monkeypatch, tmp_path):
+    fake = FakeEfetch()
+    monkeypatch.setenv("NCBI_EFETCH_URL", fake.url)
+    monkeypatch.setattr(regioes, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(regioes, "LOCAL_FASTA", str(tmp_path / "ausente.fasta"))
+    yield fake
+    fake.close()
+
+
+def test_local_fasta_needs_no_request(efetch, tmp_path):
+    fasta = tmp_path / "local.fasta"
+    fasta.write_text(f">{ACCESSION} teste\n{GENOME}\n")
+    seqs = regioes.fetch_regions(ACCESSION, [(1, 100), (4_901, 5_000)], local_fasta=str(fasta))
+    assert seqs == [GENOME[:100], GENOME[4_900:]]
+    assert efetch.requests == []
+
+
+def test_disk_cache_hit_needs_no_request(efetch):
+    first = regioes.fetch_regions(ACCESSION, [(200, 400)])
+    assert len(efetch.requests) == 1
+    again = regioes.fetch_regions(ACCESSION, [(200, 400)])
+    assert first == again == [GENOME[199:400]]
+    assert len(efetch.requests) == 1
+
+
+def test_close_regions_share_one_request(efetch):
+    regions = [(100, 300), (250, 600), (900, 1_000), (4_000, 4_100)]
+    seqs = regioes.fetch_regions(ACCESSION, regions, max_gap=500)
+    assert seqs == [GENOME[a - 1:b] for a, b in regions]
+    spans = sorted((int(r["seq_start"]), int(r["seq_stop"])) for r in efetch.requests)
+    assert spans == [(100, 1_000), (4_000, 4_100)]
+
+
+def test_retries_after_server_error(efetch):
+    efetch.failures = 2
+    assert regioes.fetch_regions(ACCESSION, [(10, 80)]) == [GENOME[9:80]]
+    assert len(efetch.requests) == 3
+
+
+def test_truncated_response_is_not_cached(efetch):
+    efetch.truncate = True
+    with pytest.raises(ValueError):
+        regioes.fetch_regions(ACCESSION, [(10, 80)])
+    assert regioes._read_cache(ACCESSION, 10, 80) is None
+    efetch.truncate = False
+    assert regioes.fetch_regions(ACCESSION, [(10, 80)]) == [GENOME[9:80]]
@@ -0,0 +1,102 @@
+"""
+Cache de regiões do relatório: acerto, invalidação quando mudam as
+enzimas, as CDS ou a versão do código, e recuperação de entradas corrompidas.
+"""
+
+import os
+import random
+
+import pytest
+
+import bacter_final
+import enzimas
+import perfil
+from conftest import cds_record, random_sequence
+
+START, END = 101, 700
+
+
+@pytest.fixture
+def region():
+    seq = random_sequence(random.Random(17), END - START + 1, "ACGT")
+    return seq, bacter_final.build_cds_index(cds_record((150, 400))), enzimas.SiteScanner()
+
+
+@pytest.fixture
+def analyses(monkeypatch):
+    """Conta as chamadas de analyze_report_region (cada uma é uma região varrida)."""
+    calls = []
+    analyze = bacter_final.analyze_report_region
+
+    def counted(*args):
+        calls.append(args[:2])
+        return analyze(*args)
+
+    monkeypatch.setattr(bacter_final, "analyze_report_region", counted)
+    monkeypatch.setattr(perfil, "_enabled", True)
+    perfil.reset()
+    yield calls
+    perfil.reset()
+
+
+def regions_counters():
+    return {name: n for name, n in perfil.summary()["counters"].items() if name.startswith("regions_")}
+
+
+def cached(region, cache_dir, cds_index=None, scanner=None):
+    """cached_region_analysis da região, com os vetores de palíndromos como listas."""
+    seq, index, default_scanner = region
+    data = bacter_final.cached_region_analysis(START, END, seq, None, cds_index or index,
+                                               scanner or default_scanner, str(cache_dir))
+    return dict(data, palindromes=[column.tolist() for column in data["palindromes"]])
+
+
+def test_second_call_is_a_cache_hit(region, analyses, tmp_path):
+    first = cached(region, tmp_path)
+    second = cached(region, tmp_path)
+    assert len(analyses) == 1
+    assert second == first
+    assert regions_counters() == {"regions_computed": 1, "regions_from_cache": 1}
+    assert len(os.listdir(tmp_path)) == 1
+
+
+def test_enzymes_cds_and_code_version_invalidate(region, analyses, tmp_path, monkeypatch):
+    cached(region, tmp_path)
+    cached(region, tmp_path, scanner=enzimas.SiteScanner(enzimas.ENZYMES[:3]))
+    assert len(analyses) == 2
+    data = cached(region, tmp_path, cds_index=bacter_final.build_cds_index(cds_record((150, 401))))
+    assert len(analyses) == 3
+    assert data["cds"][0]["end"] == 401
+
+    monkeypatch.setattr(bacter_final, "_code_version", None)
+    monkeypatch.setattr(bacter_final, "CACHE_VERSION", bacter_final.CACHE_VERSION + 1)
+    cached(region, tmp_path)
+    assert len(analyses) == 4
+    # De volta à versão anterior, a entrada antiga ainda serve
+    monkeypatch.setattr(bacter_final, "_code_version", None)
+    monkeypatch.setattr(bacter_final, "CACHE_VERSION", bacter_final.CACHE_VERSION - 1)
+    cached(region, tmp_path)
+    assert len(analyses) == 4
+
+
+def test_code_version_covers_every_listed_module(monkeypatch, tmp_path):
+    version = bacter_final.code_version()
+    copy = tmp_path / "enzimas.py"
+    copy.write_bytes(open(enzimas.__file__, "rb").read() + b"\n# mudou\n")
+    monkeypatch.setattr(bacter_final, "_code_version", None)
+    monkeypatch.setattr(enzimas, "__file__", str(copy))
+    assert bacter_final.code_version() != version
+    assert "enzimas" in bacter_final.CACHE_MODULES
+
+
+@pytest.mark.parametrize("garbage", [b"", b"nao e um pickle", b"\x80\x05\x95"])
+def test_corrupt_entry_is_removed_and_recomputed(region, analyses, tmp_path, garbage):
+    expected = cached(region, tmp_path)
+    (entry,) = tmp_path.iterdir()
+    entry.write_bytes(garbage)
+    perfil.reset()
+    assert cached(region, tmp_path) == expected
+    assert len(analyses) == 2
+    assert regions_counters() == {"regions_cache_corrupt": 1, "regions_computed": 1}
+    assert cached(region, tmp_path) == expected
+    assert len(analyses) == 2
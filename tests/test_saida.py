@@ -0,0 +1,97 @@
+"""
+Saída incremental (CSV, TSV, Markdown): o arquivo lido de volta contra as
+linhas escritas, o descarregamento na primeira linha e a cada intervalo, e
+o CSV em fluxo de grampos igual ao CSV da tabela inteira.
+"""
+
+import csv
+import io
+import random
+
+import pytest
+
+import grampos
+import saida
+from ocorrencias import HairpinHits
+from conftest import random_sequence
+
+ROWS = [[1, "ACGT", -2.5], [22, "a,b", "x\"y"], [333, "com | barra", ""], [4, "linha\tcom tab", 0.125]]
+
+
+def read_markdown(text):
+    """Células de uma tabela Markdown, desfazendo o escape de |."""
+    rows = []
+    for line in text.splitlines():
+        cells = line.strip("|").replace("\\|", "\0").split("|")
+        rows.append([c.strip().replace("\0", "|") for c in cells])
+    return rows
+
+
+@pytest.mark.parametrize("fmt", saida.FORMATS)
+def test_written_rows_read_back(tmp_path, fmt):
+    path = str(tmp_path / f"saida.{fmt}")
+    with saida.open_hit_writer(path, ["pos", "seq", "valor"], fmt) as out:
+        for row in ROWS:
+            out.write(row)
+    assert out.rows == len(ROWS) and out.out.closed
+    expected = [["pos", "seq", "valor"]] + [[str(v) for v in row] for row in ROWS]
+    with open(path, newline="", encoding="utf-8") as f:
+        text = f.read()
+    if fmt == "md":
+        table = read_markdown(text)
+        assert table[0] == expected[0] and set(table[1]) == {"---"}
+        assert table[2:] == expected[1:]
+    else:
+        delimiter = "," if fmt == "csv" else "\t"
+        assert list(csv.reader(io.StringIO(text), delimiter=delimiter)) == expected
+        assert text.endswith("\r\n" if fmt == "csv" else "\n")
+
+
+def test_format_from_path():
+    assert [saida.format_from_path(p) for p in ("a.CSV", "b.tsv", "c.txt", "d.md", "e.out")] == \
+        ["csv", "tsv", "tsv", "md", "csv"]
+    assert saida.format_from_path("e.out", "md") == "md"
+    with pytest.raises(ValueError):
+        saida.HitWriter(io.StringIO(), ["a"], "json")
+
+
+class CountingFlush(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.flushes = []
+
+    def flush(self):
+        self.flushes.append(self.getvalue().count("\n"))
+        super().flush()
+
+
+def test_flushes_first_row_then_by_interval(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(saida.time, "monotonic", lambda: clock[0])
+    out = CountingFlush()
+    writer = saida.HitWriter(out, ["a"], "tsv", flush_interval=0.5)
+    for step in [0.0, 0.1, 0.1, 0.2, 0.3, 0.1, 0.6]:
+        clock[0] += step
+        writer.write([len(out.flushes)])
+    # Cabeçalho + 1 linha logo; depois quando passa 0,5 s desde o último
+    assert out.flushes == [2, 6, 8]
+    writer.close()
+    assert out.flushes[-1] == 8 and not out.closed   # Arquivo de quem chamou fica aberto
+
+
+def test_dash_writes_tsv_to_stdout(capsys):
+    with saida.open_hit_writer("-", ["a", "b"]) as out:
+        out.write([1, "x"])
+    assert capsys.readouterr().out == "a\tb\n1\tx\n"
+
+
+def test_streamed_hairpin_csv_equals_table_csv(tmp_path):
+    rng = random.Random(15)
+    seq = random_sequence(rng, 5_000, "ACGT")
+    hits = grampos.find_hairpins(seq, 5, max_total=24)
+    assert len(hits)
+    grampos.save_hits_csv(hits, str(tmp_path / "tabela.csv"))
+    with saida.open_hit_writer(str(tmp_path / "fluxo.csv"), HairpinHits.CSV_HEADER) as out:
+        for h in grampos.iter_hairpins(seq, 5, max_total=24, chunk_size=777):
+            out.write(grampos.hit_row(h))
+    assert (tmp_path / "fluxo.csv").read_bytes() == (tmp_path / "tabela.csv").read_bytes()
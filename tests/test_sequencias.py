@@ -0,0 +1,74 @@
+"""
+Camada de normalização (bytes.translate) contra conversões base a base:
+limpeza, códigos, complemento reverso, com minúsculas, N, IUPAC, lixo e
+não ASCII, em str, bytes, bytearray e memoryview.
+"""
+
+import random
+
+import numpy as np
+import pytest
+
+import sequencias
+from conftest import naive_revcomp
+
+ALPHABET = "ACGTacgtNnRYKMSWryx-*0 \n\té"
+COMPLEMENT = {"A": "T", "C": "G", "G": "C", "T": "A", "N": "N",
+              "a": "t", "c": "g", "g": "c", "t": "a", "n": "n"}
+
+
+def naive_clean(seq):
+    return "".join(c.upper() for c in seq if c.upper() in "ACGTN")
+
+
+def naive_codes(seq):
+    return ["ACGT".index(c.upper()) if c.upper() in "ACGT" else 4 for c in seq]
+
+
+def random_text(rng, n):
+    return "".join(rng.choice(ALPHABET) for _ in range(n))
+
+
+def test_conversions_match_base_by_base():
+    rng = random.Random(22)
+    for _ in range(300):
+        seq = random_text(rng, rng.randint(0, 80))
+        ascii_seq = seq.encode("ascii", "replace").decode("ascii")  # "é" vira "?"
+        assert sequencias.clean(seq) == naive_clean(ascii_seq)
+        assert sequencias.normalize(seq) == naive_clean(ascii_seq).encode()
+        assert list(sequencias.encode_bytes(seq)) == naive_codes(ascii_seq)
+        codes = sequencias.encode(seq)
+        assert codes.dtype == np.uint8 and codes.tolist() == naive_codes(ascii_seq)
+        expected_rc = "".join(COMPLEMENT.get(c, c) for c in reversed(seq))
+        assert sequencias.revcomp(seq) == expected_rc
+        assert sequencias.revcomp(ascii_seq.encode()) == "".join(
+            COMPLEMENT.get(c, c) for c in reversed(ascii_seq)).encode()
+
+
+@pytest.mark.parametrize("kind", [bytes, bytearray, memoryview])
+def test_buffers_behave_like_str(kind):
+    rng = random.Random(kind.__name__)
+    for _ in range(100):
+        seq = random_text(rng, rng.randint(0, 60)).replace("é", "?")
+        buf = kind(seq.encode("ascii"))
+        assert sequencias.as_bytes(buf) == seq.encode("ascii")
+        assert sequencias.clean(buf) == sequencias.clean(seq)
+        assert sequencias.encode(buf).tolist() == sequencias.encode(seq).tolist()
+        assert sequencias.revcomp(buf) == sequencias.revcomp(seq).encode("ascii")
+
+
+def test_revcomp_codes_matches_string_revcomp():
+    rng = random.Random(220)
+    for _ in range(100):
+        seq = "".join(rng.choice("ACGTN") for _ in range(rng.randint(0, 50)))
+        codes = sequencias.encode(seq)
+        rc = sequencias.revcomp_codes(codes)
+        assert rc.tolist() == naive_codes(naive_revcomp(seq))
+        # Pares de Watson-Crick: códigos que somam 3; N continua N
+        assert all(b == 4 if a == 4 else a + b == 3 for a, b in zip(codes.tolist(), rc[::-1].tolist()))
+
+
+def test_docstring_examples():
+    assert sequencias.clean("atcg123XYZ") == "ATCG"
+    assert sequencias.normalize("atcg123XYZ") == b"ATCG"
+    assert sequencias.revcomp("TGGTAA") == "TTACCA"
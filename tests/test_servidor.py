@@ -0,0 +1,178 @@
+"""
+Servidor de consultas: cache LRU (limite em entradas e na soma dos bytes
+guardados) e as rotas num servidor de verdade, contra os motores chamados
+direto e as referências ingênuas, com os limites das consultas (400) e os
+acertos do cache.
+"""
+
+from urllib.error import HTTPError
+from urllib.request import urlopen
+import json
+import random
+import threading
+
+import pytest
+
+import grampos
+import servidor
+from conftest import (naive_maximal_palindromes, naive_revcomp, random_sequence,
+                      write_fasta, write_genbank)
+
+
+def test_cache_evicts_by_total_bytes():
+    cache = servidor.LRUCache(maxsize=100, maxbytes=10)
+    calls = []
+
+    def payload(key, n):
+        return lambda: calls.append(key) or b"x" * n
+
+    assert cache.get("a", payload("a", 4)) == b"xxxx"
+    cache.get("b", payload("b", 4))
+    assert cache.nbytes == 8 and len(cache) == 2
+    cache.get("a", payload("a", 4))          # "a" passa a ser o mais recente
+    cache.get("c", payload("c", 4))          # 12 bytes: sai "b", o mais antigo
+    assert len(cache) == 2 and cache.nbytes == 8
+    cache.get("a", payload("a", 4))
+    cache.get("b", payload("b", 4))
+    assert calls == ["a", "b", "c", "b"]
+    assert (cache.hits, cache.misses) == (2, 4)
+
+
+def test_cache_skips_values_larger_than_limit():
+    cache = servidor.LRUCache(maxsize=100, maxbytes=10)
+    cache.get("small", lambda: b"12345")
+    assert cache.get("big", lambda: b"x" * 11) == b"x" * 11
+    assert len(cache) == 1 and cache.nbytes == 5
+
+
+def test_cache_entry_limit_and_custom_size():
+    cache = servidor.LRUCache(maxsize=2, maxbytes=1 << 20)
+    for key in "abc":
+        cache.get(key, lambda: ("ACGT", {4: [0, 1]}), servidor._index_size)
+    assert len(cache) == 2
+    assert cache.nbytes == 2 * (4 + 2 * servidor._INDEX_BYTES_PER_START)
+
+
+GENOME = 6_000
+CDS = [(99, 700), (650, 1_200), (3_000, 4_500)]   # 0-based, fim exclusivo
+
+
+@pytest.fixture(scope="module")
+def genome(tmp_path_factory):
+    rng = random.Random(21)
+    seq = random_sequence(rng, GENOME, "ACGTN", [30, 20, 20, 30, 1])
+    # Um grampo (haste de 8, loop de 4) e um palíndromo longo plantados
+    stem = random_sequence(rng, 8)
+    seq = seq[:1000] + stem + "TTTT" + naive_revcomp(stem) + seq[1020:]
+    arm = random_sequence(rng, 15)
+    seq = seq[:2000] + arm + naive_revcomp(arm) + seq[2030:]
+    tmp = tmp_path_factory.mktemp("servidor")
+    fasta = write_fasta(tmp / "genoma.fa", [("CP000001.1", seq)])
+    features = [("CDS", s, e, 1, {"locus_tag": [f"L{i}"], "product": ["proteína"]})
+                for i, (s, e) in enumerate(CDS)]
+    gb = write_genbank(tmp / "genoma.gb", features, seq.replace("N", "A"))
+    return seq, fasta, gb
+
+
+@pytest.fixture
+def server(genome, monkeypatch):
+    """Servidor numa porta livre do localhost, numa thread; devolve get(rota) -> (status, json)."""
+    monkeypatch.setattr(servidor, "MAX_PALINDROME_REGION", 3_000)
+    monkeypatch.setattr(servidor, "MAX_HAIRPIN_REGION", 2_000)
+    _, fasta, gb = genome
+    service = servidor.GenomeService(fasta, gb)
+    httpd = servidor.make_server(service, port=0, quiet=True)
+    thread = threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{httpd.server_port}"
+
+    def get(route):
+        try:
+            with urlopen(base + route, timeout=30) as response:
+                return response.status, json.loads(response.read())
+        except HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    yield get
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_palindromes_route_matches_naive(genome, server):
+    seq = genome[0]
+    for start, end in [(1, 3_000), (1_990, 2_040), (5_001, GENOME), (2_015, 2_015)]:
+        region = seq[start - 1:end]
+        expected = [{"start": start + s, "end": start + e - 1, "sequence": pal.upper()}
+                    for s, e, pal in naive_maximal_palindromes(region)]
+        status, body = server(f"/palindromes?start={start}&end={end}&min_length=2")
+        assert status == 200 and body["palindromes"] == expected
+        status, body = server(f"/palindromes?start={start}&end={end}&min_length=10")
+        assert body["palindromes"] == [p for p in expected if p["end"] - p["start"] + 1 >= 10]
+        status, body = server(f"/palindromes?start={start}&end={end}&k=6")
+        assert body["palindromes"] == sorted((p for p in expected if p["end"] - p["start"] + 1 == 6),
+                                             key=lambda p: p["start"])
+        assert body["count"] == len(body["palindromes"]) and body["k"] == 6
+    assert {"start": 2_001, "end": 2_030} == {k: v for k, v in server(
+        "/palindromes?start=1900&end=2100&k=30")[1]["palindromes"][0].items() if k != "sequence"}
+
+
+def test_hairpins_route_matches_engine(genome, server):
+    seq = genome[0]
+    for query, kwargs in [("K=8", {}), ("K=5&mismatches=1&wobble=1&max_total=30",
+                                        {"mismatches": 1, "wobble": True, "max_total": 30}),
+                          ("K=6&selection=energy&energy=1", {"selection": "energy", "score": True})]:
+        status, body = server(f"/hairpins?start=501&end=2500&{query}")
+        assert status == 200
+        K = int(query.split("&")[0][2:])
+        expected = []
+        for h in grampos.find_hairpins(seq[500:2500], K, **kwargs):
+            h["start"] += 500
+            h["end"] += 500
+            expected.append(h)
+        assert body["hairpins"] == json.loads(json.dumps(expected))
+        assert body["count"] == len(expected)
+    # O grampo plantado (haste de 8) está na resposta, em coordenadas do genoma
+    status, body = server("/hairpins?start=900&end=1100&K=8")
+    assert any(h["start"] == 1_001 for h in body["hairpins"]), body
+
+
+def test_cds_and_status_routes(server):
+    for start, end in [(1, 99), (100, 100), (700, 700), (701, 3_000), (1_201, 3_000), (4_500, GENOME)]:
+        expected = [f"L{i}" for i, (s, e) in enumerate(CDS) if s + 1 <= end and e >= start]
+        status, body = server(f"/cds?start={start}&end={end}")
+        assert status == 200 and [c["locus_tag"] for c in body["cds"]] == expected
+    status, body = server("/status")
+    assert status == 200
+    assert body["records"] == {"CP000001.1": GENOME} and body["annotations"] == "CP000001.1"
+
+
+def test_repeated_query_is_a_cache_hit(server):
+    before = server("/status")[1]["cache"]
+    first = server("/palindromes?start=10&end=2000&min_length=6")
+    after_first = server("/status")[1]["cache"]
+    assert server("/palindromes?start=10&end=2000&min_length=6") == first
+    after_second = server("/status")[1]["cache"]
+    # Primeira vez: resposta e índice da região calculados; segunda: resposta do cache
+    assert after_first["misses"] - before["misses"] == 2
+    assert (after_second["hits"] - after_first["hits"], after_second["misses"]) == (1, after_first["misses"])
+    # Outra consulta sobre a mesma região reaproveita o índice
+    server("/palindromes?start=10&end=2000&k=4")
+    assert server("/status")[1]["cache"]["hits"] == after_second["hits"] + 1
+
+
+@pytest.mark.parametrize("route", [
+    "/palindromes?start=0&end=10", "/palindromes?start=10&end=5", f"/palindromes?end={GENOME + 1}",
+    "/palindromes?start=1&end=3001", "/palindromes", "/palindromes?start=abc",
+    "/palindromes?accession=XX.1",
+    "/hairpins?start=1&end=2001", "/hairpins?start=1&end=100&K=0", "/hairpins?start=1&end=100&K=33",
+    "/hairpins?start=1&end=100&max_total=201", "/hairpins?start=1&end=100&max_total=0",
+    "/hairpins?start=1&end=100&mismatches=-1", "/hairpins?start=1&end=100&selection=melhor",
+    "/hairpins?start=1&end=100&max_energy=x", "/cds?start=5&end=2",
+])
+def test_invalid_queries_are_400(server, route):
+    status, body = server(route)
+    assert status == 400 and body["error"]
+
+
+def test_unknown_route_is_404(server):
+    assert server("/genes")[0] == 404
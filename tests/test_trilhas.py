@@ -0,0 +1,176 @@
+"""
+Trilhas de densidade: consultas de janela pelas somas de prefixo e os
+arquivos bedGraph/wig contra contagens diretas, e as trilhas de
+densidade.py (lidas em blocos) contra os motores sobre a sequência inteira.
+"""
+
+import random
+import sys
+
+import numpy as np
+import pytest
+
+import densidade
+import grampos
+import trilhas
+from conftest import naive_maximal_palindromes, naive_revcomp, random_sequence, write_fasta
+
+CODES = {"A": 0, "C": 1, "G": 2, "T": 3}
+
+
+def naive_count(starts, a, b):
+    return sum(a <= s < b for s in starts)
+
+
+def naive_gc(seq, a, b):
+    window = seq[max(0, a):max(0, b)]
+    acgt = sum(c in "ACGT" for c in window)
+    return sum(c in "GC" for c in window) / acgt if acgt else None
+
+
+def assert_gc(tracks, seq, a, b):
+    expected = naive_gc(seq, a, b)
+    assert tracks.gc(a, b) == (None if expected is None else pytest.approx(expected))
+
+
+def naive_windows(length, window, step):
+    return [(a, min(a + window, length)) for a in range(0, length, step)]
+
+
+def filled_tracks(rng, length):
+    """Trilhas com inícios repetidos e GC, somados em blocos fora de ordem."""
+    seq = random_sequence(rng, length, "ACGTN", [3, 2, 2, 3, 1])
+    starts = [rng.randrange(length) for _ in range(rng.randint(0, 3 * length))] if length else []
+    tracks = trilhas.DensityTracks("chr", length)
+    cuts = sorted(rng.sample(range(len(starts) + 1), min(4, len(starts) + 1)))
+    blocks = [starts[a:b] for a, b in zip([0] + cuts, cuts + [len(starts)])]
+    rng.shuffle(blocks)
+    for block in blocks:
+        tracks.add_starts("palindromes", block)
+    cuts = sorted(rng.sample(range(length + 1), min(5, length + 1)))
+    pieces = list(zip([0] + cuts, cuts + [length]))
+    rng.shuffle(pieces)
+    for a, b in pieces:
+        tracks.add_gc([CODES.get(c, 4) for c in seq[a:b]], a)
+    return tracks, seq, starts
+
+
+def test_window_queries_match_naive_counts():
+    rng = random.Random(24)
+    for _ in range(40):
+        length = rng.choice([0, 1, 7, rng.randint(1, 600)])
+        tracks, seq, starts = filled_tracks(rng, length)
+        assert tracks.names == ("palindromes", "gc")
+        for _ in range(50):
+            a, b = sorted(rng.randint(-3, length + 3) for _ in range(2))
+            assert tracks.count("palindromes", a, b) == naive_count(starts, a, b)
+            assert_gc(tracks, seq, a, b)
+        if not length:
+            continue
+        window = rng.randint(1, length + 5)
+        step = rng.choice([None, max(1, window // 3)])
+        starts_w, ends_w, values = tracks.windows("palindromes", window, step, per=100)
+        expected = naive_windows(length, window, step or window)
+        assert list(zip(starts_w.tolist(), ends_w.tolist())) == expected
+        assert values.tolist() == pytest.approx([naive_count(starts, a, b) * 100 / (b - a)
+                                                 for a, b in expected])
+        _, _, gc = tracks.windows("gc", window, step)
+        assert [None if np.isnan(v) else v for v in gc.tolist()] == \
+            pytest.approx([naive_gc(seq, a, b) for a, b in expected])
+
+
+def test_all_n_record_has_no_gc():
+    tracks = trilhas.DensityTracks("n", 5)
+    tracks.add_gc([4] * 5)
+    assert tracks.gc(0, 5) is None
+    assert np.isnan(tracks.windows("gc", 2)[2]).all()
+
+
+def read_bedgraph(path):
+    with open(path) as f:
+        header = f.readline()
+        return header, [(chrom, int(a), int(b), float(v))
+                        for chrom, a, b, v in (line.split("\t") for line in f)]
+
+
+def read_wig(path):
+    blocks = {}
+    with open(path) as f:
+        header = f.readline()
+        for line in f:
+            if line.startswith("fixedStep"):
+                fields = dict(item.split("=") for item in line.split()[1:])
+                current = blocks[fields["chrom"]] = (int(fields["step"]), int(fields["span"]), [])
+            else:
+                current[2].append(float(line))
+    return header, blocks
+
+
+@pytest.mark.parametrize("window, step_fraction", [(10, 1.0), (25, 0.4), (1000, 1.0)])
+def test_bedgraph_and_wig_match_naive(tmp_path, window, step_fraction):
+    rng = random.Random(window)
+    data = {}
+    tracks = []
+    for chrom, length in [("chr1", 237), ("chr2", 60), ("vazio", 0)]:
+        track, seq, starts = filled_tracks(rng, length)
+        track.chrom = chrom
+        tracks.append(track)
+        data[chrom] = (length, seq, starts)
+    written = trilhas.export(tracks, str(tmp_path), [window], step_fraction=step_fraction, per=50)
+    assert sorted(p.split("/")[-1] for p in written) == sorted(
+        f"{name}_{window}{ext}" for name in ("palindromes", "gc") for ext in (".bedGraph", ".wig"))
+    step = max(1, int(window * step_fraction))
+    shown = min(window, step)
+
+    for name in ("palindromes", "gc"):
+        header, rows = read_bedgraph(tmp_path / f"{name}_{window}.bedGraph")
+        assert f'name="{name}_{window}"' in header
+        expected_rows = []
+        expected_wig = {}
+        for chrom, (length, seq, starts) in data.items():
+            values = []
+            for a, b in naive_windows(length, window, step):
+                value = naive_gc(seq, a, b) if name == "gc" else naive_count(starts, a, b) * 50 / (b - a)
+                values.append(value or 0.0)
+                if value is not None:
+                    expected_rows.append((chrom, a, min(a + shown, length), value))
+            expected_wig[chrom] = (step, shown, values)
+        assert [r[:3] for r in rows] == [r[:3] for r in expected_rows]
+        assert [r[3] for r in rows] == pytest.approx([r[3] for r in expected_rows], rel=1e-5)
+        header, blocks = read_wig(tmp_path / f"{name}_{window}.wig")
+        assert blocks.keys() == expected_wig.keys()
+        for chrom, (step_, span, values) in blocks.items():
+            assert (step_, span) == expected_wig[chrom][:2]
+            assert values == pytest.approx(expected_wig[chrom][2], rel=1e-5)
+
+
+def test_build_tracks_in_blocks_matches_whole_sequence(tmp_path, monkeypatch, capsys):
+    rng = random.Random(240)
+    records = []
+    for i in range(3):
+        seq = random_sequence(rng, rng.randint(300, 900), "ACGTN", [30, 20, 20, 30, 1])
+        arm = random_sequence(rng, 20)
+        seq = seq[:100] + arm + naive_revcomp(arm) + seq[100:]
+        records.append((f"r{i}", seq))
+    records += [("so_n", "N" * 50), ("vazio", "")]
+    path = write_fasta(tmp_path / "genoma.fa", records)
+
+    for block in (37, 1 << 20):
+        tracks = densidade.build_tracks(path, min_length=8, K=5, block=block)
+        assert [t.chrom for t in tracks] == [name for name, _ in records]
+        for track, (_, seq) in zip(tracks, records):
+            assert len(track) == len(seq)
+            palindromes = [s for s, e, _ in naive_maximal_palindromes(seq) if e - s >= 8]
+            hairpins = (grampos.find_hairpins(seq, 5).start - 1).tolist()
+            for a in range(0, len(seq) + 1, 23):
+                for b in (a + 1, a + 50, len(seq)):
+                    assert track.count("palindromes", a, b) == naive_count(palindromes, a, b)
+                    assert track.count("hairpins", a, b) == naive_count(hairpins, a, b)
+                    assert_gc(track, seq, a, b)
+
+    # O resumo da tela não quebra num registro só de N (GC indefinido)
+    monkeypatch.setattr(sys, "argv", ["densidade.py", "--fasta", path, "--windows", "100",
+                                      "--out-dir", str(tmp_path / "trilhas")])
+    assert densidade.main() == 0
+    out = capsys.readouterr().out
+    assert "so_n: 50 bp" in out and "GC n/d" in out
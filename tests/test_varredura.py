@@ -0,0 +1,84 @@
+"""
+Varredura do genoma inteiro em pedaços: iter_fasta_chunks contra o FASTA
+lido de uma vez e stream_maximal_palindromes contra os palíndromos da
+sequência inteira, com palíndromos cruzando as fronteiras dos pedaços e
+maiores que max_length (truncados em torno do centro).
+"""
+
+import random
+
+import pytest
+
+import bacter_final
+from conftest import naive_maximal_palindromes, naive_revcomp, random_sequence, write_fasta
+
+
+def truncated(seq, max_length):
+    """Palíndromos maximais da sequência inteira, cortados em max_length pelo centro."""
+    half = max_length // 2
+    found = []
+    for start, end, _ in naive_maximal_palindromes(seq):
+        center = (start + end) // 2
+        r = min((end - start) // 2, half)
+        found.append((center - r, center + r, seq[center - r:center + r]))
+    return found
+
+
+def random_records(rng):
+    records = []
+    for i in range(rng.randint(1, 4)):
+        seq = random_sequence(rng, rng.randint(0, 400), rng.choice(["ACGT", "AT", "ACGTN", "acgtAT"]))
+        # Um palíndromo longo no meio, para cruzar fronteiras e passar de max_length
+        arm = random_sequence(rng, rng.randint(0, 40), "ACGT")
+        cut = rng.randint(0, len(seq))
+        seq = seq[:cut] + arm + naive_revcomp(arm) + seq[cut:]
+        records.append((f"r{i}", seq))
+    return records
+
+
+def test_chunks_rebuild_each_record(tmp_path):
+    rng = random.Random(3)
+    for trial in range(40):
+        records = random_records(rng) + [("vazio", "")]
+        rng.shuffle(records)
+        path = write_fasta(tmp_path / f"{trial}.fa", records, rng.choice([1, 7, 60, 1000]))
+        chunk_size = rng.choice([1, 5, 64, 10_000])
+        got = {}
+        for record_id, chunk, last in bacter_final.iter_fasta_chunks(path, chunk_size):
+            assert record_id not in got or not got[record_id][1], "pedaço depois do último"
+            text, _ = got.get(record_id, ("", False))
+            assert len(chunk) <= chunk_size
+            if not last:
+                assert len(chunk) == chunk_size
+            got[record_id] = (text + chunk, last)
+        assert got == {record_id: (seq, True) for record_id, seq in records}
+
+
+@pytest.mark.parametrize("max_length", [2, 8, 20, 1000])
+def test_stream_matches_whole_sequence(tmp_path, max_length):
+    rng = random.Random(max_length)
+    for trial in range(30):
+        records = random_records(rng)
+        path = write_fasta(tmp_path / f"{trial}.fa", records, rng.choice([3, 60]))
+        chunk_size = rng.choice([1, 4, 33, 500])
+        chunks = bacter_final.iter_fasta_chunks(path, chunk_size)
+        streamed = list(bacter_final.stream_maximal_palindromes(chunks, max_length))
+        expected = [(record_id, *hit) for record_id, seq in records
+                    for hit in sorted(truncated(seq, max_length), key=lambda h: h[0] + h[1])]
+        assert streamed == expected, (records, chunk_size)
+
+
+def test_long_palindrome_is_truncated_at_max_length():
+    arm = "GATTACACCG" * 3
+    seq = "CC" + arm + naive_revcomp(arm) + "AA"   # braços de 30, centro 32
+    chunks = [("x", seq[i:i + 7], i + 7 >= len(seq)) for i in range(0, len(seq), 7)]
+    hits = list(bacter_final.stream_maximal_palindromes(chunks, 20))
+    assert ("x", 22, 42, seq[22:42]) in hits
+    assert max(end - start for _, start, end, _ in hits) == 20
+    whole = bacter_final.find_all_maximal_palindromes(seq)
+    assert max(e - s for s, e, _ in whole) == 60
+
+
+def test_odd_max_length_is_rejected():
+    with pytest.raises(ValueError):
+        list(bacter_final.stream_maximal_palindromes([("x", "ACGT", True)], 7))